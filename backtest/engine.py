@@ -0,0 +1,203 @@
+import uuid
+import logging
+import numpy as np
+import pandas as pd
+from config import SYMBOL, TIMEFRAME, RISK_PER_TRADE, ACCOUNT_TYPE, ARTIFICIAL_BALANCE, TRAILING_STOP_PCT, TAKE_PROFIT_MULTIPLIER, TIMEFRAME_SCALING_FACTORS
+from data.candle_frame import CandleFrame
+from indicators.technical_indicators import calculate_indicators
+from strategies.trading_strategy import REQUIRED_FEATURES, confirm_entry_with_gpt, manage_position_with_trail_stop, score_frame
+from backtest.simulation import SimulatedBalanceManager, SimulatedBroker
+
+# Sin GPT-4 en los backtests por defecto: análisis neutro que no suma ni resta puntos
+NEUTRAL_ANALYSIS = {'sentiment': 'neutral', 'risk_assessment': 'medium'}
+
+
+class BacktestResult:
+    """Curva de capital por vela, lista de operaciones cerradas y ejecuciones del broker simulado."""
+
+    def __init__(self, equity, trades, fills):
+        self.equity = equity
+        self.trades = trades
+        self.fills = fills
+
+    def summary(self):
+        equity = self.equity['equity'].to_numpy()
+        if len(equity) == 0:
+            return {}
+        peak = np.maximum.accumulate(equity)
+        pnl = self.trades['pnl'] if len(self.trades) else pd.Series(dtype=float)
+        return {
+            'initial_equity': float(equity[0]),
+            'final_equity': float(equity[-1]),
+            'return_pct': float((equity[-1] / equity[0] - 1) * 100),
+            'max_drawdown_pct': float(((peak - equity) / peak).max() * 100),
+            'trades': int(len(self.trades)),
+            'win_rate': float((pnl > 0).mean()) if len(pnl) else 0.0,
+            'fees': float(sum(fill['fee'] for fill in self.fills)),
+        }
+
+
+class BacktestEngine:
+    """Reproduce una serie de velas vela a vela con el mismo código que el bot en vivo.
+
+    Las entradas pasan por confirm_entry_with_gpt y las salidas por manage_position_with_trail_stop; las órdenes van
+    a un SimulatedBroker y las operaciones a un SimulatedBalanceManager, así que no se toca ni el exchange ni operations.json.
+    """
+
+    def __init__(self, symbol=SYMBOL, timeframe=TIMEFRAME, initial_balance=None, risk_per_trade=RISK_PER_TRADE,
+                 fill_model=None, fee_model=None, gpt_fn=None, threshold=3, trailing_stop_pct=TRAILING_STOP_PCT,
+                 take_profit_multiplier=TAKE_PROFIT_MULTIPLIER, scaling_factor=None, initial_stop_pct=0.02,
+                 allow_short=None, weights=None, close_at_end=False, quiet=True):
+        self.symbol = symbol
+        self.initial_balance = ARTIFICIAL_BALANCE['USDT'] if initial_balance is None else initial_balance
+        self.risk_per_trade = risk_per_trade
+        self.fill_model = fill_model
+        self.fee_model = fee_model
+        # gpt_fn(candles, index) -> {'sentiment': ..., 'risk_assessment': ...}
+        self.gpt_fn = gpt_fn
+        self.threshold = threshold
+        # Pesos de la puntuación; None usa los de trading_strategy.weights
+        self.weights = weights
+        self.trailing_stop_pct = trailing_stop_pct
+        self.take_profit_multiplier = take_profit_multiplier
+        self.scaling_factor = TIMEFRAME_SCALING_FACTORS.get(timeframe, 1.0) if scaling_factor is None else scaling_factor
+        self.initial_stop_pct = initial_stop_pct
+        # En spot no se abren cortos, igual que en run_trading_bot
+        self.allow_short = ACCOUNT_TYPE != 'spot' if allow_short is None else allow_short
+        # Cerrar en la última vela la posición que siga abierta (con su ejecución y comisión) en vez de valorarla a mercado
+        self.close_at_end = close_at_end
+        # El código en vivo registra varias líneas INFO por vela; en un año de velas de 1m eso domina el tiempo
+        self.quiet = quiet
+
+    def _prepare(self, df):
+        if isinstance(df, CandleFrame):
+            return df
+        missing = [feature for feature in REQUIRED_FEATURES if feature not in df.columns]
+        if missing:
+            df = calculate_indicators(df, REQUIRED_FEATURES)
+        return CandleFrame.from_frame(df)
+
+    def _open_position(self, candles, index, side, broker, balance_manager):
+        entry_price = candles.value('close', index)
+        size = broker.equity(entry_price) * self.risk_per_trade / entry_price
+        if size <= 0:
+            return None
+        order_id = str(uuid.uuid4())
+        fill = broker.place_order(order_id, self.symbol, side, 'market', size)
+        if fill is None:
+            return None
+        balance_manager.add_operation({
+            'orderId': order_id,
+            'size': size,
+            'price': entry_price,
+            'side': side,
+            'type': 'market',
+            'status': 'open',
+            'timestamp': str(fill['timestamp']),
+        })
+        balance_manager.update_balance(size, entry_price, side)
+        # Mismos stop y take profit iniciales que run_trading_bot
+        if side == 'buy':
+            stop_loss = entry_price * (1 - self.initial_stop_pct)
+            take_profit = entry_price * self.take_profit_multiplier
+        else:
+            stop_loss = entry_price * (1 + self.initial_stop_pct)
+            take_profit = entry_price * (2 - self.take_profit_multiplier)
+        return {
+            'in_position': side,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'position_size': size,
+            'order_id': order_id,
+            'entry_fill': fill,
+        }
+
+    def _close_trade(self, position, exit_fill):
+        entry_fill = position['entry_fill']
+        direction = 1 if position['in_position'] == 'buy' else -1
+        gross = direction * (exit_fill['price'] - entry_fill['price']) * entry_fill['size']
+        fees = entry_fill['fee'] + exit_fill['fee']
+        return {
+            'side': position['in_position'],
+            'entry_time': entry_fill['timestamp'],
+            'exit_time': exit_fill['timestamp'],
+            'entry_price': entry_fill['price'],
+            'exit_price': exit_fill['price'],
+            'size': entry_fill['size'],
+            'fees': fees,
+            'pnl': gross - fees,
+            'bars': exit_fill['index'] - entry_fill['index'],
+        }
+
+    def _close_at_end(self, candles, position, broker, balance_manager):
+        index = len(candles) - 1
+        broker.set_bar(candles, index)
+        side = 'sell' if position['in_position'] == 'buy' else 'buy'
+        fill = broker.place_order(str(uuid.uuid4()), self.symbol, side, 'market', position['position_size'])
+        if fill is None:
+            return None
+        balance_manager.close_operation(position['order_id'])
+        balance_manager.update_balance(position['position_size'], fill['price'], side)
+        return self._close_trade(position, fill)
+
+    def run(self, df):
+        """Ejecuta el backtest sobre un DataFrame de velas (con o sin indicadores) o un CandleFrame."""
+        candles = self._prepare(df)
+        scores = score_frame(candles, self.weights)['score'].to_numpy()
+        close = candles['close']
+        broker = SimulatedBroker(self.initial_balance, self.fill_model, self.fee_model)
+        balance_manager = SimulatedBalanceManager({'USDT': self.initial_balance})
+        equity = np.full(len(candles), float(self.initial_balance))
+        position_size = np.zeros(len(candles))
+        trades = []
+        position = None
+
+        previous_disable = logging.root.manager.disable
+        if self.quiet:
+            logging.disable(logging.INFO)
+        try:
+            for index in range(1, len(candles)):
+                broker.set_bar(candles, index)
+                if position is not None:
+                    fills_before = len(broker.fills)
+                    in_position, position['stop_loss'] = manage_position_with_trail_stop(
+                        candles, index, position['in_position'], position['entry_price'], position['stop_loss'],
+                        position['take_profit'], self.symbol, position['position_size'], position['order_id'],
+                        self.trailing_stop_pct, balance_manager, take_profit_multiplier=self.take_profit_multiplier,
+                        scaling_factor=self.scaling_factor, place_order_fn=broker.place_order,
+                    )
+                    if not in_position and len(broker.fills) > fills_before:
+                        trades.append(self._close_trade(position, broker.fills[-1]))
+                        position = None
+                else:
+                    analysis = self.gpt_fn(candles, index) if self.gpt_fn else NEUTRAL_ANALYSIS
+                    signal, _ = confirm_entry_with_gpt(candles, index, analysis, base_score=scores[index].item(), threshold=self.threshold,
+                                                       score_weights=self.weights)
+                    if signal == 'buy' or (signal == 'sell' and self.allow_short):
+                        position = self._open_position(candles, index, signal, broker, balance_manager)
+                equity[index] = broker.equity(close[index])
+                position_size[index] = broker.quantity
+            if self.close_at_end and position is not None and len(candles) > 1:
+                trade = self._close_at_end(candles, position, broker, balance_manager)
+                if trade is not None:
+                    trades.append(trade)
+                    position = None
+                    equity[-1] = broker.equity(close[-1])
+                    position_size[-1] = broker.quantity
+        finally:
+            logging.disable(previous_disable)
+
+        equity_curve = pd.DataFrame({
+            'timestamp': candles['timestamp'].astype('datetime64[ms]'),
+            'close': close,
+            'position': position_size,
+            'equity': equity,
+        })
+        logging.info(f"Backtest de {self.symbol} terminado: {len(candles)} velas, {len(trades)} operaciones, capital final {equity[-1]:.2f}")
+        return BacktestResult(equity_curve, pd.DataFrame(trades), broker.fills)
+
+
+def run_backtest(df, **kwargs):
+    """Atajo: BacktestEngine(**kwargs).run(df)."""
+    return BacktestEngine(**kwargs).run(df)
@@ -0,0 +1,113 @@
+import logging
+from balance_manager import BalanceManager
+
+
+class SimulatedBalanceManager(BalanceManager):
+    """BalanceManager en memoria: mismas operaciones que el real pero nunca toca operations.json."""
+
+    def __init__(self, artificial_balance):
+        super().__init__(artificial_balance, operations_file=None)
+
+    def load_operations(self):
+        self.operations = []
+        # Índice por orderId: en un backtest hay miles de operaciones y la búsqueda lineal del original es O(n²)
+        self._operations_by_id = {}
+
+    def save_operations(self):
+        pass
+
+    def add_operation(self, operation):
+        existing_order = self._operations_by_id.get(operation['orderId'])
+        if existing_order:
+            existing_order.update(operation)
+        else:
+            self.operations.append(operation)
+            self._operations_by_id[operation['orderId']] = operation
+
+    def close_operation(self, order_id):
+        operation = self._operations_by_id.get(order_id)
+        if operation and operation['status'] == 'open':
+            operation['status'] = 'closed'
+
+    def format_operations(self):
+        pass
+
+
+class CloseFill:
+    """Ejecuta al cierre de la vela en la que se decide la orden, con deslizamiento opcional en contra."""
+
+    def __init__(self, slippage_pct=0.0):
+        self.slippage_pct = slippage_pct
+
+    def base_price(self, candles, index):
+        return candles.value('close', index)
+
+    def price(self, side, candles, index):
+        price = self.base_price(candles, index)
+        return price * (1 + self.slippage_pct) if side == 'buy' else price * (1 - self.slippage_pct)
+
+
+class NextOpenFill(CloseFill):
+    """Ejecuta a la apertura de la vela siguiente (la última vela se ejecuta a su cierre)."""
+
+    def base_price(self, candles, index):
+        position = index if index >= 0 else len(candles) + index
+        if position + 1 < len(candles):
+            return candles.value('open', position + 1)
+        return candles.value('close', position)
+
+
+class PercentageFee:
+    """Comisión proporcional al nominal; 0.1% es la comisión taker por defecto de KuCoin spot."""
+
+    def __init__(self, rate=0.001):
+        self.rate = rate
+
+    def fee(self, size, price):
+        return abs(size) * price * self.rate
+
+
+class SimulatedBroker:
+    """Sustituto de place_order para los backtests: ejecuta con el modelo de ejecución y lleva caja, posición y ejecuciones."""
+
+    def __init__(self, initial_balance, fill_model=None, fee_model=None):
+        self.cash = float(initial_balance)
+        self.quantity = 0.0
+        self.fill_model = fill_model or CloseFill()
+        self.fee_model = fee_model or PercentageFee()
+        self.fills = []
+        self._candles = None
+        self._index = None
+
+    def set_bar(self, candles, index):
+        self._candles = candles
+        self._index = index
+
+    def place_order(self, client_oid, symbol, side, order_type, size, price=None, leverage=None):
+        try:
+            fill_price = self.fill_model.price(side, self._candles, self._index)
+            fee = self.fee_model.fee(size, fill_price)
+            signed_size = size if side == 'buy' else -size
+            self.cash -= signed_size * fill_price + fee
+            self.quantity += signed_size
+            # Mismo código de respuesta que una orden aceptada por KuCoin, para que valga como place_order_fn de close_positions
+            fill = {
+                'code': '200000',
+                'clientOid': client_oid,
+                'symbol': symbol,
+                'side': side,
+                'type': order_type,
+                'size': size,
+                'price': fill_price,
+                'fee': fee,
+                'index': self._index,
+                'timestamp': self._candles.timestamp(self._index),
+            }
+            self.fills.append(fill)
+            return fill
+        except Exception as e:
+            logging.error(f"Error simulando la orden {side} de {size} {symbol}: {e}")
+            return None
+
+    def equity(self, price):
+        return self.cash + self.quantity * price
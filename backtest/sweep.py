@@ -0,0 +1,225 @@
+import os
+import json
+import random
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from data.candle_frame import CandleFrame
+from indicators.feature_cache import fingerprint_arrays
+from strategies.trading_strategy import weights as default_weights
+from backtest.engine import BacktestEngine
+
+# Los parámetros 'weights.<factor>' sustituyen un peso concreto de trading_strategy.weights; el resto van a BacktestEngine
+WEIGHT_PREFIX = 'weights.'
+
+
+def grid(space):
+    """Todas las combinaciones de un dict parámetro -> lista de valores."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_search(space, samples, seed=None):
+    """Muestreo aleatorio: listas se eligen al azar, tuplas (min, max) se muestrean uniformes (enteros si ambos lo son)."""
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(samples):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(values)
+        candidates.append(params)
+    return candidates
+
+
+def _narrow(space, elites, scale, rng):
+    """Candidato alrededor de un elite: los rangos se estrechan a scale de su anchura y las listas suelen heredar su valor."""
+    elite = rng.choice(elites)
+    params = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            low, high = values
+            half = (high - low) * scale / 2
+            value = min(max(elite[name] + rng.uniform(-half, half), low), high)
+            params[name] = int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+        else:
+            params[name] = elite[name] if rng.random() > scale else rng.choice(values)
+    return params
+
+
+def _describe(value):
+    # Modelos de fill/comisión y gpt_fn se describen por clase y atributos, no por su dirección en memoria
+    if callable(value) and hasattr(value, '__qualname__'):
+        return f"{value.__module__}.{value.__qualname__}"
+    if hasattr(value, '__dict__'):
+        return dict(vars(value), **{'class': type(value).__name__})
+    return str(value)
+
+
+def params_key(params):
+    return json.dumps(params, sort_keys=True, default=_describe)
+
+
+def data_key(candles):
+    """Huella de las velas del barrido: número de velas, última vela y contenido OHLCV."""
+    columns = {name: candles[name] for name in ('open', 'high', 'low', 'close', 'volume') if name in candles}
+    columns['timestamp'] = candles.timestamps
+    return f"{len(candles)}:{candles.timestamps[-1] if len(candles) else None}:{fingerprint_arrays(columns)}"
+
+
+def result_key(params, candles_key, base_kwargs=None):
+    """Clave de un resultado guardado: mismos parámetros, mismas velas y misma configuración base."""
+    return json.dumps({'data': candles_key, 'base': base_kwargs or {}, 'params': params}, sort_keys=True, default=_describe)
+
+
+def engine_kwargs(params, base_kwargs=None):
+    """Traduce un juego de parámetros del barrido a argumentos de BacktestEngine."""
+    kwargs = dict(base_kwargs or {})
+    overrides = {name[len(WEIGHT_PREFIX):]: value for name, value in params.items() if name.startswith(WEIGHT_PREFIX)}
+    if overrides:
+        kwargs['weights'] = dict(kwargs.get('weights') or default_weights, **overrides)
+    kwargs.update((name, value) for name, value in params.items() if not name.startswith(WEIGHT_PREFIX))
+    return kwargs
+
+
+class SharedCandles:
+    """Columnas numéricas de un CandleFrame copiadas una vez a memoria compartida; los procesos las adjuntan sin copiarlas."""
+
+    def __init__(self, candles):
+        columns = {'timestamp': candles['timestamp']}
+        columns.update((name, values) for name, values in candles.columns.items()
+                       if values.dtype == np.bool_ or np.issubdtype(values.dtype, np.number))
+        self.layout = []
+        offset = 0
+        for name, values in columns.items():
+            self.layout.append((name, values.dtype.str, len(values), offset))
+            offset += values.nbytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for name, dtype, length, offset in self.layout:
+            np.ndarray(length, dtype=dtype, buffer=self.shm.buf, offset=offset)[:] = columns[name]
+        self.name = self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_candles(name, layout):
+    """Reconstruye el CandleFrame en un proceso hijo a partir del bloque compartido (arrays de solo lectura)."""
+    shm = shared_memory.SharedMemory(name=name)
+    columns = {}
+    for column, dtype, length, offset in layout:
+        values = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)
+        values.setflags(write=False)
+        columns[column] = values
+    timestamps = columns.pop('timestamp')
+    return shm, CandleFrame(timestamps, columns)
+
+
+# Estado de cada proceso del pool: se adjunta una vez en el initializer y se reutiliza en todas sus tareas
+_worker = {}
+
+
+def _init_worker(name, layout, base_kwargs):
+    shm, candles = attach_candles(name, layout)
+    _worker.update(shm=shm, candles=candles, base_kwargs=base_kwargs)
+
+
+def _run_candidate(params, key):
+    try:
+        result = BacktestEngine(**engine_kwargs(params, _worker['base_kwargs'])).run(_worker['candles'])
+        return dict(params, **result.summary(), error=None, key=key)
+    except Exception as e:
+        logging.error(f"Error en el backtest con parámetros {params}: {e}")
+        return dict(params, error=str(e), key=key)
+
+
+def _load_results(results_path):
+    results = []
+    if results_path and os.path.exists(results_path):
+        with open(results_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    results.append(json.loads(line))
+    return results
+
+
+def run_sweep(df, candidates, base_kwargs=None, results_path=None, workers=None, sort_by='return_pct', ascending=False):
+    """Lanza un backtest por juego de parámetros en un pool de procesos y devuelve la tabla de resultados ordenada.
+
+    Las velas y los indicadores se calculan una vez y se comparten por memoria compartida. Con results_path cada
+    resultado se añade a un fichero JSON lines en cuanto termina, y al relanzar se saltan los candidatos ya evaluados
+    con las mismas velas y la misma configuración base. La tabla solo incluye los candidatos pedidos en esta llamada.
+    """
+    candles = BacktestEngine(**(base_kwargs or {}))._prepare(df)
+    candles_key = data_key(candles)
+    keys = {params_key(params): result_key(params, candles_key, base_kwargs) for params in candidates}
+    # Los que fallaron se vuelven a intentar; los de otras velas, otra configuración u otros candidatos se ignoran
+    wanted = set(keys.values())
+    loaded = {}
+    for result in _load_results(results_path):
+        if not result.get('error') and result.get('key') in wanted:
+            loaded[result['key']] = result
+    results = list(loaded.values())
+    pending = [params for params in candidates if keys[params_key(params)] not in loaded]
+    logging.info(f"Barrido de parámetros: {len(candidates)} candidatos, {len(candidates) - len(pending)} ya evaluados")
+
+    if pending:
+        shared = SharedCandles(candles)
+        try:
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                                     initargs=(shared.name, shared.layout, base_kwargs)) as pool:
+                futures = [pool.submit(_run_candidate, params, keys[params_key(params)]) for params in pending]
+                for completed, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    results.append(result)
+                    if results_path:
+                        with open(results_path, 'a') as f:
+                            f.write(json.dumps(result, default=str) + '\n')
+                    logging.info(f"Backtest {completed}/{len(pending)} terminado: {result.get(sort_by)}")
+        finally:
+            shared.close()
+
+    table = pd.DataFrame(results).drop(columns=['key'], errors='ignore')
+    if sort_by in table.columns:
+        table = table.sort_values(sort_by, ascending=ascending, ignore_index=True)
+    return table
+
+
+def adaptive_search(df, space, rounds=3, samples=20, keep=0.25, shrink=0.5, seed=None, base_kwargs=None,
+                    results_path=None, workers=None, sort_by='return_pct', ascending=False):
+    """Búsqueda adaptativa por rondas sobre el mismo espacio que random_search.
+
+    La primera ronda es aleatoria; las siguientes muestrean alrededor de la fracción keep de mejores resultados, con rangos
+    que se estrechan por shrink en cada ronda. Cada ronda es un run_sweep, así que results_path también permite reanudar.
+    Devuelve la tabla con todos los candidatos evaluados, ordenada.
+    """
+    rng = random.Random(seed)
+    candidates = random_search(space, samples, rng.random())
+    tables = []
+    for round_ in range(rounds):
+        if round_:
+            candidates = [_narrow(space, elites, shrink ** round_, rng) for _ in range(samples)]
+        table = run_sweep(df, candidates, base_kwargs, results_path, workers, sort_by, ascending)
+        tables.append(table)
+        ranked = table[table['error'].isna()] if 'error' in table.columns else table
+        if sort_by not in ranked.columns or ranked.empty:
+            logging.error(f"Búsqueda adaptativa sin resultados válidos en la ronda {round_ + 1}")
+            break
+        ranked = ranked.sort_values(sort_by, ascending=ascending)
+        # Escalares de numpy a tipos de Python para que las claves coincidan con las de los candidatos originales
+        elites = [{name: row[name].item() if isinstance(row[name], np.generic) else row[name] for name in space}
+                  for _, row in ranked.head(max(1, int(len(ranked) * keep))).iterrows()]
+        logging.info(f"Búsqueda adaptativa: ronda {round_ + 1}/{rounds}, mejor {sort_by} {ranked[sort_by].iloc[0]}")
+
+    table = pd.concat(tables, ignore_index=True).drop_duplicates(subset=list(space), ignore_index=True)
+    if sort_by in table.columns:
+        table = table.sort_values(sort_by, ascending=ascending, ignore_index=True)
+    return table
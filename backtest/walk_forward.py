@@ -0,0 +1,95 @@
+import logging
+import pandas as pd
+from backtest.engine import BacktestEngine, BacktestResult
+from backtest.sweep import run_sweep, engine_kwargs
+
+
+def walk_forward_folds(bars, in_sample, out_of_sample, step=None, anchored=False):
+    """Índices (is_start, is_end, oos_start, oos_end) de cada fold; los extremos finales son exclusivos.
+
+    Con anchored=True el tramo in-sample empieza siempre en 0 y crece; si no, es una ventana móvil de in_sample velas.
+    step es el avance entre folds (por defecto out_of_sample, así los tramos out-of-sample no se solapan).
+    """
+    step = step or out_of_sample
+    folds = []
+    is_end = in_sample
+    while is_end + out_of_sample <= bars:
+        is_start = 0 if anchored else is_end - in_sample
+        folds.append((is_start, is_end, is_end, is_end + out_of_sample))
+        is_end += step
+    return folds
+
+
+class WalkForwardResult:
+    """Tabla por fold y resultado out-of-sample encadenado de todos los folds."""
+
+    def __init__(self, folds, out_of_sample):
+        self.folds = folds
+        self.out_of_sample = out_of_sample
+
+    @property
+    def equity(self):
+        return self.out_of_sample.equity
+
+    @property
+    def trades(self):
+        return self.out_of_sample.trades
+
+    def summary(self):
+        return self.out_of_sample.summary()
+
+
+def run_walk_forward(df, candidates, in_sample, out_of_sample, step=None, anchored=False, base_kwargs=None,
+                     workers=None, sort_by='return_pct', ascending=False, min_trades=1):
+    """Optimiza en cada tramo in-sample con run_sweep y evalúa los mejores parámetros en el tramo out-of-sample siguiente.
+
+    Los indicadores se calculan una sola vez sobre todo el histórico y cada fold trabaja con vistas de esas columnas;
+    al ser causales, el arranque de cada tramo ya llega calentado con las velas anteriores.
+    Cada tramo out-of-sample empieza con el capital final del anterior, así que la curva encadenada compone; la
+    posición que siga abierta al final del tramo se cierra en su última vela con comisión y cuenta como operación.
+    """
+    base_kwargs = dict(base_kwargs or {})
+    candles = BacktestEngine(**base_kwargs)._prepare(df)
+    folds = walk_forward_folds(len(candles), in_sample, out_of_sample, step, anchored)
+    if not folds:
+        logging.warning(f"Histórico insuficiente para walk-forward: {len(candles)} velas, se necesitan {in_sample + out_of_sample}")
+        return None
+
+    balance = base_kwargs.get('initial_balance')
+    rows, equities, trades, fills = [], [], [], []
+    for fold, (is_start, is_end, oos_start, oos_end) in enumerate(folds):
+        table = run_sweep(candles.slice(is_start, is_end), candidates, base_kwargs, workers=workers, sort_by=sort_by,
+                          ascending=ascending)
+        eligible = table[table['error'].isna() & (table['trades'] >= min_trades)] if 'trades' in table.columns else table.iloc[:0]
+        if eligible.empty:
+            logging.warning(f"Fold {fold}: ningún candidato válido en el tramo in-sample, se omite")
+            continue
+        best = eligible.iloc[0]
+        params = {name: best[name].item() if hasattr(best[name], 'item') else best[name] for name in candidates[0]}
+
+        oos_kwargs = dict(engine_kwargs(params, base_kwargs), close_at_end=True)
+        if balance is not None:
+            oos_kwargs['initial_balance'] = balance
+        result = BacktestEngine(**oos_kwargs).run(candles.slice(oos_start, oos_end))
+        oos = result.summary()
+        balance = oos['final_equity']
+
+        equities.append(result.equity.assign(fold=fold))
+        trades.append(result.trades.assign(fold=fold))
+        fills.extend(dict(fill, fold=fold) for fill in result.fills)
+        rows.append(dict(
+            fold=fold,
+            is_start=candles.timestamp(is_start), is_end=candles.timestamp(is_end - 1),
+            oos_start=candles.timestamp(oos_start), oos_end=candles.timestamp(oos_end - 1),
+            **params,
+            **{f"is_{name}": best[name] for name in ('return_pct', 'max_drawdown_pct', 'trades', 'win_rate')},
+            **{f"oos_{name}": value for name, value in oos.items()},
+        ))
+        logging.info(f"Fold {fold}: parámetros {params}, in-sample {best[sort_by]}, out-of-sample {oos.get(sort_by)}")
+
+    stitched = BacktestResult(
+        pd.concat(equities, ignore_index=True) if equities else pd.DataFrame(columns=['timestamp', 'close', 'position', 'equity']),
+        pd.concat(trades, ignore_index=True) if trades else pd.DataFrame(),
+        fills,
+    )
+    return WalkForwardResult(pd.DataFrame(rows), stitched)
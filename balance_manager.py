@@ -1,10 +1,14 @@
 import json
 import os
 import logging
+import threading
 
 class BalanceManager:
+    """Balance artificial y operaciones del bot. El bucle principal y el StopMonitor lo comparten desde hilos distintos,
+    así que cada método toma lock; quien encadena varias llamadas (cerrar y actualizar balance) lo toma por fuera."""
 
     def __init__(self, artificial_balance, operations_file='operations.json'):
+        self.lock = threading.RLock()
         self.artificial_balance = artificial_balance['USDT']
         self.operations_file = operations_file
         self.committed_balance = 0
@@ -13,101 +17,114 @@ class BalanceManager:
         self.operations_logger = logging.getLogger('operations')
 
     def load_operations(self):
-        if os.path.exists(self.operations_file):
-            with open(self.operations_file, 'r') as f:
-                self.operations = json.load(f)
-        else:
-            self.operations = []
-            self.save_operations()
+        with self.lock:
+            if os.path.exists(self.operations_file):
+                with open(self.operations_file, 'r') as f:
+                    self.operations = json.load(f)
+            else:
+                self.operations = []
+                self.save_operations()
 
     def save_operations(self):
-        with open(self.operations_file, 'w') as f:
-            json.dump(self.operations, f, indent=4)
+        with self.lock:
+            with open(self.operations_file, 'w') as f:
+                json.dump(self.operations, f, indent=4)
 
     def get_balance(self, current_price=None):
-        available_balance = self.balance.get('USDT', 0)
-        total_committed = 0
-        unrealized_pnl = 0
-
-        if current_price:
-            for op in self.operations:
-                if op['status'] == 'open':
-                    if op['side'] == 'buy':
-                        total_committed += op['size'] * op['price']
-                        pnl = (current_price - op['price']) * op['size']
-                        unrealized_pnl += pnl
-                        logging.info(f"Calculando PnL para operación BUY: Size={op['size']}, EntryPrice={op['price']}, CurrentPrice={current_price}, PnL={pnl} USDT")
-                    elif op['side'] == 'sell':
-                        total_committed += op['size'] * op['price']
-                        pnl = (op['price'] - current_price) * op['size']
-                        unrealized_pnl += pnl
-                        logging.info(f"Calculando PnL para operación SELL: Size={op['size']}, EntryPrice={op['price']}, CurrentPrice={current_price}, PnL={pnl} USDT")
-
-        total_balance = available_balance + unrealized_pnl - total_committed
-        logging.info(f"Balances calculados - Available: {available_balance}, Committed: {total_committed}, PnL: {unrealized_pnl}, Total: {total_balance}")
-        return {
-            'available_balance': available_balance - total_committed,
-            'total_committed': total_committed,
-            'unrealized_pnl': unrealized_pnl,
-            'total_balance': total_balance
-        }
+        with self.lock:
+            available_balance = self.balance.get('USDT', 0)
+            total_committed = 0
+            unrealized_pnl = 0
+
+            if current_price:
+                for op in self.operations:
+                    if op['status'] == 'open':
+                        if op['side'] == 'buy':
+                            total_committed += op['size'] * op['price']
+                            pnl = (current_price - op['price']) * op['size']
+                            unrealized_pnl += pnl
+                            logging.info(f"Calculando PnL para operación BUY: Size={op['size']}, EntryPrice={op['price']}, CurrentPrice={current_price}, PnL={pnl} USDT")
+                        elif op['side'] == 'sell':
+                            total_committed += op['size'] * op['price']
+                            pnl = (op['price'] - current_price) * op['size']
+                            unrealized_pnl += pnl
+                            logging.info(f"Calculando PnL para operación SELL: Size={op['size']}, EntryPrice={op['price']}, CurrentPrice={current_price}, PnL={pnl} USDT")
+
+            total_balance = available_balance + unrealized_pnl - total_committed
+            logging.info(f"Balances calculados - Available: {available_balance}, Committed: {total_committed}, PnL: {unrealized_pnl}, Total: {total_balance}")
+            return {
+                'available_balance': available_balance - total_committed,
+                'total_committed': total_committed,
+                'unrealized_pnl': unrealized_pnl,
+                'total_balance': total_balance
+            }
 
     def update_balance(self, amount, price, side):
-        cost = amount * price
-        if side == 'buy':
-            self.balance['USDT'] -= cost
-        elif side == 'sell':
-            self.balance['USDT'] += cost
+        with self.lock:
+            cost = amount * price
+            if side == 'buy':
+                self.balance['USDT'] -= cost
+            elif side == 'sell':
+                self.balance['USDT'] += cost
 
-        logging.info(f"Updated artificial balance: {self.balance}")
+            logging.info(f"Updated artificial balance: {self.balance}")
 
     def can_trade(self, amount, price, side):
-        cost = amount * price
-        if side == 'buy':
-            return cost <= (self.balance['USDT'] - self.committed_balance)
-        elif side == 'sell':
-            return True
-        return False
+        with self.lock:
+            cost = amount * price
+            if side == 'buy':
+                return cost <= (self.balance['USDT'] - self.committed_balance)
+            elif side == 'sell':
+                return True
+            return False
 
     def commit_balance(self, amount, price):
-        self.committed_balance += amount * price
-        logging.info(f"Committed balance updated: {self.committed_balance}")
+        with self.lock:
+            self.committed_balance += amount * price
+            logging.info(f"Committed balance updated: {self.committed_balance}")
 
     def release_committed_balance(self, amount, price):
-        self.committed_balance -= amount * price
-        logging.info(f"Committed balance released: {self.committed_balance}")
+        with self.lock:
+            self.committed_balance -= amount * price
+            logging.info(f"Committed balance released: {self.committed_balance}")
 
     def add_operation(self, operation):
-        existing_order = next((op for op in self.operations if op['orderId'] == operation['orderId']), None)
-        if existing_order:
-            existing_order.update(operation)
-        else:
-            self.operations.append(operation)
+        with self.lock:
+            existing_order = next((op for op in self.operations if op['orderId'] == operation['orderId']), None)
+            if existing_order:
+                existing_order.update(operation)
+            else:
+                self.operations.append(operation)
 
-        self.save_operations()
-        logging.info(f"Operation added/updated: {operation}")
-        self.operations_logger.info(f"Operation: {operation}")
+            self.save_operations()
+            logging.info(f"Operation added/updated: {operation}")
+            self.operations_logger.info(f"Operation: {operation}")
 
     def close_operation(self, order_id):
-        for operation in self.operations:
-            if operation['orderId'] == order_id and operation['status'] == 'open':
-                operation['status'] = 'closed'
-                break
+        with self.lock:
+            for operation in self.operations:
+                if operation['orderId'] == order_id and operation['status'] == 'open':
+                    operation['status'] = 'closed'
+                    break
 
-        self.save_operations()
-        logging.info(f"Operation closed: {order_id}")
-        self.operations_logger.info(f"Operation closed: {order_id}")
+            self.save_operations()
+            logging.info(f"Operation closed: {order_id}")
+            self.operations_logger.info(f"Operation closed: {order_id}")
 
     def get_operations(self):
-        return self.operations
+        with self.lock:
+            # Copia: el otro hilo puede añadir o limpiar operaciones mientras el llamador la recorre
+            return list(self.operations)
 
     def clean_operations(self):
-        self.operations = [op for op in self.operations if op.get('status') != 'fictitious']
-        self.save_operations()
+        with self.lock:
+            self.operations = [op for op in self.operations if op.get('status') != 'fictitious']
+            self.save_operations()
 
     def format_operations(self):
         """Leer, formatear y guardar el archivo operation.json"""
-        with open(self.operations_file, 'r') as file:
-            operations = json.load(file)
-        with open(self.operations_file, 'w') as file:
-            json.dump(operations, file, indent=4)
+        with self.lock:
+            with open(self.operations_file, 'r') as file:
+                operations = json.load(file)
+            with open(self.operations_file, 'w') as file:
+                json.dump(operations, file, indent=4)
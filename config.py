@@ -1,7 +1,9 @@
 from dotenv import load_dotenv
 import os
-import ccxt
+import json
+import time
 import logging
+import threading
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
@@ -18,6 +20,33 @@ MAX_CAPITAL_USAGE = float(os.getenv('MAX_CAPITAL_USAGE'))
 LEVERAGE = int(os.getenv('LEVERAGE'))
 MARGIN_TYPE = os.getenv('MARGIN_TYPE')  # Añadir tipo de margen
 
+# Universo de símbolos para escaneos multi-símbolo (separados por comas)
+SYMBOLS = [s.strip() for s in os.getenv('SYMBOLS', '').split(',') if s.strip()]
+FETCH_MAX_CONCURRENCY = int(os.getenv('FETCH_MAX_CONCURRENCY', 10))
+FETCH_REQUESTS_PER_SECOND = float(os.getenv('FETCH_REQUESTS_PER_SECOND', 15))
+
+# Directorio del almacén persistente de velas (vacío = desactivado)
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR')
+
+# Stream de precios por WebSocket (opcional) y antigüedad máxima aceptada de un ticker
+MARKET_STREAM_ENABLED = os.getenv('MARKET_STREAM_ENABLED', 'false').lower() == 'true'
+MARKET_STREAM_MAX_AGE_MS = int(os.getenv('MARKET_STREAM_MAX_AGE_MS', 5000))
+
+# Caché de metadata de símbolos (incrementos, tamaños mínimos, multiplicadores)
+SYMBOL_METADATA_CACHE_PATH = os.getenv('SYMBOL_METADATA_CACHE_PATH', 'symbol_metadata.json')
+SYMBOL_METADATA_TTL = int(os.getenv('SYMBOL_METADATA_TTL', 3600))
+
+# Antigüedad máxima (ms) de un precio reutilizado dentro de un mismo ciclo de decisión
+PRICE_MAX_AGE_MS = int(os.getenv('PRICE_MAX_AGE_MS', 1000))
+
+# Timeframes mayores que se agregan localmente a partir del TIMEFRAME base (vacío para desactivar)
+MTF_TIMEFRAMES = [tf.strip() for tf in os.getenv('MTF_TIMEFRAMES', '5m,15m,1h,4h,1d').split(',') if tf.strip()]
+MTF_CAPACITY = int(os.getenv('MTF_CAPACITY', 1000))
+
+# Memoización de indicadores: entradas en memoria y directorio opcional para el nivel en disco
+FEATURE_CACHE_SIZE = int(os.getenv('FEATURE_CACHE_SIZE', 64))
+FEATURE_CACHE_DIR = os.getenv('FEATURE_CACHE_DIR')
+
 # Factores de escala para diferentes timeframes
 TIMEFRAME_SCALING_FACTORS = {
     '1m': 0.5,
@@ -51,15 +80,41 @@ BASE_URL_SPOT = 'https://api.kucoin.com'
 BASE_URL_FUTURES = 'https://api-futures.kucoin.com'
 BASE_URL_MARGIN = 'https://api.kucoin.com'
 
-# Inicialización del exchange según el tipo de cuenta
-try:
+# Pool de conexiones HTTP compartido para las llamadas REST a KuCoin
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 10))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.3))
+
+# Cuotas de peso de KuCoin por grupo de endpoints dentro de cada ventana
+RATE_LIMIT_WINDOW_MS = int(os.getenv('RATE_LIMIT_WINDOW_MS', 30000))
+RATE_LIMIT_PUBLIC = int(os.getenv('RATE_LIMIT_PUBLIC', 2000))
+RATE_LIMIT_SPOT = int(os.getenv('RATE_LIMIT_SPOT', 4000))
+RATE_LIMIT_FUTURES = int(os.getenv('RATE_LIMIT_FUTURES', 2000))
+RATE_LIMIT_RETRIES = int(os.getenv('RATE_LIMIT_RETRIES', 2))
+
+# Snapshot en disco de los mercados cargados, reutilizado en el siguiente arranque
+MARKETS_SNAPSHOT_PATH = os.getenv('MARKETS_SNAPSHOT_PATH', 'markets_snapshot.json')
+MARKETS_SNAPSHOT_VERSION = 1
+
+if ACCOUNT_TYPE == 'futures':
+    symbol = SYMBOL_FUTURES
+elif ACCOUNT_TYPE == 'margin':
+    symbol = SYMBOL_MARGIN
+else:
+    symbol = SYMBOL_SPOT
+
+
+def _create_exchange():
+    # ccxt se importa aquí para no pagar su coste al importar config
+    import ccxt
+
     if ACCOUNT_TYPE == 'futures':
         exchange = ccxt.kucoinfutures({
             'apiKey': KUCOIN_API_KEY,
             'secret': KUCOIN_API_SECRET,
             'password': KUCOIN_API_PASSPHRASE,
         })
-        symbol = SYMBOL_FUTURES
         print("Futures account initialized.")
     elif ACCOUNT_TYPE == 'margin':
         exchange = ccxt.kucoin({
@@ -70,7 +125,6 @@ try:
                 'defaultType': 'margin',
             }
         })
-        symbol = SYMBOL_MARGIN
         print("Margin account initialized.")
     else:
         exchange = ccxt.kucoin({
@@ -78,19 +132,85 @@ try:
             'secret': KUCOIN_API_SECRET,
             'password': KUCOIN_API_PASSPHRASE,
         })
-        symbol = SYMBOL_SPOT
         print("Spot account initialized.")
+    return exchange
+
+
+def _snapshot_key(exchange):
+    import ccxt
+
+    return {'version': MARKETS_SNAPSHOT_VERSION, 'ccxt': ccxt.__version__, 'exchange': exchange.id, 'account_type': ACCOUNT_TYPE}
+
+
+def _load_markets_snapshot(exchange):
+    if not MARKETS_SNAPSHOT_PATH or not os.path.exists(MARKETS_SNAPSHOT_PATH):
+        return False
+    try:
+        with open(MARKETS_SNAPSHOT_PATH, 'r') as f:
+            snapshot = json.load(f)
+        if snapshot.get('key') != _snapshot_key(exchange):
+            logging.info("Snapshot de mercados de otra versión; se descarta.")
+            return False
+        exchange.set_markets(snapshot['markets'], snapshot.get('currencies'))
+        print("Markets loaded from snapshot.")
+        return True
+    except Exception as e:
+        logging.error(f"Error leyendo el snapshot de mercados: {e}")
+        return False
+
+
+def _save_markets_snapshot(exchange):
+    if not MARKETS_SNAPSHOT_PATH:
+        return
+    try:
+        tmp_path = MARKETS_SNAPSHOT_PATH + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': _snapshot_key(exchange), 'saved_at': time.time(),
+                       'markets': exchange.markets, 'currencies': exchange.currencies}, f)
+        os.replace(tmp_path, MARKETS_SNAPSHOT_PATH)
+    except Exception as e:
+        logging.error(f"Error guardando el snapshot de mercados: {e}")
+
+
+def _refresh_markets(exchange):
+    try:
+        exchange.load_markets(reload=True)
+        _save_markets_snapshot(exchange)
+        print("Markets loaded.")
+    except Exception as e:
+        logging.error(f"Error loading markets: {e}")
+
+
+_exchange = None
+_exchange_lock = threading.Lock()
+
+
+def get_exchange():
+    """Construye el exchange la primera vez que se usa; los mercados salen del snapshot y se refrescan en segundo plano."""
+    global _exchange
+    if _exchange is None:
+        with _exchange_lock:
+            if _exchange is None:
+                exchange = _create_exchange()
+                if _load_markets_snapshot(exchange):
+                    threading.Thread(target=_refresh_markets, args=(exchange,), name='markets-refresh', daemon=True).start()
+                else:
+                    # Sin red no se aborta: ccxt volverá a cargar los mercados en la primera llamada
+                    _refresh_markets(exchange)
+                _exchange = exchange
+    return _exchange
+
+
+class _LazyExchange:
+    def __getattr__(self, name):
+        return getattr(get_exchange(), name)
 
-    exchange.load_markets()
-    print("Markets loaded.")
+    def __repr__(self):
+        return f"<LazyExchange {ACCOUNT_TYPE}>"
 
-except Exception as e:
-    logging.error(f"Error initializing exchange: {e}")
-    print(f"Error initializing exchange: {e}")
-    raise
 
 # Exportar exchange y symbol para uso en otros módulos
-EXCHANGE = exchange
+EXCHANGE = _LazyExchange()
 SYMBOL = symbol
 
 # Balance artificial en USDT
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import ccxt
+import pandas as pd
+from config import CANDLE_STORE_DIR, FETCH_MAX_CONCURRENCY
+from data.candle_store import CandleStore
+from data.multi_fetcher import build_async_exchange
+from kucoin_rate_limiter import rate_limiter, PRIORITY_MARKET_DATA
+
+# Máximo de velas que devuelve KuCoin por petición
+PAGE_SIZE = 1500
+MAX_CHUNK_RETRIES = 5
+
+
+def split_range(start_ms, end_ms, timeframe_ms, page_size=PAGE_SIZE):
+    step = timeframe_ms * page_size
+    return [(chunk_start, min(chunk_start + step, end_ms)) for chunk_start in range(start_ms, end_ms, step)]
+
+
+class BackfillCheckpoint:
+    """Registro en disco de los tramos ya guardados para reanudar una descarga interrumpida."""
+
+    def __init__(self, path, start_ms, end_ms, page_size):
+        self.path = path
+        self.key = f"{start_ms}-{end_ms}-{page_size}"
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get('key') == self.key:
+                self.done = set(state.get('done', []))
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': self.key, 'done': sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+
+
+async def _fetch_chunk(exchange, symbol, timeframe, chunk_start, chunk_end, page_size):
+    for attempt in range(MAX_CHUNK_RETRIES):
+        try:
+            await rate_limiter.acquire_async('public', 3, PRIORITY_MARKET_DATA)
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=chunk_start, limit=page_size)
+            return [candle for candle in ohlcv if chunk_start <= candle[0] < chunk_end]
+        except ccxt.NetworkError as e:
+            wait = 2 ** attempt
+            logging.warning(f"Error de red en el tramo {chunk_start} de {symbol}, reintento en {wait} s: {e}")
+            await asyncio.sleep(wait)
+    raise RuntimeError(f"No se pudo descargar el tramo {chunk_start}-{chunk_end} de {symbol}")
+
+
+async def backfill_async(symbol, timeframe, start, end, store, exchange=None, base_url=None,
+                         max_concurrency=FETCH_MAX_CONCURRENCY, page_size=PAGE_SIZE, flush_every=20):
+    timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    start_ms = int(pd.Timestamp(start).value // 1_000_000) // timeframe_ms * timeframe_ms
+    end_ms = int(pd.Timestamp(end).value // 1_000_000)
+    chunks = split_range(start_ms, end_ms, timeframe_ms, page_size)
+
+    os.makedirs(store.partition_dir(symbol, timeframe), exist_ok=True)
+    checkpoint = BackfillCheckpoint(os.path.join(store.partition_dir(symbol, timeframe), 'backfill_checkpoint.json'),
+                                    start_ms, end_ms, page_size)
+    pending = [chunk for chunk in chunks if chunk[0] not in checkpoint.done]
+    logging.info(f"Backfill {symbol} {timeframe}: {len(chunks)} tramos, {len(chunks) - len(pending)} ya completados")
+
+    owns_exchange = exchange is None
+    if owns_exchange:
+        exchange = build_async_exchange(base_url)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def worker(index, chunk):
+        async with semaphore:
+            return index, await _fetch_chunk(exchange, symbol, timeframe, chunk[0], chunk[1], page_size)
+
+    # Los tramos se guardan en orden para que el almacén solo tenga que añadir al final
+    results, next_index, buffered, written, tasks = {}, 0, [], 0, []
+    started_at = time.perf_counter()
+    try:
+        if exchange.markets is None:
+            await exchange.load_markets()
+        tasks = [asyncio.ensure_future(worker(i, chunk)) for i, chunk in enumerate(pending)]
+        for future in asyncio.as_completed(tasks):
+            index, candles = await future
+            results[index] = candles
+            while next_index in results:
+                buffered.append((pending[next_index][0], results.pop(next_index)))
+                next_index += 1
+            if len(buffered) >= flush_every or next_index == len(pending):
+                written += _flush(store, symbol, timeframe, buffered, checkpoint)
+                buffered = []
+    finally:
+        for task in tasks:
+            task.cancel()
+        if buffered:
+            written += _flush(store, symbol, timeframe, buffered, checkpoint)
+        if owns_exchange:
+            await exchange.close()
+
+    gaps = store.find_gaps(symbol, timeframe, timeframe_ms, start_ms, end_ms)
+    elapsed = time.perf_counter() - started_at
+    logging.info(f"Backfill {symbol} {timeframe} terminado en {elapsed:.1f} s: {written} velas nuevas, {len(gaps)} huecos")
+    for gap_start, gap_end in gaps[:20]:
+        logging.warning(f"Hueco en {symbol} {timeframe}: {pd.Timestamp(gap_start, unit='ms')} - {pd.Timestamp(gap_end, unit='ms')}")
+    return {'written': written, 'chunks': len(chunks), 'gaps': gaps, 'elapsed': elapsed}
+
+
+def _flush(store, symbol, timeframe, buffered, checkpoint):
+    candles = [candle for _, chunk in buffered for candle in chunk]
+    written = store.append(symbol, timeframe, candles) if candles else 0
+    checkpoint.done.update(chunk_start for chunk_start, _ in buffered)
+    checkpoint.save()
+    return written
+
+
+def backfill(symbol, timeframe, start, end, store_dir=None, **kwargs):
+    store = CandleStore(store_dir or CANDLE_STORE_DIR)
+    return asyncio.run(backfill_async(symbol, timeframe, start, end, store, **kwargs))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Descarga histórica de velas de KuCoin al almacén local")
+    parser.add_argument('symbol')
+    parser.add_argument('timeframe')
+    parser.add_argument('start')
+    parser.add_argument('end')
+    parser.add_argument('--store', default=CANDLE_STORE_DIR)
+    parser.add_argument('--concurrency', type=int, default=FETCH_MAX_CONCURRENCY)
+    parser.add_argument('--base-url', default=None, help="URL alternativa (servidor local de pruebas)")
+    args = parser.parse_args()
+    if not args.store:
+        sys.exit("Indica --store o define CANDLE_STORE_DIR")
+    backfill(args.symbol, args.timeframe, args.start, args.end, args.store, base_url=args.base_url, max_concurrency=args.concurrency)
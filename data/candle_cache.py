@@ -0,0 +1,159 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import ccxt
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def _columns_to_frame(timestamps, values):
+    return pd.DataFrame({
+        'timestamp': timestamps.astype('datetime64[ms]'),
+        'open': values[:, 0],
+        'high': values[:, 1],
+        'low': values[:, 2],
+        'close': values[:, 3],
+        'volume': values[:, 4],
+    })
+
+
+def ohlcv_to_frame(ohlcv):
+    """Convierte la lista de velas de ccxt al mismo formato de DataFrame que devuelve la caché."""
+    candles = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+    return _columns_to_frame(candles[:, 0].astype(np.int64), candles[:, 1:6])
+
+
+class CandleBuffer:
+    """Buffer circular de velas con almacenamiento contiguo (timestamps int64 en ms, OHLCV float64)."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # El doble de capacidad permite añadir en O(1) amortizado y devolver siempre slices contiguos
+        self.timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self.values = np.zeros((2 * capacity, 5), dtype=np.float64)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    @property
+    def last_timestamp(self):
+        if self.end == self.start:
+            return None
+        return int(self.timestamps[self.end - 1])
+
+    def _compact(self):
+        size = len(self)
+        self.timestamps[:size] = self.timestamps[self.start:self.end]
+        self.values[:size] = self.values[self.start:self.end]
+        self.start, self.end = 0, size
+
+    def _append(self, timestamp, row):
+        if self.end == len(self.timestamps):
+            self._compact()
+        self.timestamps[self.end] = timestamp
+        self.values[self.end] = row
+        self.end += 1
+        if len(self) > self.capacity:
+            self.start += 1
+
+    def merge(self, ohlcv):
+        """Incorpora velas nuevas: reemplaza la vela en formación y añade las posteriores."""
+        if not ohlcv:
+            return 0
+        candles = np.asarray(ohlcv, dtype=np.float64)
+        candles = candles[np.argsort(candles[:, 0], kind='stable')]
+        added = 0
+        for candle in candles:
+            timestamp = int(candle[0])
+            last = self.last_timestamp
+            if last is not None and timestamp < last:
+                continue
+            if last is not None and timestamp == last:
+                self.values[self.end - 1] = candle[1:6]
+            else:
+                self._append(timestamp, candle[1:6])
+                added += 1
+        return added
+
+    def view(self, limit=None):
+        start = self.start if limit is None else max(self.start, self.end - limit)
+        return self.timestamps[start:self.end], self.values[start:self.end]
+
+    def to_frame(self, limit=None):
+        timestamps, values = self.view(limit)
+        return _columns_to_frame(timestamps, values)
+
+
+class CandleCache:
+    """Caché en memoria de velas por (symbol, timeframe) que solo descarga las velas nuevas."""
+
+    def __init__(self, exchange, store=None):
+        self.exchange = exchange
+        # Almacén persistente opcional donde se guardan todas las velas recibidas
+        self.store = store
+        # Callbacks (symbol, timeframe, ohlcv, full_load) para consumidores incrementales
+        self._listeners = []
+        self._buffers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _key_lock(self, key):
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.RLock()
+            return self._locks[key]
+
+    def _needs_full_load(self, buffer, timeframe, limit):
+        if buffer is None or limit > buffer.capacity:
+            return True
+        # Si el hueco desde la última vela supera el buffer, la descarga incremental no enlazaría
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        elapsed_bars = (self.exchange.milliseconds() - buffer.last_timestamp) // timeframe_ms
+        return elapsed_bars >= buffer.capacity
+
+    def get_buffer(self, symbol, timeframe, limit):
+        key = (symbol, timeframe)
+        with self._key_lock(key):
+            buffer = self._buffers.get(key)
+            if self._needs_full_load(buffer, timeframe, limit):
+                logging.info(f"Carga completa de velas para {symbol} {timeframe} (limit {limit})")
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                buffer = CandleBuffer(limit)
+                buffer.merge(ohlcv)
+                self._buffers[key] = buffer
+                full_load = True
+            else:
+                since = buffer.last_timestamp
+                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+                added = buffer.merge(ohlcv)
+                logging.info(f"Velas incrementales para {symbol} {timeframe}: {len(ohlcv)} recibidas, {added} nuevas")
+                full_load = False
+            self._persist(symbol, timeframe, ohlcv)
+            for listener in self._listeners:
+                listener(symbol, timeframe, ohlcv, full_load)
+            return buffer
+
+    def _persist(self, symbol, timeframe, ohlcv):
+        if self.store is None or not ohlcv:
+            return
+        try:
+            self.store.append(symbol, timeframe, ohlcv)
+        except Exception as e:
+            logging.error(f"Error guardando velas de {symbol} {timeframe} en disco: {e}")
+
+    def get_frame(self, symbol, timeframe, limit):
+        # La copia se hace con el lock de la clave: un refresco concurrente no puede mover el buffer a mitad de copia
+        with self._key_lock((symbol, timeframe)):
+            return self.get_buffer(symbol, timeframe, limit).to_frame(limit)
+
+    def invalidate(self, symbol=None, timeframe=None):
+        with self._lock:
+            for key in list(self._buffers):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    del self._buffers[key]
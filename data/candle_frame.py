@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleFrame:
+    """Velas y features en columnas NumPy contiguas: timestamps int64 en ms, precios float64,
+    features float64 o float32 y patrones bool o máscaras enteras. Acceso escalar O(1) y DataFrame solo en los extremos."""
+
+    def __init__(self, timestamps, columns, attrs=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.columns = columns
+        # Valores constantes para todo el frame (p. ej. la recomendación de GPT-4)
+        self.attrs = attrs or {}
+
+    @classmethod
+    def from_frame(cls, df, feature_dtype=np.float64, attrs=None):
+        """Convierte un DataFrame de velas; las columnas float64 se comparten sin copia cuando pandas lo permite."""
+        timestamps = df['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = timestamps.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        else:
+            timestamps = pd.to_datetime(timestamps).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        columns = {}
+        for name in df.columns:
+            if name == 'timestamp':
+                continue
+            values = df[name].to_numpy()
+            if values.dtype == np.bool_ or (np.issubdtype(values.dtype, np.integer) and name not in PRICE_COLUMNS):
+                # Patrones bool y máscaras de bits (PatternMask) se conservan tal cual
+                columns[name] = values
+            elif np.issubdtype(values.dtype, np.number):
+                dtype = np.float64 if name in PRICE_COLUMNS else feature_dtype
+                columns[name] = values.astype(dtype, copy=False)
+            else:
+                columns[name] = values
+        return cls(timestamps, columns, attrs)
+
+    @classmethod
+    def from_buffer(cls, buffer, limit=None, attrs=None):
+        """Vista sin copia de un CandleBuffer de la caché de velas."""
+        timestamps, values = buffer.view(limit)
+        columns = {name: values[:, i] for i, name in enumerate(PRICE_COLUMNS)}
+        return cls(timestamps, columns, attrs)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __contains__(self, name):
+        return name in self.columns or name in self.attrs
+
+    def __getitem__(self, name):
+        if name == 'timestamp':
+            return self.timestamps
+        return self.columns[name]
+
+    def value(self, name, index=-1):
+        """Valor escalar de una columna en una fila (o el atributo constante del mismo nombre)."""
+        column = self.columns.get(name)
+        if column is None:
+            return self.attrs[name]
+        value = column[index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def timestamp(self, index=-1):
+        return pd.Timestamp(int(self.timestamps[index]), unit='ms')
+
+    def with_features(self, features, feature_dtype=None):
+        """Frame nuevo que comparte las columnas existentes y añade (o reemplaza) las indicadas."""
+        columns = dict(self.columns)
+        for name, values in features.items():
+            values = np.asarray(values)
+            if feature_dtype is not None and np.issubdtype(values.dtype, np.floating):
+                values = values.astype(feature_dtype, copy=False)
+            columns[name] = values
+        return CandleFrame(self.timestamps, columns, dict(self.attrs))
+
+    def slice(self, start, stop=None):
+        """Vista de las filas [start, stop) sin copiar las columnas."""
+        window = slice(start, stop)
+        return CandleFrame(self.timestamps[window], {name: values[window] for name, values in self.columns.items()},
+                           dict(self.attrs))
+
+    def tail(self, limit):
+        return CandleFrame(self.timestamps[-limit:], {name: values[-limit:] for name, values in self.columns.items()},
+                           dict(self.attrs))
+
+    @property
+    def nbytes(self):
+        return self.timestamps.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def to_frame(self):
+        data = {'timestamp': self.timestamps.astype('datetime64[ms]')}
+        data.update(self.columns)
+        df = pd.DataFrame(data)
+        for name, value in self.attrs.items():
+            df[name] = value
+        return df
+
+
+def as_candle_frame(data):
+    return data if isinstance(data, CandleFrame) else CandleFrame.from_frame(data)
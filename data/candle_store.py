@@ -0,0 +1,175 @@
+import os
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+# Cada columna se guarda en un fichero binario plano para poder abrirlo con np.memmap
+COLUMN_DTYPES = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+COLUMN_EXTENSIONS = {'timestamp': '.i8', 'open': '.f8', 'high': '.f8', 'low': '.f8', 'close': '.f8', 'volume': '.f8'}
+
+
+def _to_millis(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def _normalize_candles(ohlcv):
+    """Convierte velas (lista ccxt, array (n, 6) o DataFrame) a columnas ordenadas y sin timestamps duplicados."""
+    if isinstance(ohlcv, pd.DataFrame):
+        timestamps = ohlcv['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = timestamps.astype('datetime64[ms]').astype(np.int64)
+        columns = {'timestamp': np.asarray(timestamps, dtype=np.int64)}
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            columns[name] = np.asarray(ohlcv[name], dtype=np.float64)
+    else:
+        candles = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        columns = {'timestamp': candles[:, 0].astype(np.int64)}
+        for position, name in enumerate(('open', 'high', 'low', 'close', 'volume'), start=1):
+            columns[name] = candles[:, position]
+
+    # En caso de timestamps repetidos se conserva la última versión de la vela
+    timestamps = columns['timestamp']
+    order = np.argsort(timestamps, kind='stable')
+    sorted_timestamps = timestamps[order]
+    keep = np.append(sorted_timestamps[1:] != sorted_timestamps[:-1], True) if len(order) else np.zeros(0, dtype=bool)
+    order = order[keep]
+    return {name: values[order] for name, values in columns.items()}
+
+
+class CandleStore:
+    """Almacén columnar en disco particionado por símbolo y timeframe."""
+
+    def __init__(self, root):
+        self.root = root
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def partition_dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol.replace('/', '-').replace(':', '_'), timeframe)
+
+    def _column_path(self, symbol, timeframe, name):
+        return os.path.join(self.partition_dir(symbol, timeframe), name + COLUMN_EXTENSIONS[name])
+
+    def _partition_lock(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _open_column(self, symbol, timeframe, name, mode='r'):
+        path = self._column_path(symbol, timeframe, name)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=COLUMN_DTYPES[name])
+        return np.memmap(path, dtype=COLUMN_DTYPES[name], mode=mode)
+
+    def partitions(self):
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol_dir in sorted(os.listdir(self.root)):
+            symbol_path = os.path.join(self.root, symbol_dir)
+            if os.path.isdir(symbol_path):
+                result.extend((symbol_dir, timeframe) for timeframe in sorted(os.listdir(symbol_path)))
+        return result
+
+    def count(self, symbol, timeframe):
+        path = self._column_path(symbol, timeframe, 'timestamp')
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def last_timestamp(self, symbol, timeframe):
+        timestamps = self._open_column(symbol, timeframe, 'timestamp')
+        return int(timestamps[-1]) if len(timestamps) else None
+
+    def append(self, symbol, timeframe, ohlcv):
+        """Añade velas a la partición; las velas con timestamp ya existente se sobrescriben."""
+        new = _normalize_candles(ohlcv)
+        if not len(new['timestamp']):
+            return 0
+        with self._partition_lock(symbol, timeframe):
+            os.makedirs(self.partition_dir(symbol, timeframe), exist_ok=True)
+            stored = self._open_column(symbol, timeframe, 'timestamp')
+            last = int(stored[-1]) if len(stored) else None
+
+            overlap = 0 if last is None else int(np.searchsorted(new['timestamp'], last, side='right'))
+            if overlap:
+                positions = np.searchsorted(stored, new['timestamp'][:overlap])
+                positions = np.minimum(positions, len(stored) - 1)
+                if not np.array_equal(stored[positions], new['timestamp'][:overlap]):
+                    # Velas antiguas que faltaban: se reescribe la partición completa
+                    return self._rewrite(symbol, timeframe, new)
+                # Caso habitual: se revisa la última vela (todavía en formación) en el sitio
+                for name in COLUMN_DTYPES:
+                    if name == 'timestamp':
+                        continue
+                    column = self._open_column(symbol, timeframe, name, mode='r+')
+                    column[positions] = new[name][:overlap]
+                    column.flush()
+                    del column
+
+            appended = len(new['timestamp']) - overlap
+            if appended:
+                for name, dtype in COLUMN_DTYPES.items():
+                    with open(self._column_path(symbol, timeframe, name), 'ab') as f:
+                        f.write(np.ascontiguousarray(new[name][overlap:], dtype=dtype).tobytes())
+            return appended
+
+    def _rewrite(self, symbol, timeframe, new):
+        stored = self.load_range(symbol, timeframe)
+        merged = _normalize_candles(pd.DataFrame({
+            name: np.concatenate([np.asarray(stored[name]), new[name]]) for name in COLUMN_DTYPES
+        }))
+        added = len(merged['timestamp']) - len(stored['timestamp'])
+        for name, dtype in COLUMN_DTYPES.items():
+            path = self._column_path(symbol, timeframe, name)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(np.ascontiguousarray(merged[name], dtype=dtype).tobytes())
+            os.replace(tmp_path, path)
+        logging.info(f"Partición {symbol} {timeframe} reescrita con {len(merged['timestamp'])} velas")
+        return added
+
+    def find_gaps(self, symbol, timeframe, timeframe_ms, start=None, end=None):
+        """Devuelve los huecos [(desde, hasta)] en ms donde faltan velas dentro del rango."""
+        timestamps = np.asarray(self.load_range(symbol, timeframe, start, end)['timestamp'])
+        start_ms, end_ms = _to_millis(start), _to_millis(end)
+        gaps = []
+        if not len(timestamps):
+            if start_ms is not None and end_ms is not None and end_ms > start_ms:
+                gaps.append((start_ms, end_ms))
+            return gaps
+        if start_ms is not None and timestamps[0] > start_ms:
+            gaps.append((start_ms, int(timestamps[0])))
+        jumps = np.nonzero(np.diff(timestamps) > timeframe_ms)[0]
+        gaps.extend((int(timestamps[i]) + timeframe_ms, int(timestamps[i + 1])) for i in jumps)
+        if end_ms is not None and timestamps[-1] + timeframe_ms < end_ms:
+            gaps.append((int(timestamps[-1]) + timeframe_ms, end_ms))
+        return gaps
+
+    def load_range(self, symbol, timeframe, start=None, end=None, as_frame=False):
+        """Devuelve las velas con start <= timestamp < end como arrays mapeados en memoria (sin copia)."""
+        timestamps = self._open_column(symbol, timeframe, 'timestamp')
+        start_ms, end_ms = _to_millis(start), _to_millis(end)
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side='left'))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side='left'))
+        hi = max(lo, hi)
+        columns = {'timestamp': timestamps[lo:hi]}
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            columns[name] = self._open_column(symbol, timeframe, name)[lo:hi]
+        if as_frame:
+            frame = pd.DataFrame({name: np.asarray(values) for name, values in columns.items()})
+            frame['timestamp'] = frame['timestamp'].astype('datetime64[ms]')
+            return frame
+        return columns
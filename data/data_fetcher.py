@@ -2,14 +2,34 @@ import pandas as pd
 import logging
 import json
 import os
-import requests
 import datetime
 import ccxt
 import uuid  # Import the uuid module
 import time
-from config import EXCHANGE, SYMBOL, RISK_PER_TRADE, SYMBOL_SPOT, ACCOUNT_TYPE, MARGIN_TYPE, BASE_URL_FUTURES, ARTIFICIAL_BALANCE
+from config import EXCHANGE, SYMBOL, RISK_PER_TRADE, SYMBOL_SPOT, ACCOUNT_TYPE, MARGIN_TYPE, BASE_URL_FUTURES, ARTIFICIAL_BALANCE, CANDLE_STORE_DIR, BASE_URL_SPOT
+from config import MARKET_STREAM_ENABLED, MARKET_STREAM_MAX_AGE_MS, SYMBOL_METADATA_CACHE_PATH, SYMBOL_METADATA_TTL, PRICE_MAX_AGE_MS
+from config import TIMEFRAME, MTF_TIMEFRAMES, MTF_CAPACITY
 from kucoin_requests import KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE
 from kucoin_requests import get_kucoin_headers, get_base_url
+from kucoin_client import http_client
+from data.candle_cache import CandleCache
+from data.candle_store import CandleStore
+from data.market_stream import MarketStream
+from data.symbol_metadata import SymbolMetadataCache
+from data.price_service import PriceService
+from indicators.streaming_indicators import IndicatorEngine
+from data.multi_timeframe import MultiTimeframePipeline
+
+candle_store = CandleStore(CANDLE_STORE_DIR) if CANDLE_STORE_DIR else None
+candle_cache = CandleCache(EXCHANGE, store=candle_store)
+indicator_engine = IndicatorEngine()
+candle_cache.add_listener(indicator_engine.on_candles)
+# Los timeframes mayores se derivan de las velas base ya descargadas, sin peticiones extra
+mtf_pipeline = MultiTimeframePipeline(TIMEFRAME, MTF_TIMEFRAMES, MTF_CAPACITY) if MTF_TIMEFRAMES and TIMEFRAME else None
+if mtf_pipeline is not None:
+    candle_cache.add_listener(mtf_pipeline.on_candles)
+symbol_metadata = SymbolMetadataCache(SYMBOL_METADATA_CACHE_PATH, ttl=SYMBOL_METADATA_TTL)
+market_stream = MarketStream(get_base_url(), futures=ACCOUNT_TYPE == 'futures') if MARKET_STREAM_ENABLED else None
 
 
 def log_account_type(account_type):
@@ -21,22 +41,31 @@ def log_account_type(account_type):
 def get_market_data(symbol=SYMBOL, timeframe='1h', limit=200):
     try:
         logging.info(f"Fetching market data for {symbol} with timeframe {timeframe} and limit {limit}")
-        ohlcv = EXCHANGE.fetch_ohlcv(symbol, timeframe, limit=limit)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        logging.info(f"Market data fetched for {symbol}: {df.head()}")
+        # Solo se descargan las velas posteriores a la última almacenada en la caché
+        df = candle_cache.get_frame(symbol, timeframe, limit)
+        logging.info(f"Market data fetched for {symbol}: {df.tail()}")
 
-        # Convertir los timestamps a cadenas de texto
+        # Convertir los timestamps a cadenas de texto, como antes de la caché
         df['timestamp'] = df['timestamp'].astype(str)
-
-        # Convertir DataFrame a lista de diccionarios
-        data = df.to_dict(orient='records')
-
         return df
     except Exception as e:
         logging.error(f"Error fetching market data for {symbol}: {e}")
         return None
 
+def get_multi_timeframe_view(symbol=SYMBOL, features=None):
+    # Velas base con los indicadores de los timeframes mayores ya cerrados (None si no hay pipeline o velas)
+    if mtf_pipeline is None:
+        return None
+    try:
+        return mtf_pipeline.joined_view(symbol, features)
+    except Exception as e:
+        logging.error(f"Error construyendo la vista multi-timeframe de {symbol}: {e}")
+        return None
+
+def get_latest_indicators(symbol=SYMBOL, timeframe='1h'):
+    # Valores de la última vela mantenidos en O(1) por el motor incremental (None si aún no hay velas)
+    return indicator_engine.values(symbol, timeframe)
+
 def log_operation(operation):
     log_file_path = '/Volumes/morespace/trading_bot_ui/operation_logs.json'
     logs = []
@@ -109,13 +138,9 @@ def update_artificial_balance(order_response, side):
 
 def get_increment(symbol):
     try:
-        url = "https://api.kucoin.com/api/v1/symbols"
-        response = requests.get(url)
-        if response.status_code == 200:
-            symbols_info = response.json()
-            for s in symbols_info['data']:
-                if s['symbol'] == symbol:
-                    return float(s['quoteIncrement'])
+        metadata = symbol_metadata.get(symbol)
+        if metadata is not None and 'quoteIncrement' in metadata:
+            return metadata['quoteIncrement']
         logging.error(f"Symbol {symbol} not found in market information.")
         return None
     except Exception as e:
@@ -187,7 +212,7 @@ def place_order(client_oid, symbol, side, order_type, size, price=None, leverage
 
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'POST', endpoint, json.dumps(body))
     
-    response = requests.post(base_url + endpoint, headers=headers, json=body)
+    response = http_client.post(base_url, endpoint, headers=headers, json=body)
     return response.json()
 
 
@@ -196,7 +221,6 @@ def place_order(client_oid, symbol, side, order_type, size, price=None, leverage
 
 def place_order_futures(symbol, order_type, side, amount, price=None, stop_price=None, stop_price_type=None):
     try:
-        url = "https://api-futures.kucoin.com/api/v1/orders"
         data = {
             'clientOid': str(uuid.uuid4()),
             'symbol': symbol,
@@ -217,7 +241,7 @@ def place_order_futures(symbol, order_type, side, amount, price=None, stop_price
         
         logging.info(f"Headers: {headers}")
         logging.info(f"Sending order data: {data}")
-        response = requests.post(url, headers=headers, data=body)
+        response = http_client.post(BASE_URL_FUTURES, '/api/v1/orders', headers=headers, data=body)
         if response.status_code == 200:
             order = response.json()
             logging.info(f"Orden colocada: {order}")
@@ -232,10 +256,10 @@ def place_order_futures(symbol, order_type, side, amount, price=None, stop_price
 
 def cancel_order(order_id):
     try:
-        url = f"https://api.kucoin.com/api/v1/orders/{order_id}"
-        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'DELETE', f'/api/v1/orders/{order_id}')
+        endpoint = f'/api/v1/orders/{order_id}'
+        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'DELETE', endpoint)
         
-        response = requests.delete(url, headers=headers)
+        response = http_client.delete(BASE_URL_SPOT, endpoint, headers=headers)
         if response.status_code == 200:
             result = response.json()
             logging.info(f"Order cancelled: {result}")
@@ -249,10 +273,10 @@ def cancel_order(order_id):
 
 def get_order_status(order_id):
     try:
-        url = f"https://api.kucoin.com/api/v1/orders/{order_id}"
-        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', f'/api/v1/orders/{order_id}')
+        endpoint = f'/api/v1/orders/{order_id}'
+        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get(BASE_URL_SPOT, endpoint, headers=headers)
         if response.status_code == 200:
             order = response.json()
             logging.info(f"Order status fetched: {order}")
@@ -268,10 +292,10 @@ def get_order_status(order_id):
 def get_open_orders(symbol):
     try:
         logging.info(f"Revisando si hay órdenes abiertas para {symbol}...")
-        url = f"https://api.kucoin.com/api/v1/orders?status=active&symbol={symbol}"
-        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', f'/api/v1/orders?status=active&symbol={symbol}')
+        endpoint = f'/api/v1/orders?status=active&symbol={symbol}'
+        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get(BASE_URL_SPOT, endpoint, headers=headers)
         if response.status_code == 200:
             open_orders = response.json()
             logging.info(f"Órdenes abiertas obtenidas: {open_orders}")
@@ -290,10 +314,10 @@ def get_open_orders(symbol):
 def get_open_orders_futures(symbol):
     try:
         logging.info(f"Revisando si hay órdenes abiertas para {symbol} en la cuenta de futuros...")
-        url = f"https://api-futures.kucoin.com/api/v1/orders?status=active&symbol={symbol}"
-        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', f'/api/v1/orders?status=active&symbol={symbol}')
+        endpoint = f'/api/v1/orders?status=active&symbol={symbol}'
+        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get(BASE_URL_FUTURES, endpoint, headers=headers)
         if response.status_code == 200:
             open_orders = response.json()
             logging.info(f"Órdenes abiertas obtenidas: {open_orders}")
@@ -306,9 +330,9 @@ def get_open_orders_futures(symbol):
         return None
 
 
-def get_current_price(symbol):
+def fetch_current_price(symbol):
     try:
-        response = requests.get(f'https://api.kucoin.com/api/v1/market/orderbook/level1?symbol={symbol}')
+        response = http_client.get(BASE_URL_SPOT, f'/api/v1/market/orderbook/level1?symbol={symbol}')
         data = response.json()
         if 'data' in data and 'price' in data['data']:
             current_price = float(data['data']['price'])
@@ -322,13 +346,18 @@ def get_current_price(symbol):
         return None
 
 
+price_service = PriceService(fetch_current_price, stream=market_stream, stream_max_age_ms=MARKET_STREAM_MAX_AGE_MS)
 
 
+def get_current_price(symbol, max_age_ms=PRICE_MAX_AGE_MS):
+    # Llamadas concurrentes comparten una sola petición y reutilizan el precio mientras sea reciente
+    quote = get_price_quote(symbol, max_age_ms)
+    return quote['price'] if quote else None
 
 
-
-
-
-
-
-
+def get_price_quote(symbol, max_age_ms=PRICE_MAX_AGE_MS):
+    try:
+        return price_service.get_price(symbol, max_age_ms=max_age_ms)
+    except Exception as e:
+        logging.error(f"Error al obtener el precio actual: {e}")
+        return None
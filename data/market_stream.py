@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+import websockets
+from kucoin_client import http_client
+
+# Correspondencia entre timeframes de ccxt y los tipos de vela del WebSocket de KuCoin
+KUCOIN_CANDLE_TYPES = {
+    '1m': '1min', '3m': '3min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '1h': '1hour', '2h': '2hour', '4h': '4hour', '6h': '6hour', '8h': '8hour', '12h': '12hour',
+    '1d': '1day', '1w': '1week',
+}
+
+
+def fetch_bullet_token(base_url):
+    """Handshake bullet-public: devuelve (endpoint, token, ping_interval_ms)."""
+    response = http_client.post(base_url, '/api/v1/bullet-public')
+    response.raise_for_status()
+    data = response.json()['data']
+    server = data['instanceServers'][0]
+    return server['endpoint'], data['token'], server.get('pingInterval', 18000)
+
+
+class MarketStream:
+    """Mantiene en memoria el último ticker y la vela en formación recibidos por el WebSocket público."""
+
+    def __init__(self, base_url, futures=False, token_provider=None, max_backoff=30):
+        self.base_url = base_url
+        self.futures = futures
+        self.token_provider = token_provider or (lambda: fetch_bullet_token(self.base_url))
+        self.max_backoff = max_backoff
+        self.symbols = []
+        self.timeframe = None
+        self.connected = False
+        self.reconnects = 0
+        self._tickers = {}
+        self._candles = {}
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, symbols, timeframe=None):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='market-stream', daemon=True)
+        self._thread.start()
+        logging.info(f"Stream de mercado iniciado para {self.symbols}")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def add_listener(self, callback):
+        """Registra callback(symbol, price, timestamp_ms) que se invoca en cada ticker recibido."""
+        self._listeners.append(callback)
+
+    def get_last_price(self, symbol, max_age_ms=None):
+        ticker = self._tickers.get(symbol)
+        if ticker is None:
+            return None
+        price, _, received_at = ticker
+        if max_age_ms is not None and (time.monotonic() - received_at) * 1000 > max_age_ms:
+            return None
+        return price
+
+    def get_ticker(self, symbol):
+        ticker = self._tickers.get(symbol)
+        if ticker is None:
+            return None
+        price, timestamp, received_at = ticker
+        return {'price': price, 'timestamp': timestamp, 'age_ms': (time.monotonic() - received_at) * 1000}
+
+    def get_forming_candle(self, symbol):
+        return self._candles.get(symbol)
+
+    def _topics(self):
+        joined = ','.join(self.symbols)
+        if self.futures:
+            return [f'/contractMarket/ticker:{symbol}' for symbol in self.symbols]
+        topics = [f'/market/ticker:{joined}']
+        candle_type = KUCOIN_CANDLE_TYPES.get(self.timeframe)
+        if candle_type:
+            topics.extend(f'/market/candles:{symbol}_{candle_type}' for symbol in self.symbols)
+        return topics
+
+    def _run_loop(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                endpoint, token, ping_interval = self.token_provider()
+                url = f"{endpoint}?token={token}&connectId={uuid.uuid4().hex}"
+                async with websockets.connect(url, ping_interval=None) as websocket:
+                    await self._subscribe(websocket)
+                    self.connected = True
+                    backoff = 1
+                    await self._consume(websocket, ping_interval / 1000)
+            except Exception as e:
+                logging.error(f"Error en el stream de mercado: {e}")
+            finally:
+                self.connected = False
+            if self._stop.is_set():
+                break
+            self.reconnects += 1
+            logging.info(f"Reconectando stream de mercado en {backoff} s")
+            await self._sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _sleep(self, seconds):
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.1, seconds))
+
+    async def _subscribe(self, websocket):
+        welcome = json.loads(await asyncio.wait_for(websocket.recv(), timeout=10))
+        if welcome.get('type') != 'welcome':
+            raise ConnectionError(f"Respuesta inesperada al conectar: {welcome}")
+        for topic in self._topics():
+            await websocket.send(json.dumps({
+                'id': uuid.uuid4().hex,
+                'type': 'subscribe',
+                'topic': topic,
+                'privateChannel': False,
+                'response': True,
+            }))
+
+    async def _consume(self, websocket, ping_interval):
+        last_ping = time.monotonic()
+        while not self._stop.is_set():
+            if time.monotonic() - last_ping >= ping_interval:
+                await websocket.send(json.dumps({'id': uuid.uuid4().hex, 'type': 'ping'}))
+                last_ping = time.monotonic()
+            try:
+                raw = await asyncio.wait_for(websocket.recv(), timeout=min(ping_interval, 1))
+            except asyncio.TimeoutError:
+                continue
+            self._handle_message(json.loads(raw))
+
+    def _handle_message(self, message):
+        if message.get('type') != 'message':
+            return
+        topic = message.get('topic', '')
+        data = message.get('data', {})
+        if topic.startswith('/market/ticker:') or topic.startswith('/contractMarket/ticker:'):
+            symbol = topic.split(':', 1)[1]
+            if symbol == 'all':
+                symbol = message.get('subject')
+            price = float(data['price'])
+            timestamp = int(data.get('time') or data.get('ts', 0))
+            self._tickers[symbol] = (price, timestamp, time.monotonic())
+            for callback in list(self._listeners):
+                try:
+                    callback(symbol, price, timestamp)
+                except Exception as e:
+                    logging.error(f"Error en listener de precios para {symbol}: {e}")
+        elif topic.startswith('/market/candles:'):
+            start, open_, close, high, low, volume = data['candles'][:6]
+            self._candles[data['symbol']] = [int(start) * 1000, float(open_), float(high), float(low), float(close), float(volume)]
@@ -0,0 +1,79 @@
+import time
+import asyncio
+import logging
+import ccxt.async_support as ccxt_async
+from config import SYMBOLS, FETCH_MAX_CONCURRENCY, FETCH_REQUESTS_PER_SECOND
+from data.candle_cache import ohlcv_to_frame
+
+
+class AsyncRateBudget:
+    """Token bucket compartido por todas las corrutinas de un lote."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def build_async_exchange(base_url=None, markets=None):
+    # Sin rate limit interno de ccxt: el presupuesto global lo controla AsyncRateBudget
+    exchange = ccxt_async.kucoin({'enableRateLimit': False})
+    if base_url:
+        # Permite apuntar todas las rutas a un servidor local de pruebas
+        exchange.urls['api'] = {name: base_url for name in exchange.urls['api']}
+    if markets:
+        exchange.set_markets(markets)
+    return exchange
+
+
+async def fetch_many_async(symbols, timeframe='1h', limit=200, exchange=None, max_concurrency=FETCH_MAX_CONCURRENCY,
+                           requests_per_second=FETCH_REQUESTS_PER_SECOND, since=None):
+    owns_exchange = exchange is None
+    if owns_exchange:
+        exchange = build_async_exchange()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    budget = AsyncRateBudget(requests_per_second)
+
+    async def fetch_one(symbol):
+        async with semaphore:
+            await budget.acquire()
+            ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            return ohlcv_to_frame(ohlcv)
+
+    start = time.perf_counter()
+    try:
+        if exchange.markets is None:
+            await exchange.load_markets()
+        results = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols), return_exceptions=True)
+    finally:
+        if owns_exchange:
+            await exchange.close()
+
+    frames, errors = {}, {}
+    for symbol, result in zip(symbols, results):
+        if isinstance(result, Exception):
+            errors[symbol] = result
+            logging.error(f"Error obteniendo velas de {symbol}: {result}")
+        else:
+            frames[symbol] = result
+    logging.info(f"Velas de {len(frames)}/{len(symbols)} símbolos obtenidas en {time.perf_counter() - start:.2f} s")
+    return frames, errors
+
+
+def fetch_many(symbols=None, timeframe='1h', limit=200, **kwargs):
+    """Descarga velas de muchos símbolos en paralelo. Devuelve (frames, errors), ambos dict por símbolo."""
+    symbols = list(symbols or SYMBOLS)
+    return asyncio.run(fetch_many_async(symbols, timeframe, limit, **kwargs))
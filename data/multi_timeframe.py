@@ -0,0 +1,170 @@
+import logging
+import threading
+import numpy as np
+import pandas as pd
+import ccxt
+from data.candle_cache import CandleBuffer, _columns_to_frame
+from indicators.technical_indicators import calculate_indicators
+
+
+def timeframe_ms(timeframe):
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+class TimeframeRollup:
+    """Agrega velas del timeframe base en un timeframe mayor de forma incremental.
+
+    Una vela mayor solo se da por cerrada cuando llega una vela base de un periodo posterior;
+    hasta entonces es la vela en formación y se recalcula en O(1) con cada revisión de la vela base.
+    """
+
+    def __init__(self, base_timeframe, timeframe, capacity=500):
+        self.timeframe = timeframe
+        self.base_ms = timeframe_ms(base_timeframe)
+        self.period_ms = timeframe_ms(timeframe)
+        if self.period_ms % self.base_ms:
+            raise ValueError(f"{timeframe} no es múltiplo de {base_timeframe}")
+        self.closed = CandleBuffer(capacity)
+        self._bucket = None
+        # Agregado de las velas base ya cerradas del periodo en curso: [open, high, low, volume]
+        self._partial = None
+        self._forming_base = None
+        self._started = False
+
+    def _fold_forming_base(self):
+        _, open_, high, low, _, volume = self._forming_base
+        if self._partial is None:
+            self._partial = [open_, high, low, volume]
+        else:
+            self._partial[1] = max(self._partial[1], high)
+            self._partial[2] = min(self._partial[2], low)
+            self._partial[3] += volume
+
+    def forming(self):
+        """Vela mayor en formación [timestamp, open, high, low, close, volume] o None."""
+        if self._forming_base is None or not self._started:
+            return None
+        _, open_, high, low, close, volume = self._forming_base
+        if self._partial is not None:
+            open_ = self._partial[0]
+            high = max(self._partial[1], high)
+            low = min(self._partial[2], low)
+            volume += self._partial[3]
+        return [self._bucket, open_, high, low, close, volume]
+
+    def update(self, candle):
+        """Procesa una vela base (nueva o revisión de la última). Devuelve la vela mayor cerrada, si la hay."""
+        timestamp = int(candle[0])
+        candle = [timestamp] + [float(value) for value in candle[1:6]]
+        if self._forming_base is not None and timestamp < self._forming_base[0]:
+            return None
+        if self._forming_base is not None and timestamp == self._forming_base[0]:
+            self._forming_base = candle
+            return None
+
+        bucket = timestamp // self.period_ms * self.period_ms
+        completed = None
+        if self._forming_base is not None:
+            if bucket == self._bucket:
+                self._fold_forming_base()
+            else:
+                completed = self.forming()
+                if completed is not None:
+                    self.closed.merge([completed])
+                self._partial = None
+        if bucket != self._bucket:
+            # El primer periodo solo cuenta si empieza en su frontera: una vela mayor a medias falsearía los indicadores
+            self._started = self._started or timestamp == bucket
+            self._bucket = bucket
+        self._forming_base = candle
+        return completed
+
+
+class MultiTimeframePipeline:
+    """Un único flujo del timeframe base por símbolo, agregado en los timeframes mayores configurados."""
+
+    def __init__(self, base_timeframe, timeframes, capacity=500):
+        self.base_timeframe = base_timeframe
+        self.capacity = capacity
+        self.timeframes = []
+        for timeframe in timeframes:
+            # Los timeframes iguales o menores que el base no se pueden derivar de él
+            if timeframe_ms(timeframe) <= timeframe_ms(base_timeframe):
+                continue
+            if timeframe_ms(timeframe) % timeframe_ms(base_timeframe):
+                logging.warning(f"Timeframe {timeframe} ignorado: no es un múltiplo mayor de {base_timeframe}")
+                continue
+            self.timeframes.append(timeframe)
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def _state(self, symbol, reset=False):
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None or reset:
+                state = {
+                    'base': CandleBuffer(self.capacity),
+                    'rollups': {tf: TimeframeRollup(self.base_timeframe, tf, self.capacity) for tf in self.timeframes},
+                    'lock': threading.Lock(),
+                }
+                self._symbols[symbol] = state
+            return state
+
+    def ingest(self, symbol, ohlcv, reset=False):
+        """Incorpora velas base ordenadas; con reset=True se reconstruye todo el símbolo."""
+        state = self._state(symbol, reset)
+        with state['lock']:
+            candles = sorted(ohlcv, key=lambda candle: candle[0])
+            state['base'].merge(candles)
+            for rollup in state['rollups'].values():
+                for candle in candles:
+                    rollup.update(candle)
+
+    def on_candles(self, symbol, timeframe, ohlcv, full_load):
+        if timeframe != self.base_timeframe:
+            return
+        try:
+            self.ingest(symbol, ohlcv, reset=full_load)
+        except Exception as e:
+            logging.error(f"Error agregando velas de {symbol} a timeframes mayores: {e}")
+
+    def frame(self, symbol, timeframe, include_forming=False, limit=None):
+        state = self._symbols.get(symbol)
+        if state is None:
+            return None
+        with state['lock']:
+            if timeframe == self.base_timeframe:
+                return state['base'].to_frame(limit)
+            rollup = state['rollups'][timeframe]
+            timestamps, values = rollup.closed.view(limit)
+            forming = rollup.forming() if include_forming else None
+            if forming is not None:
+                timestamps = np.append(timestamps, np.int64(forming[0]))
+                values = np.vstack([values, forming[1:6]])
+            return _columns_to_frame(timestamps, values)
+
+    def features(self, symbol, timeframe, features=None, limit=None):
+        df = self.frame(symbol, timeframe, limit=limit)
+        if df is None or df.empty:
+            return df
+        return calculate_indicators(df, features)
+
+    def joined_view(self, symbol, features=None, timeframes=None, limit=None):
+        """Velas base con los indicadores de cada timeframe mayor unidos por asof en el cierre de la vela mayor.
+
+        Cada fila base solo ve las velas mayores ya cerradas en el cierre de esa fila (sin mirar al futuro).
+        Las columnas del timeframe mayor llevan el sufijo _<timeframe>.
+        """
+        base = self.features(symbol, self.base_timeframe, features, limit)
+        if base is None or base.empty:
+            return base
+        base_ms = timeframe_ms(self.base_timeframe)
+        view = base.assign(close_time=base['timestamp'] + pd.Timedelta(milliseconds=base_ms))
+        for timeframe in timeframes or self.timeframes:
+            higher = self.features(symbol, timeframe, features)
+            if higher is None or higher.empty:
+                continue
+            higher = higher.assign(close_time=higher['timestamp'] + pd.Timedelta(milliseconds=timeframe_ms(timeframe)))
+            higher = higher.drop(columns=['timestamp']).add_suffix(f"_{timeframe}").rename(columns={f"close_time_{timeframe}": 'close_time'})
+            view = pd.merge_asof(view, higher, on='close_time', direction='backward')
+        return view.drop(columns=['close_time'])
@@ -0,0 +1,92 @@
+import time
+import logging
+import threading
+
+
+class _InflightRequest:
+    def __init__(self):
+        self.done = threading.Event()
+        self.quote = None
+        self.error = None
+
+
+class PriceService:
+    """Precios por símbolo con caché acotada por antigüedad y una sola petición en vuelo por símbolo."""
+
+    def __init__(self, fetch_price, stream=None, stream_max_age_ms=5000):
+        self.fetch_price = fetch_price
+        self.stream = stream
+        # Un ticker del stream sigue siendo válido mientras no llegue otro (no hay operaciones nuevas)
+        self.stream_max_age_ms = stream_max_age_ms
+        self._quotes = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+
+    def _stream_quote(self, symbol, max_age_ms):
+        if self.stream is None:
+            return None
+        ticker = self.stream.get_ticker(symbol)
+        # El límite del llamador manda si es más estricto que el del stream
+        if ticker is None or ticker['age_ms'] > min(max_age_ms, self.stream_max_age_ms):
+            return None
+        return {
+            'symbol': symbol,
+            'price': ticker['price'],
+            'timestamp': int(time.time() * 1000 - ticker['age_ms']),
+            'source': 'stream',
+        }
+
+    def get_price(self, symbol, max_age_ms=500):
+        """Devuelve {'symbol', 'price', 'timestamp', 'source'} con timestamp (ms) del momento de obtención."""
+        quote = self._stream_quote(symbol, max_age_ms)
+        if quote is not None:
+            return quote
+
+        quote = self._quotes.get(symbol)
+        if quote is not None and time.time() * 1000 - quote['timestamp'] <= max_age_ms:
+            return quote
+
+        with self._lock:
+            inflight = self._inflight.get(symbol)
+            leader = inflight is None
+            if leader:
+                inflight = _InflightRequest()
+                self._inflight[symbol] = inflight
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            # Otro hilo ya está pidiendo este precio: se espera y se comparte su resultado
+            inflight.done.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.quote
+
+        try:
+            self.requests += 1
+            price = self.fetch_price(symbol)
+            if price is not None:
+                inflight.quote = {
+                    'symbol': symbol,
+                    'price': price,
+                    'timestamp': int(time.time() * 1000),
+                    'source': 'rest',
+                }
+                self._quotes[symbol] = inflight.quote
+            return inflight.quote
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+            inflight.done.set()
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self._quotes.clear()
+        else:
+            self._quotes.pop(symbol, None)
+        logging.debug(f"Caché de precios invalidada para {symbol or 'todos los símbolos'}")
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import logging
+import threading
+from kucoin_client import http_client
+from config import BASE_URL_SPOT, BASE_URL_FUTURES
+
+
+def _decimals(increment):
+    text = str(increment).rstrip('0')
+    return len(text.split('.', 1)[1]) if '.' in text else 0
+
+
+def _parse_spot_symbol(item):
+    return {
+        'symbol': item['symbol'],
+        'market': 'spot',
+        'baseCurrency': item.get('baseCurrency'),
+        'quoteCurrency': item.get('quoteCurrency'),
+        'baseIncrement': float(item['baseIncrement']),
+        'quoteIncrement': float(item['quoteIncrement']),
+        'priceIncrement': float(item['priceIncrement']),
+        'baseMinSize': float(item['baseMinSize']),
+        'quoteMinSize': float(item['quoteMinSize']),
+        'baseMaxSize': float(item['baseMaxSize']),
+        'basePrecision': _decimals(item['baseIncrement']),
+        'quotePrecision': _decimals(item['quoteIncrement']),
+        'enableTrading': item.get('enableTrading', True),
+    }
+
+
+def _parse_futures_contract(item):
+    return {
+        'symbol': item['symbol'],
+        'market': 'futures',
+        'baseCurrency': item.get('baseCurrency'),
+        'quoteCurrency': item.get('quoteCurrency'),
+        'lotSize': float(item['lotSize']),
+        'tickSize': float(item['tickSize']),
+        'multiplier': float(item['multiplier']),
+        'maxLeverage': item.get('maxLeverage'),
+        'pricePrecision': _decimals(item['tickSize']),
+    }
+
+
+class SymbolMetadataCache:
+    """Índice en memoria de la metadata de símbolos con TTL, refresco en segundo plano y copia en disco."""
+
+    def __init__(self, cache_path=None, ttl=3600):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._symbols = {}
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load_from_disk()
+
+    def _load_from_disk(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r') as f:
+                snapshot = json.load(f)
+            self._symbols = snapshot['symbols']
+            self._fetched_at = snapshot['fetched_at']
+            logging.info(f"Metadata de {len(self._symbols)} símbolos cargada desde {self.cache_path}")
+        except Exception as e:
+            logging.error(f"Error leyendo la caché de símbolos {self.cache_path}: {e}")
+
+    def _save_to_disk(self):
+        if not self.cache_path:
+            return
+        try:
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'fetched_at': self._fetched_at, 'symbols': self._symbols}, f)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logging.error(f"Error guardando la caché de símbolos {self.cache_path}: {e}")
+
+    def _fetch(self):
+        symbols = {}
+        response = http_client.get(BASE_URL_SPOT, '/api/v1/symbols')
+        response.raise_for_status()
+        for item in response.json()['data']:
+            symbols[item['symbol']] = _parse_spot_symbol(item)
+
+        try:
+            response = http_client.get(BASE_URL_FUTURES, '/api/v1/contracts/active')
+            response.raise_for_status()
+            for item in response.json()['data']:
+                symbols[item['symbol']] = _parse_futures_contract(item)
+        except Exception as e:
+            # Sin futuros se conserva la información previa de los contratos
+            logging.error(f"Error obteniendo contratos de futuros: {e}")
+            symbols.update({k: v for k, v in self._symbols.items() if v.get('market') == 'futures' and k not in symbols})
+        return symbols
+
+    def refresh(self):
+        symbols = self._fetch()
+        with self._lock:
+            self._symbols = symbols
+            self._fetched_at = time.time()
+        self._save_to_disk()
+        logging.info(f"Metadata de símbolos actualizada: {len(symbols)} símbolos")
+        return symbols
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"Error refrescando la metadata de símbolos: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name='symbol-metadata-refresh', daemon=True).start()
+
+    def is_expired(self):
+        return time.time() - self._fetched_at > self.ttl
+
+    def get(self, symbol):
+        if not self._symbols:
+            # Primer arranque sin copia en disco: la carga inicial es síncrona
+            self.refresh()
+        elif self.is_expired():
+            self._refresh_in_background()
+        return self._symbols.get(symbol)
@@ -0,0 +1,102 @@
+import sys
+import time
+import zlib
+import math
+import logging
+import argparse
+from aiohttp import web
+
+# Servidor HTTP local que imita las rutas públicas de KuCoin que usa el backfill y sirve velas sintéticas.
+# Uso: python -m data.synthetic_candle_server --port 8767
+# y python -m data.backfill BTC/USDT 1m 2024-01-01 2024-02-01 --store /tmp/velas --base-url http://localhost:8767
+
+SYNTHETIC_HOST = "localhost"
+SYNTHETIC_PORT = 8767
+
+# Tipos de vela de KuCoin -> segundos
+KUCOIN_TYPES = {
+    '1min': 60, '3min': 180, '5min': 300, '15min': 900, '30min': 1800, '1hour': 3600, '2hour': 7200,
+    '4hour': 14400, '6hour': 21600, '8hour': 28800, '12hour': 43200, '1day': 86400, '1week': 604800,
+}
+PAGE_SIZE = 1500
+
+
+def _noise(symbol, timestamp, salt):
+    # Determinista: la misma vela sale igual en cualquier petición, así los tramos solapados coinciden
+    return zlib.crc32(f"{symbol}:{timestamp}:{salt}".encode()) / 0xFFFFFFFF - 0.5
+
+
+def synthetic_candle(symbol, timestamp, seconds, now=None):
+    """Vela [time, open, close, high, low, volume, turnover] en el formato de /api/v1/market/candles.
+
+    Si now cae dentro de la vela, se devuelve en formación: el cierre avanza hacia el definitivo con el tiempo transcurrido.
+    """
+    base = 100 + 20 * math.sin(timestamp / 86400) + 5 * math.sin(timestamp / 3600)
+    open_ = base * (1 + 0.002 * _noise(symbol, timestamp, 'open'))
+    close = base * (1 + 0.002 * _noise(symbol, timestamp + seconds, 'open'))
+    volume = 10 + 10 * (_noise(symbol, timestamp, 'volume') + 0.5)
+    if now is not None and now < timestamp + seconds:
+        elapsed = (now - timestamp) / seconds
+        close = open_ + (close - open_) * elapsed
+        volume *= elapsed
+    high = max(open_, close) * (1 + 0.001 * abs(_noise(symbol, timestamp, 'high')))
+    low = min(open_, close) * (1 - 0.001 * abs(_noise(symbol, timestamp, 'low')))
+    return [str(timestamp), str(open_), str(close), str(high), str(low), str(volume), str(volume * close)]
+
+
+def _market(symbol):
+    base, quote = symbol.split('-')
+    return {
+        'symbol': symbol, 'name': symbol, 'baseCurrency': base, 'quoteCurrency': quote, 'feeCurrency': quote,
+        'market': quote, 'baseMinSize': '0.00001', 'quoteMinSize': '0.1', 'baseMaxSize': '10000000000',
+        'quoteMaxSize': '99999999', 'baseIncrement': '0.00000001', 'quoteIncrement': '0.000001',
+        'priceIncrement': '0.1', 'priceLimitRate': '0.1', 'minFunds': '0.1', 'isMarginEnabled': False,
+        'enableTrading': True, 'feeCategory': 1, 'makerFeeCoefficient': '1.00', 'takerFeeCoefficient': '1.00',
+        'st': False,
+    }
+
+
+def make_app(symbols, clock=time.time):
+    """clock() da la hora del servidor en segundos: no se sirven velas futuras y la última sale en formación."""
+    async def symbols_handler(request):
+        return web.json_response({'code': '200000', 'data': [_market(symbol) for symbol in symbols]})
+
+    async def candles_handler(request):
+        symbol = request.query.get('symbol')
+        seconds = KUCOIN_TYPES.get(request.query.get('type'))
+        if symbol not in symbols or seconds is None:
+            return web.json_response({'code': '400100', 'msg': 'símbolo o tipo de vela no válido'}, status=400)
+        now = clock()
+        start_at = int(request.query.get('startAt') or 0)
+        end_at = min(int(request.query.get('endAt') or now), now)
+        first = -(-start_at // seconds) * seconds
+        last = min(end_at, first + seconds * (PAGE_SIZE - 1))
+        # KuCoin devuelve las velas de la más reciente a la más antigua
+        data = [synthetic_candle(symbol, t, seconds, now) for t in range(first, int(last) + 1, seconds)][::-1]
+        return web.json_response({'code': '200000', 'data': data})
+
+    async def empty_handler(request):
+        logging.info(f"Ruta sin datos sintéticos: {request.path}")
+        return web.json_response({'code': '200000', 'data': []})
+
+    app = web.Application()
+    app.router.add_get('/api/v2/symbols', symbols_handler)
+    app.router.add_get('/api/v1/market/candles', candles_handler)
+    app.router.add_route('GET', '/{tail:.*}', empty_handler)
+    return app
+
+
+def run_synthetic_server(symbols, host=SYNTHETIC_HOST, port=SYNTHETIC_PORT, clock=time.time):
+    logging.info(f"Servidor de velas sintéticas en http://{host}:{port} para {symbols}")
+    web.run_app(make_app(symbols, clock), host=host, port=port)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Servidor local de velas sintéticas con las rutas públicas de KuCoin")
+    parser.add_argument('--symbols', default='BTC-USDT,ETH-USDT')
+    parser.add_argument('--host', default=SYNTHETIC_HOST)
+    parser.add_argument('--port', type=int, default=SYNTHETIC_PORT)
+    args = parser.parse_args()
+    run_synthetic_server(args.symbols.split(','), args.host, args.port)
+    sys.exit(0)
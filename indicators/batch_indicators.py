@@ -0,0 +1,233 @@
+import logging
+import numpy as np
+import pandas as pd
+from patterns.price_action_patterns import pin_bar_array, bullish_engulfing_array, bearish_engulfing_array, pattern_bitmask
+
+BATCH_FEATURES = [
+    'SMA50', 'SMA200', 'RSI', 'MACD', 'MACDSignal', 'MACDHist', 'BollingerUpper', 'BollingerMiddle', 'BollingerLower',
+    'ATR', 'ADX', 'PlusDI', 'MinusDI', 'PinBar', 'BullishEngulfing', 'BearishEngulfing', 'PatternMask',
+]
+
+# Mismo relleno con 0 que calculate_indicators
+FILL_ZERO = {'SMA50', 'SMA200', 'RSI', 'ATR', 'ADX', 'PlusDI', 'MinusDI'}
+
+
+class BatchIndicators:
+    """Resultado del cálculo en lote: una matriz (símbolos x velas) por columna."""
+
+    def __init__(self, symbols, timestamps, arrays):
+        self.symbols = list(symbols)
+        self.timestamps = timestamps
+        self.arrays = arrays
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def latest(self, index=-1):
+        """Una fila por símbolo con los valores de la vela indicada (por defecto la última)."""
+        return pd.DataFrame({name: values[:, index] for name, values in self.arrays.items()}, index=self.symbols)
+
+    def to_frame(self, symbol):
+        row = self._rows[symbol]
+        data = {'timestamp': self.timestamps} if self.timestamps is not None else {}
+        data.update((name, values[row]) for name, values in self.arrays.items())
+        return pd.DataFrame(data)
+
+
+def stack_frames(frames, limit=None):
+    """Alinea los DataFrames por timestamp (velas comunes a todos) y devuelve (symbols, timestamps, dict de matrices)."""
+    symbols = [symbol for symbol, df in frames.items() if df is not None and len(df)]
+    if not symbols:
+        return [], None, {}
+    common = frames[symbols[0]]['timestamp']
+    for symbol in symbols[1:]:
+        common = common[common.isin(frames[symbol]['timestamp'])]
+    timestamps = common.to_numpy()[-limit:] if limit else common.to_numpy()
+    arrays = {}
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        arrays[column] = np.vstack([
+            frames[symbol].set_index('timestamp')[column].reindex(timestamps).to_numpy(dtype=np.float64)
+            for symbol in symbols
+        ])
+    return symbols, timestamps, arrays
+
+
+def _rolling_mean(values, period):
+    result = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return result
+    sums = np.cumsum(values, axis=1)
+    result[:, period - 1] = sums[:, period - 1]
+    result[:, period:] = sums[:, period:] - sums[:, :-period]
+    result[:, period - 1:] /= period
+    return result
+
+
+def _smooth(values, alpha, first, seed):
+    # Bucle sobre el tiempo vectorizado sobre los símbolos: cada paso es una operación NumPy sobre todos a la vez.
+    # alpha puede ser un vector por fila para suavizar varias series apiladas en el mismo bucle.
+    # Los NaN no actualizan el valor (como ewm con ignore_na=True), que es lo que hace TA-Lib con los DX indefinidos.
+    result = np.full(values.shape[::-1], np.nan)
+    if first >= values.shape[1]:
+        return result.T
+    columns = np.ascontiguousarray(values.T)
+    current = np.array(seed, dtype=np.float64)
+    result[first] = current
+    for t in range(first + 1, len(columns)):
+        x = columns[t]
+        updated = current + alpha * (x - current)
+        current = np.where(np.isnan(x), current, updated)
+        result[t] = current
+    return result.T
+
+
+def _ema_seed(values, period, first):
+    # EMA de TA-Lib: semilla = media simple de las period velas que terminan en first
+    return values[:, first - period + 1:first + 1].mean(axis=1)
+
+
+def _sma(close, period):
+    return _rolling_mean(close, period)
+
+
+def _rsi(close, period):
+    change = np.diff(close, axis=1, prepend=np.nan)
+    up, down = np.clip(change, 0, None), np.clip(-change, 0, None)
+    if close.shape[1] <= period:
+        return np.full(close.shape, np.nan)
+    stacked = np.vstack([up, down])
+    gain, loss = np.split(_smooth(stacked, 1.0 / period, period, stacked[:, 1:period + 1].mean(axis=1)), 2)
+    total = gain + loss
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total == 0, np.where(np.isnan(total), np.nan, 0.0), 100.0 * gain / total)
+
+
+def _macd(close, fastperiod, slowperiod, signalperiod):
+    bars = close.shape[1]
+    first = slowperiod - 1
+    nan = np.full(close.shape, np.nan)
+    if first + signalperiod - 1 >= bars:
+        return nan, nan.copy(), nan.copy()
+    # La EMA rápida arranca alineada con la lenta, como en talib.MACD
+    rows = close.shape[0]
+    alpha = np.repeat([2.0 / (fastperiod + 1), 2.0 / (slowperiod + 1)], rows)
+    seed = np.concatenate([_ema_seed(close, fastperiod, first), _ema_seed(close, slowperiod, first)])
+    fast, slow = np.split(_smooth(np.vstack([close, close]), alpha, first, seed), 2)
+    macd = fast - slow
+    signal_first = first + signalperiod - 1
+    signal = _smooth(macd, 2.0 / (signalperiod + 1), signal_first, macd[:, first:signal_first + 1].mean(axis=1))
+    macd[:, :signal_first] = np.nan
+    return macd, signal, macd - signal
+
+
+def _bbands(close, period, nbdev=2.0):
+    # Varianza de cada ventana desplazada a su primera vela (un paso NumPy por posición de la ventana): sin la cancelación
+    # de las sumas acumuladas, coincide con talib.BBANDS hasta ~1e-11 relativo y da exactamente 0 en los tramos planos
+    middle = _rolling_mean(close, period)
+    bars = close.shape[1]
+    deviation = np.full(close.shape, np.nan)
+    if bars >= period:
+        first = close[:, :bars - period + 1]
+        total = np.zeros(first.shape)
+        squares = np.zeros(first.shape)
+        for k in range(period):
+            shifted = close[:, k:bars - period + 1 + k] - first
+            total += shifted
+            squares += shifted * shifted
+        mean = total / period
+        deviation[:, period - 1:] = np.sqrt(np.clip(squares / period - mean * mean, 0, None))
+    return middle + nbdev * deviation, middle, middle - nbdev * deviation
+
+
+def _true_range(high, low, close):
+    prev_close = np.empty(close.shape)
+    prev_close[:, 0] = np.nan
+    prev_close[:, 1:] = close[:, :-1]
+    return np.fmax(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def _directional(high, low, close, period):
+    tr = _true_range(high, low, close)
+    tr[:, 0] = np.nan
+    diff_plus = np.full(high.shape, np.nan)
+    diff_minus = np.full(high.shape, np.nan)
+    diff_plus[:, 1:] = high[:, 1:] - high[:, :-1]
+    diff_minus[:, 1:] = low[:, :-1] - low[:, 1:]
+    plus_dm = np.where((diff_plus > 0) & (diff_plus > diff_minus), diff_plus, 0.0)
+    minus_dm = np.where((diff_minus > 0) & (diff_plus < diff_minus), diff_minus, 0.0)
+
+    nan = np.full(high.shape, np.nan)
+    if high.shape[1] <= period:
+        return nan, nan.copy(), nan.copy(), nan.copy()
+
+    # ATR se siembra con la media de los primeros TR; las sumas de Wilder de DI (divididas por el periodo) con la suma parcial
+    sums = np.vstack([tr, plus_dm, minus_dm])
+    sums_seed = (sums[:, 1:period].sum(axis=1) * (1 - 1.0 / period) + sums[:, period]) / period
+    smoothed = _smooth(np.vstack([tr, sums]), 1.0 / period, period,
+                       np.concatenate([tr[:, 1:period + 1].mean(axis=1), sums_seed]))
+    atr, tr_sum, plus_sum, minus_sum = np.split(smoothed, 4)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(tr_sum == 0, 0.0, 100.0 * plus_sum / tr_sum)
+        minus_di = np.where(tr_sum == 0, 0.0, 100.0 * minus_sum / tr_sum)
+        total = plus_di + minus_di
+        dx = np.where((tr_sum == 0) | (total == 0), np.nan, 100.0 * np.abs(minus_di - plus_di) / total)
+    plus_di[:, :period] = minus_di[:, :period] = dx[:, :period] = np.nan
+
+    first = 2 * period - 1
+    if high.shape[1] <= first:
+        adx = nan.copy()
+    else:
+        adx = _smooth(dx, 1.0 / period, first, np.nan_to_num(dx[:, period:first + 1]).sum(axis=1) / period)
+    return atr, plus_di, minus_di, adx
+
+
+def compute_batch(open_, high, low, close, volume=None, features=None, symbols=None, timestamps=None):
+    """Calcula indicadores y patrones para matrices alineadas (símbolos x velas) en una sola pasada vectorizada."""
+    open_, high, low, close = (np.atleast_2d(np.asarray(a, dtype=np.float64)) for a in (open_, high, low, close))
+    features = set(BATCH_FEATURES if features is None else features)
+    unknown = features.difference(BATCH_FEATURES)
+    if unknown:
+        raise KeyError(f"Indicadores no soportados en lote: {sorted(unknown)}")
+
+    arrays = {}
+    if 'SMA50' in features:
+        arrays['SMA50'] = _sma(close, 50)
+    if 'SMA200' in features:
+        arrays['SMA200'] = _sma(close, 200)
+    if 'RSI' in features:
+        arrays['RSI'] = _rsi(close, 14)
+    if features & {'MACD', 'MACDSignal', 'MACDHist'}:
+        arrays['MACD'], arrays['MACDSignal'], arrays['MACDHist'] = _macd(close, 12, 26, 9)
+    if features & {'BollingerUpper', 'BollingerMiddle', 'BollingerLower'}:
+        arrays['BollingerUpper'], arrays['BollingerMiddle'], arrays['BollingerLower'] = _bbands(close, 20)
+    if features & {'ATR', 'ADX', 'PlusDI', 'MinusDI'}:
+        # ATR, DI y ADX comparten el rango verdadero y los movimientos direccionales
+        arrays['ATR'], arrays['PlusDI'], arrays['MinusDI'], arrays['ADX'] = _directional(high, low, close, 14)
+    if 'PinBar' in features:
+        arrays['PinBar'] = pin_bar_array(open_, high, low, close)
+    if 'BullishEngulfing' in features:
+        arrays['BullishEngulfing'] = bullish_engulfing_array(open_, close)
+    if 'BearishEngulfing' in features:
+        arrays['BearishEngulfing'] = bearish_engulfing_array(open_, close)
+    if 'PatternMask' in features:
+        arrays['PatternMask'] = pattern_bitmask(open_, high, low, close)
+
+    arrays = {name: (np.nan_to_num(values, nan=0.0) if name in FILL_ZERO else values)
+              for name, values in arrays.items() if name in features}
+    if symbols is None:
+        symbols = list(range(close.shape[0]))
+    logging.info(f"Indicadores en lote calculados: {close.shape[0]} símbolos x {close.shape[1]} velas")
+    return BatchIndicators(symbols, timestamps, arrays)
+
+
+def compute_batch_frames(frames, features=None, limit=None):
+    """Atajo para el resultado de fetch_many: dict símbolo -> DataFrame de velas."""
+    symbols, timestamps, arrays = stack_frames(frames, limit)
+    if not symbols:
+        return BatchIndicators([], None, {})
+    return compute_batch(arrays['open'], arrays['high'], arrays['low'], arrays['close'], arrays['volume'],
+                         features=features, symbols=symbols, timestamps=timestamps)
@@ -0,0 +1,106 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def fingerprint_arrays(columns):
+    """Huella del contenido de las columnas de entrada: mismas velas, misma huella, sin importar de dónde vengan."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(columns):
+        values = np.ascontiguousarray(columns[name])
+        digest.update(f"{name}:{values.dtype.str}:{values.shape}".encode())
+        digest.update(values.data)
+    return digest.hexdigest()
+
+
+def _frozen_copy(values):
+    values = np.array(values, copy=True)
+    values.setflags(write=False)
+    return values
+
+
+class FeatureCache:
+    """LRU en memoria de columnas calculadas por (huella de datos, indicador, parámetros), con nivel opcional en disco."""
+
+    def __init__(self, max_entries=64, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(fingerprint, name, params):
+        return f"{fingerprint}-{name}-" + ",".join(f"{key}={params[key]}" for key in sorted(params))
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '.npz')
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, outputs):
+        # La caché guarda copias de solo lectura: los aciertos comparten esas copias y los arrays de quien llama
+        # (que acaban en su DataFrame) siguen siendo escribibles
+        outputs = {name: _frozen_copy(values) for name, values in outputs.items()}
+        with self._lock:
+            self._remember(key, outputs)
+        self._save(key, outputs)
+
+    def _remember(self, key, outputs):
+        self._entries[key] = outputs
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return {name: data[name] for name in data.files}
+        except Exception as e:
+            logging.error(f"Error leyendo indicadores cacheados en {path}: {e}")
+            return None
+
+    def _save(self, key, outputs):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            tmp_path = path + '.tmp.npz'
+            np.savez(tmp_path, **outputs)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"Error guardando indicadores cacheados en {path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,208 @@
+import logging
+import numpy as np
+import pandas as pd
+import talib
+from patterns.price_action_patterns import pin_bar_array, bullish_engulfing_array, bearish_engulfing_array, pattern_bitmask, PATTERN_THRESHOLDS
+from indicators.feature_cache import FeatureCache, fingerprint_arrays
+
+OHLCV_INPUTS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class IndicatorSpec:
+    """Nodo del grafo: columnas de entrada, parámetros y columnas que produce."""
+
+    def __init__(self, name, inputs, outputs, compute, params=None, fill_zero=False, internal=False):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.compute = compute
+        self.params = params or {}
+        # calculate_indicators rellenaba con 0 el arranque de algunos indicadores
+        self.fill_zero = fill_zero
+        # Los intermedios (rango verdadero, DM...) se comparten pero no se devuelven
+        self.internal = internal
+
+
+class IndicatorRegistry:
+    def __init__(self):
+        self._specs = {}
+        self._producers = {}
+
+    def register(self, name, inputs, outputs, params=None, fill_zero=False, internal=False):
+        def decorator(compute):
+            spec = IndicatorSpec(name, inputs, outputs, compute, params, fill_zero, internal)
+            self._specs[name] = spec
+            for output in spec.outputs:
+                self._producers[output] = spec
+            return compute
+        return decorator
+
+    def features(self):
+        return [output for spec in self._specs.values() if not spec.internal for output in spec.outputs]
+
+    def resolve(self, features, available=()):
+        """Orden topológico de los indicadores necesarios para producir las columnas pedidas que no estén ya en available."""
+        order, visiting, done = [], set(), set()
+
+        def visit(column):
+            if column in available:
+                return
+            spec = self._producers.get(column)
+            if spec is None:
+                if column in OHLCV_INPUTS:
+                    return
+                raise KeyError(f"Indicador desconocido: {column}")
+            if spec.name in done:
+                return
+            if spec.name in visiting:
+                raise ValueError(f"Dependencia circular en el indicador {spec.name}")
+            visiting.add(spec.name)
+            for dependency in spec.inputs:
+                visit(dependency)
+            visiting.discard(spec.name)
+            done.add(spec.name)
+            order.append(spec)
+
+        for feature in features:
+            visit(feature)
+        return order
+
+    def compute(self, df, features, cache=None):
+        """Devuelve un DataFrame nuevo con las columnas originales más las pedidas; no modifica df."""
+        features = list(features)
+        columns = {name: df[name].to_numpy(dtype=np.float64) for name in OHLCV_INPUTS if name in df.columns}
+        fingerprint = None
+        if cache is not None:
+            # Con caché, los indicadores ya calculados para estas mismas velas no se recalculan (ni sus dependencias)
+            fingerprint = fingerprint_arrays(columns)
+            for spec in self.resolve(features):
+                if not spec.internal:
+                    cached = cache.get(FeatureCache.make_key(fingerprint, spec.name, spec.params))
+                    if cached is not None:
+                        columns.update(cached)
+        for spec in self.resolve(features, available=columns):
+            values = spec.compute(*(columns[name] for name in spec.inputs), **spec.params)
+            if len(spec.outputs) == 1:
+                values = (values,)
+            outputs = {}
+            for output, array in zip(spec.outputs, values):
+                outputs[output] = np.nan_to_num(array, nan=0.0) if spec.fill_zero else array
+            columns.update(outputs)
+            if cache is not None and not spec.internal:
+                cache.put(FeatureCache.make_key(fingerprint, spec.name, spec.params), outputs)
+        logging.debug(f"Indicadores calculados bajo demanda: {features}")
+        return df.assign(**{feature: columns[feature] for feature in features})
+
+
+def _wilder(values, period, first, seed):
+    # Suavizado de Wilder (ewm con alpha=1/period) partiendo de la semilla en la posición first, como TA-Lib
+    result = np.full(len(values), np.nan)
+    if first >= len(values):
+        return result
+    series = pd.Series(values[first:], dtype=np.float64)
+    series.iloc[0] = seed
+    result[first:] = series.ewm(alpha=1.0 / period, adjust=False, ignore_na=True).mean().to_numpy()
+    return result
+
+
+def _is_zero(values):
+    return values == 0.0
+
+
+registry = IndicatorRegistry()
+
+
+@registry.register('SMA50', ['close'], ['SMA50'], params={'timeperiod': 50}, fill_zero=True)
+@registry.register('SMA200', ['close'], ['SMA200'], params={'timeperiod': 200}, fill_zero=True)
+def _sma(close, timeperiod):
+    return talib.SMA(close, timeperiod=timeperiod)
+
+
+@registry.register('RSI', ['close'], ['RSI'], params={'timeperiod': 14}, fill_zero=True)
+def _rsi(close, timeperiod):
+    return talib.RSI(close, timeperiod=timeperiod)
+
+
+@registry.register('MACD', ['close'], ['MACD', 'MACDSignal', 'MACDHist'], params={'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9})
+def _macd(close, fastperiod, slowperiod, signalperiod):
+    return talib.MACD(close, fastperiod=fastperiod, slowperiod=slowperiod, signalperiod=signalperiod)
+
+
+@registry.register('BBANDS', ['close'], ['BollingerUpper', 'BollingerMiddle', 'BollingerLower'], params={'timeperiod': 20})
+def _bbands(close, timeperiod):
+    return talib.BBANDS(close, timeperiod=timeperiod)
+
+
+@registry.register('TrueRange', ['high', 'low', 'close'], ['_TR'], internal=True)
+def _true_range(high, low, close):
+    prev_close = np.roll(close, 1)
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[:1] = np.nan
+    return tr
+
+
+@registry.register('DirectionalMovement', ['high', 'low'], ['_PlusDM', '_MinusDM'], internal=True)
+def _directional_movement(high, low):
+    diff_plus = np.empty(len(high))
+    diff_minus = np.empty(len(high))
+    diff_plus[1:] = high[1:] - high[:-1]
+    diff_minus[1:] = low[:-1] - low[1:]
+    plus_dm = np.where((diff_plus > 0) & (diff_plus > diff_minus), diff_plus, 0.0)
+    minus_dm = np.where((diff_minus > 0) & (diff_plus < diff_minus), diff_minus, 0.0)
+    plus_dm[:1] = minus_dm[:1] = np.nan
+    return plus_dm, minus_dm
+
+
+@registry.register('ATR', ['_TR'], ['ATR'], params={'timeperiod': 14}, fill_zero=True)
+def _atr(tr, timeperiod):
+    if len(tr) <= timeperiod:
+        return np.full(len(tr), np.nan)
+    return _wilder(tr, timeperiod, timeperiod, tr[1:timeperiod + 1].mean())
+
+
+@registry.register('DirectionalIndex', ['_TR', '_PlusDM', '_MinusDM'], ['_PlusDI', '_MinusDI', '_DX'], params={'timeperiod': 14}, internal=True)
+def _directional_index(tr, plus_dm, minus_dm, timeperiod):
+    n, period = len(tr), timeperiod
+    if n <= period:
+        empty = np.full(n, np.nan)
+        return empty, empty.copy(), empty.copy()
+
+    # Sumas de Wilder divididas por el periodo: los cocientes DI no cambian y encajan con ewm
+    def smoothed(values):
+        seed = (values[1:period].sum() * (1 - 1.0 / period) + values[period]) / period
+        return _wilder(values, period, period, seed)
+
+    tr_sum, plus_sum, minus_sum = smoothed(tr), smoothed(plus_dm), smoothed(minus_dm)
+    valid = ~_is_zero(tr_sum * period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(valid, 100.0 * plus_sum / tr_sum, 0.0)
+        minus_di = np.where(valid, 100.0 * minus_sum / tr_sum, 0.0)
+        total = plus_di + minus_di
+        dx = np.where(valid & ~_is_zero(total), 100.0 * np.abs(minus_di - plus_di) / total, np.nan)
+    plus_di[:period] = minus_di[:period] = dx[:period] = np.nan
+    return plus_di, minus_di, dx
+
+
+@registry.register('PlusDI', ['_PlusDI'], ['PlusDI'], fill_zero=True)
+@registry.register('MinusDI', ['_MinusDI'], ['MinusDI'], fill_zero=True)
+def _directional_indicator(values):
+    return values
+
+
+@registry.register('ADX', ['_DX'], ['ADX'], params={'timeperiod': 14}, fill_zero=True)
+def _adx(dx, timeperiod):
+    first = 2 * timeperiod - 1
+    if len(dx) <= first:
+        return np.full(len(dx), np.nan)
+    # Los DX indefinidos (sin rango ni movimiento) no actualizan el ADX, igual que en TA-Lib
+    return _wilder(dx, timeperiod, first, np.nan_to_num(dx[timeperiod:first + 1]).sum() / timeperiod)
+
+
+@registry.register('PricePatterns', ['open', 'high', 'low', 'close'], ['PinBar', 'BullishEngulfing', 'BearishEngulfing'])
+def _price_patterns(open_, high, low, close):
+    return (pin_bar_array(open_, high, low, close), bullish_engulfing_array(open_, close), bearish_engulfing_array(open_, close))
+
+
+@registry.register('PatternMask', ['open', 'high', 'low', 'close'], ['PatternMask'], params=dict(PATTERN_THRESHOLDS))
+def _pattern_mask(open_, high, low, close, **thresholds):
+    return pattern_bitmask(open_, high, low, close, **thresholds)
@@ -0,0 +1,368 @@
+import math
+import logging
+import threading
+from collections import deque
+
+NAN = float('nan')
+
+
+def _is_zero(value):
+    # TA-Lib solo evita la división cuando el denominador es exactamente cero
+    return value == 0.0
+
+
+def _true_range(high, low, prev_close):
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class _SteppedIndicator:
+    """Indicador cuyo estado es una tupla inmutable: revisar la última vela reaplica el paso sobre el estado anterior."""
+
+    def __init__(self):
+        self._state = self._initial_state()
+        self._base = self._state
+        self.count = 0
+        self.value = NAN
+
+    def update(self, *inputs, revise=False):
+        if not revise or self.count == 0:
+            self._base = self._state
+            self.count += 1
+        self._state, self.value = self._step(self._base, *inputs)
+        return self.value
+
+
+class StreamingSMA:
+    """Media simple con suma acumulada, igual que talib.SMA."""
+
+    def __init__(self, period):
+        self.period = period
+        # Se guarda una vela más que el periodo para poder revisar la última en O(1)
+        self._window = deque(maxlen=period + 1)
+        self._sum = 0.0
+        self.count = 0
+        self.value = NAN
+
+    def update(self, x, revise=False):
+        if revise and self.count:
+            self._sum += x - self._window[-1]
+            self._window[-1] = x
+        else:
+            self._window.append(x)
+            self._sum += x
+            if len(self._window) > self.period:
+                self._sum -= self._window[0]
+            self.count += 1
+        self.value = self._sum / self.period if self.count >= self.period else NAN
+        return self.value
+
+
+class StreamingBBands:
+    """Bandas de Bollinger sobre SMA con desviación típica poblacional, como talib.BBANDS."""
+
+    def __init__(self, period=20, nbdevup=2.0, nbdevdn=2.0):
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self._window = deque(maxlen=period + 1)
+        # Sumas desplazadas respecto a un precio de referencia cercano para evitar la cancelación numérica
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._since_resync = 0
+        self.count = 0
+        self.value = (NAN, NAN, NAN)
+
+    def _resync(self):
+        # Cada period velas se recalculan las sumas desde la ventana: O(1) amortizado y sin deriva acumulada
+        values = list(self._window)[-self.period:]
+        self._shift = values[-1]
+        self._sum = sum(v - self._shift for v in values)
+        self._sum_sq = sum((v - self._shift) ** 2 for v in values)
+        self._since_resync = 0
+
+    def update(self, x, revise=False):
+        shift = self._shift
+        if revise and self.count:
+            old = self._window[-1] - shift
+            self._window[-1] = x
+            self._sum += (x - shift) - old
+            self._sum_sq += (x - shift) ** 2 - old * old
+        else:
+            self._window.append(x)
+            self._sum += x - shift
+            self._sum_sq += (x - shift) ** 2
+            if len(self._window) > self.period:
+                old = self._window[0] - shift
+                self._sum -= old
+                self._sum_sq -= old * old
+            self.count += 1
+            self._since_resync += 1
+            if self._since_resync >= self.period:
+                self._resync()
+        if self.count < self.period:
+            self.value = (NAN, NAN, NAN)
+        else:
+            offset = self._sum / self.period
+            variance = self._sum_sq / self.period - offset * offset
+            deviation = math.sqrt(variance) if variance > 0 else 0.0
+            middle = self._shift + offset
+            self.value = (middle + self.nbdevup * deviation, middle, middle - self.nbdevdn * deviation)
+        return self.value
+
+
+def _ema_step(state, x, period):
+    # Durante el arranque el estado acumula la suma para sembrar con la SMA, como hace TA-Lib
+    count, value = state
+    count += 1
+    if count < period:
+        return (count, value + x), NAN
+    if count == period:
+        value = (value + x) / period
+        return (count, value), value
+    value = (x - value) * (2.0 / (period + 1)) + value
+    return (count, value), value
+
+
+class StreamingEMA(_SteppedIndicator):
+    def __init__(self, period):
+        self.period = period
+        super().__init__()
+
+    def _initial_state(self):
+        return (0, 0.0)
+
+    def _step(self, state, x):
+        return _ema_step(state, x, self.period)
+
+
+class StreamingMACD(_SteppedIndicator):
+    """MACD con la siembra de TA-Lib: la EMA rápida arranca alineada con la lenta y se devuelve NaN hasta tener señal."""
+
+    def __init__(self, fastperiod=12, slowperiod=26, signalperiod=9):
+        self.fastperiod = fastperiod
+        self.slowperiod = slowperiod
+        self.signalperiod = signalperiod
+        super().__init__()
+        self.value = (NAN, NAN, NAN)
+
+    def _initial_state(self):
+        return (0, (0, 0.0), (0, 0.0), (0, 0.0))
+
+    def _step(self, state, x):
+        count, slow_state, fast_state, signal_state = state
+        count += 1
+        slow_state, slow = _ema_step(slow_state, x, self.slowperiod)
+        if count > self.slowperiod - self.fastperiod:
+            fast_state, fast = _ema_step(fast_state, x, self.fastperiod)
+        else:
+            fast = NAN
+        if count < self.slowperiod:
+            return (count, slow_state, fast_state, signal_state), (NAN, NAN, NAN)
+        macd = fast - slow
+        signal_state, signal = _ema_step(signal_state, macd, self.signalperiod)
+        if math.isnan(signal):
+            return (count, slow_state, fast_state, signal_state), (NAN, NAN, NAN)
+        return (count, slow_state, fast_state, signal_state), (macd, signal, macd - signal)
+
+
+class StreamingRSI(_SteppedIndicator):
+    """RSI de Wilder sembrado con la media simple de los primeros cambios, como talib.RSI."""
+
+    def __init__(self, period=14):
+        self.period = period
+        super().__init__()
+
+    def _initial_state(self):
+        return (0, None, 0.0, 0.0)
+
+    def _step(self, state, x):
+        count, prev, gain, loss = state
+        count += 1
+        if prev is None:
+            return (count, x, gain, loss), NAN
+        change = x - prev
+        up, down = (change, 0.0) if change > 0 else (0.0, -change)
+        if count <= self.period:
+            return (count, x, gain + up, loss + down), NAN
+        if count == self.period + 1:
+            gain, loss = (gain + up) / self.period, (loss + down) / self.period
+        else:
+            gain = (gain * (self.period - 1) + up) / self.period
+            loss = (loss * (self.period - 1) + down) / self.period
+        total = gain + loss
+        return (count, x, gain, loss), (100.0 * gain / total if not _is_zero(total) else 0.0)
+
+
+class StreamingATR(_SteppedIndicator):
+    """ATR de Wilder: la primera salida es la media simple de los primeros rangos verdaderos."""
+
+    def __init__(self, period=14):
+        self.period = period
+        super().__init__()
+
+    def _initial_state(self):
+        return (0, None, 0.0)
+
+    def _step(self, state, high, low, close):
+        count, prev_close, atr = state
+        count += 1
+        if prev_close is None:
+            return (count, close, atr), NAN
+        tr = _true_range(high, low, prev_close)
+        if count <= self.period:
+            return (count, close, atr + tr), NAN
+        if count == self.period + 1:
+            atr = (atr + tr) / self.period
+        else:
+            atr = (atr * (self.period - 1) + tr) / self.period
+        return (count, close, atr), atr
+
+
+class StreamingDMI(_SteppedIndicator):
+    """+DI, -DI y ADX compartiendo el rango verdadero y los movimientos direccionales suavizados."""
+
+    def __init__(self, period=14):
+        self.period = period
+        super().__init__()
+        self.value = (NAN, NAN, NAN)
+
+    def _initial_state(self):
+        # (velas, vela anterior, +DM, -DM, TR, suma/valor ADX)
+        return (0, None, 0.0, 0.0, 0.0, 0.0)
+
+    def _step(self, state, high, low, close):
+        period = self.period
+        count, prev, plus_dm, minus_dm, tr, adx = state
+        count += 1
+        if prev is None:
+            return (count, (high, low, close), plus_dm, minus_dm, tr, adx), (NAN, NAN, NAN)
+        prev_high, prev_low, prev_close = prev
+        diff_plus, diff_minus = high - prev_high, prev_low - low
+        bar_plus = diff_plus if diff_plus > 0 and diff_plus > diff_minus else 0.0
+        bar_minus = diff_minus if diff_minus > 0 and diff_plus < diff_minus else 0.0
+        bar_tr = _true_range(high, low, prev_close)
+        prev = (high, low, close)
+
+        if count < period + 1:
+            # Las primeras period-1 velas solo acumulan las sumas de Wilder
+            return (count, prev, plus_dm + bar_plus, minus_dm + bar_minus, tr + bar_tr, adx), (NAN, NAN, NAN)
+        plus_dm = plus_dm - plus_dm / period + bar_plus
+        minus_dm = minus_dm - minus_dm / period + bar_minus
+        tr = tr - tr / period + bar_tr
+
+        if _is_zero(tr):
+            plus_di = minus_di = 0.0
+            dx = None
+        else:
+            plus_di = 100.0 * plus_dm / tr
+            minus_di = 100.0 * minus_dm / tr
+            total = plus_di + minus_di
+            dx = 100.0 * abs(minus_di - plus_di) / total if not _is_zero(total) else None
+
+        # El ADX se siembra con la media de los primeros period DX y después se suaviza con Wilder
+        if count < 2 * period:
+            return (count, prev, plus_dm, minus_dm, tr, adx + (dx or 0.0)), (plus_di, minus_di, NAN)
+        if count == 2 * period:
+            adx = (adx + (dx or 0.0)) / period
+        elif dx is not None:
+            adx = (adx * (period - 1) + dx) / period
+        return (count, prev, plus_dm, minus_dm, tr, adx), (plus_di, minus_di, adx)
+
+
+class StreamingIndicators:
+    """Estado incremental de los indicadores de calculate_indicators para un símbolo y timeframe."""
+
+    def __init__(self):
+        self.sma50 = StreamingSMA(50)
+        self.sma200 = StreamingSMA(200)
+        self.rsi = StreamingRSI(14)
+        self.macd = StreamingMACD(12, 26, 9)
+        self.bbands = StreamingBBands(20)
+        self.atr = StreamingATR(14)
+        self.dmi = StreamingDMI(14)
+        self.last_timestamp = None
+
+    def update(self, candle):
+        """Procesa una vela [timestamp, open, high, low, close, volume]. Si repite timestamp, revisa la última."""
+        timestamp = int(candle[0])
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return False
+        revise = timestamp == self.last_timestamp
+        high, low, close = float(candle[2]), float(candle[3]), float(candle[4])
+        self.sma50.update(close, revise=revise)
+        self.sma200.update(close, revise=revise)
+        self.rsi.update(close, revise=revise)
+        self.macd.update(close, revise=revise)
+        self.bbands.update(close, revise=revise)
+        self.atr.update(high, low, close, revise=revise)
+        self.dmi.update(high, low, close, revise=revise)
+        self.last_timestamp = timestamp
+        return True
+
+    def values(self):
+        # Mismas columnas y mismo relleno con 0 que calculate_indicators
+        macd, macd_signal, _ = self.macd.value
+        upper, middle, lower = self.bbands.value
+        plus_di, minus_di, adx = self.dmi.value
+        return {
+            'SMA50': _zero_if_nan(self.sma50.value),
+            'SMA200': _zero_if_nan(self.sma200.value),
+            'RSI': _zero_if_nan(self.rsi.value),
+            'MACD': macd,
+            'MACDSignal': macd_signal,
+            'BollingerUpper': upper,
+            'BollingerMiddle': middle,
+            'BollingerLower': lower,
+            'ATR': _zero_if_nan(self.atr.value),
+            'ADX': _zero_if_nan(adx),
+            'PlusDI': _zero_if_nan(plus_di),
+            'MinusDI': _zero_if_nan(minus_di),
+        }
+
+
+def _zero_if_nan(value):
+    return 0.0 if math.isnan(value) else value
+
+
+class IndicatorEngine:
+    """Indicadores incrementales para muchos símbolos: cada vela nueva o revisada cuesta O(1)."""
+
+    def __init__(self):
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _get_state(self, key, reset=False):
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or reset:
+                state = StreamingIndicators()
+                self._states[key] = state
+            return state
+
+    def update(self, symbol, timeframe, ohlcv, reset=False):
+        """Aplica velas ordenadas por timestamp. Con reset=True se reconstruye el estado desde cero."""
+        state = self._get_state((symbol, timeframe), reset)
+        applied = 0
+        for candle in sorted(ohlcv, key=lambda candle: candle[0]):
+            if state.update(candle):
+                applied += 1
+        return applied
+
+    def on_candles(self, symbol, timeframe, ohlcv, full_load):
+        try:
+            self.update(symbol, timeframe, ohlcv, reset=full_load)
+        except Exception as e:
+            logging.error(f"Error actualizando indicadores incrementales de {symbol} {timeframe}: {e}")
+
+    def values(self, symbol, timeframe):
+        state = self._states.get((symbol, timeframe))
+        if state is None or state.last_timestamp is None:
+            return None
+        return dict(state.values(), timestamp=state.last_timestamp)
+
+    def reset(self, symbol=None, timeframe=None):
+        with self._lock:
+            for key in list(self._states):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    del self._states[key]
@@ -1,26 +1,22 @@
-import talib
 import logging
-import json
-from patterns.price_action_patterns import is_pin_bar, is_bullish_engulfing, is_bearish_engulfing
+from config import FEATURE_CACHE_SIZE, FEATURE_CACHE_DIR
+from indicators.registry import registry
+from indicators.feature_cache import FeatureCache
 
-def calculate_indicators(df):
-    try:
-        # Calcular indicadores técnicos
-        df['SMA50'] = talib.SMA(df['close'], timeperiod=50).fillna(0)
-        df['SMA200'] = talib.SMA(df['close'], timeperiod=200).fillna(0)
-        df['RSI'] = talib.RSI(df['close'], timeperiod=14).fillna(0)
-        df['MACD'], df['MACDSignal'], _ = talib.MACD(df['close'], fastperiod=12, slowperiod=26, signalperiod=9)
-        df['BollingerUpper'], df['BollingerMiddle'], df['BollingerLower'] = talib.BBANDS(df['close'], timeperiod=20)
-        df['ATR'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14).fillna(0)
-        df['ADX'] = talib.ADX(df['high'], df['low'], df['close'], timeperiod=14).fillna(0)
-        df['PlusDI'] = talib.PLUS_DI(df['high'], df['low'], df['close'], timeperiod=14).fillna(0)
-        df['MinusDI'] = talib.MINUS_DI(df['high'], df['low'], df['close'], timeperiod=14).fillna(0)
-
-        # Detectar patrones de acción del precio
-        df['PinBar'] = [is_pin_bar(df, i) for i in range(len(df))]
-        df['BullishEngulfing'] = [is_bullish_engulfing(df, i) for i in range(len(df))]
-        df['BearishEngulfing'] = [is_bearish_engulfing(df, i) for i in range(len(df))]
+# Memo compartida: las mismas velas pasan varias veces por aquí (bot, estrategia, backtests con otros parámetros)
+feature_cache = FeatureCache(FEATURE_CACHE_SIZE, FEATURE_CACHE_DIR) if FEATURE_CACHE_SIZE > 0 else None
+
+# Columnas que calculate_indicators generaba antes del registro
+ALL_FEATURES = [
+    'SMA50', 'SMA200', 'RSI', 'MACD', 'MACDSignal', 'BollingerUpper', 'BollingerMiddle', 'BollingerLower',
+    'ATR', 'ADX', 'PlusDI', 'MinusDI', 'PinBar', 'BullishEngulfing', 'BearishEngulfing',
+]
 
+def calculate_indicators(df, features=None, cache=feature_cache):
+    """Devuelve un DataFrame nuevo con las columnas pedidas; solo se calculan esos indicadores y sus dependencias."""
+    try:
+        features = ALL_FEATURES if features is None else features
+        df = registry.compute(df, features, cache=cache)
         logging.info(f"Indicadores técnicos y patrones calculados. Columnas del DataFrame: {df.columns}")
     except Exception as e:
         logging.error(f"Error calculando indicadores técnicos: {e}")
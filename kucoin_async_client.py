@@ -0,0 +1,171 @@
+import json
+import asyncio
+import logging
+import threading
+import aiohttp
+from kucoin_signature import get_kucoin_headers
+from config import KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, ACCOUNT_TYPE, MARGIN_TYPE, HTTP_POOL_SIZE, HTTP_TIMEOUT, RATE_LIMIT_RETRIES
+from kucoin_requests import get_base_url
+from kucoin_rate_limiter import rate_limiter, classify_request
+
+
+class KucoinResponse:
+    """Respuesta ya leída, con la misma interfaz mínima que requests.Response."""
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncKucoinClient:
+    """Cliente asyncio de KuCoin con la misma superficie que kucoin_requests."""
+
+    def __init__(self, base_url=None, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, rate_limit_retries=RATE_LIMIT_RETRIES):
+        self.base_url = base_url or get_base_url()
+        self.rate_limit_retries = rate_limit_retries
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _request(self, method, endpoint, body=None):
+        group, weight, priority = classify_request(method, self.base_url, endpoint)
+        for attempt in range(self.rate_limit_retries + 1):
+            await rate_limiter.acquire_async(group, weight, priority)
+            response = await self._send(method, endpoint, body)
+            rate_limiter.update_from_headers(group, response.headers)
+            if response.status_code != 429:
+                return response
+            reset = response.headers.get('gw-ratelimit-reset')
+            rate_limiter.penalize(group, int(reset) if reset else 500 * 2 ** attempt)
+        return response
+
+    async def _send(self, method, endpoint, body=None):
+        payload = json.dumps(body) if body is not None else ''
+        headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, method, endpoint, payload)
+        session = await self._get_session()
+        async with session.request(method, self.base_url + endpoint, headers=headers, data=payload or None) as response:
+            return KucoinResponse(response.status, await response.text(), response.headers)
+
+    async def get_market_data(self, symbol, timeframe='1hour'):
+        endpoint = f'/api/v1/market/candles?type={timeframe}&symbol={symbol}'
+        response = await self._request('GET', endpoint)
+        return response.json()
+
+    async def get_account_balance(self):
+        endpoint = '/api/v1/margin/account' if ACCOUNT_TYPE == 'margin' else '/api/v1/accounts'
+        response = await self._request('GET', endpoint)
+        return response.json()
+
+    async def place_order(self, client_oid, symbol, side, order_type, size, price=None, leverage=None):
+        endpoint = '/api/v1/margin/order' if ACCOUNT_TYPE == 'margin' else '/api/v1/orders'
+        body = {
+            'clientOid': client_oid,
+            'side': side,
+            'symbol': symbol,
+            'type': order_type,
+            'size': size
+        }
+
+        if price:
+            body['price'] = price
+
+        if ACCOUNT_TYPE == 'margin' and leverage:
+            body['leverage'] = leverage
+
+        response = await self._request('POST', endpoint, body)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            logging.error(f"Error al colocar la orden: {response.text}")
+            return None
+
+    async def cancel_order(self, order_id, symbol):
+        response = await self._request('DELETE', f'/api/v1/orders/{order_id}')
+        return response.json()
+
+    async def get_order_status(self, order_id, symbol):
+        response = await self._request('GET', f'/api/v1/orders/{order_id}')
+        return response.json()
+
+    async def get_open_orders(self, symbol):
+        response = await self._request('GET', f'/api/v1/orders?status=active&symbol={symbol}')
+        if response.status_code == 200:
+            return response.json()
+        else:
+            logging.error(f"Error al obtener órdenes abiertas: {response.text}")
+            return None
+
+    async def get_open_orders_futures(self, symbol):
+        response = await self._request('GET', f'/api/v1/orders?status=active&symbol={symbol}')
+        return response.json()
+
+    async def get_open_orders_margin(self, symbol):
+        endpoint = f'/api/v1/margin/order?status=active&symbol={symbol}' if MARGIN_TYPE == 'cross' else f'/api/v1/isolated/order?status=active&symbol={symbol}'
+        response = await self._request('GET', endpoint)
+        return response.json()
+
+    # Operaciones en lote: todas las peticiones comparten el event loop y el pool de conexiones
+    async def place_orders(self, orders):
+        return await asyncio.gather(*(self.place_order(**order) for order in orders), return_exceptions=True)
+
+    async def cancel_orders(self, order_ids, symbol):
+        return await asyncio.gather(*(self.cancel_order(order_id, symbol) for order_id in order_ids), return_exceptions=True)
+
+    async def get_orders_status(self, order_ids, symbol):
+        return await asyncio.gather(*(self.get_order_status(order_id, symbol) for order_id in order_ids), return_exceptions=True)
+
+
+class SyncKucoinClient:
+    """Envoltorio bloqueante que ejecuta AsyncKucoinClient en un event loop propio en segundo plano."""
+
+    def __init__(self, client=None):
+        self.client = client or AsyncKucoinClient()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='kucoin-async-client', daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if not asyncio.iscoroutinefunction(method):
+            return method
+        return lambda *args, **kwargs: self.run(method(*args, **kwargs))
+
+    def close(self):
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_sync_client = None
+_sync_client_lock = threading.Lock()
+
+
+def get_sync_client():
+    global _sync_client
+    with _sync_client_lock:
+        if _sync_client is None:
+            _sync_client = SyncKucoinClient()
+        return _sync_client
@@ -0,0 +1,156 @@
+import re
+import json
+import time
+import logging
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import BASE_URL_SPOT, BASE_URL_FUTURES, BASE_URL_MARGIN, HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR
+from config import KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, RATE_LIMIT_RETRIES
+from kucoin_signature import get_kucoin_headers
+from kucoin_rate_limiter import rate_limiter as default_rate_limiter, classify_request
+
+# Segmentos de ruta que son identificadores (orderId, clientOid...) se agrupan en las métricas
+_ID_SEGMENT = re.compile(r'/[0-9a-fA-F-]{12,}(?=/|$)')
+
+
+def _endpoint_key(method, endpoint):
+    path = endpoint.split('?', 1)[0]
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+class KucoinHttpClient:
+    """Sesiones HTTP keep-alive por URL base con pool, timeouts, reintentos y métricas de latencia."""
+
+    def __init__(self, base_urls, pool_size=10, timeout=10, max_retries=3, backoff_factor=0.3, timing_window=500,
+                 rate_limiter=None, rate_limit_retries=2):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timing_window = timing_window
+        self.rate_limiter = rate_limiter
+        self.rate_limit_retries = rate_limit_retries
+        self._sessions = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+        for base_url in base_urls:
+            self._session(base_url)
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            # Las órdenes (POST) nunca se reintentan automáticamente para no duplicarlas
+            allowed_methods=frozenset({'GET', 'DELETE'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry, pool_block=False)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _session(self, base_url):
+        session = self._sessions.get(base_url)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(base_url)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[base_url] = session
+        return session
+
+    def _record(self, key, elapsed_ms):
+        # Mismo lock que timing_stats: ordenar un deque mientras otro hilo añade lanza RuntimeError
+        with self._lock:
+            self._timings.setdefault(key, deque(maxlen=self.timing_window)).append(elapsed_ms)
+
+    def _send(self, method, base_url, endpoint, key, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._session(base_url).request(method, base_url + endpoint, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._record(key, elapsed_ms)
+            logging.debug(f"{key} completada en {elapsed_ms:.1f} ms")
+
+    @staticmethod
+    def _resign(method, endpoint, kwargs):
+        # La firma caduca a los pocos segundos: tras esperar turno en el limitador se vuelve a firmar
+        headers = kwargs.get('headers')
+        if not headers or 'KC-API-SIGN' not in headers:
+            return
+        if 'json' in kwargs and kwargs['json'] is not None:
+            body = json.dumps(kwargs['json'])
+        else:
+            body = kwargs.get('data') or ''
+        kwargs['headers'] = dict(headers, **get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, method, endpoint, body))
+
+    def request(self, method, base_url, endpoint, priority=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        key = _endpoint_key(method, endpoint)
+        if self.rate_limiter is None:
+            return self._send(method, base_url, endpoint, key, **kwargs)
+
+        group, weight, default_priority = classify_request(method, base_url, endpoint)
+        priority = default_priority if priority is None else priority
+        for attempt in range(self.rate_limit_retries + 1):
+            self.rate_limiter.acquire(group, weight, priority)
+            self._resign(method, endpoint, kwargs)
+            response = self._send(method, base_url, endpoint, key, **kwargs)
+            self.rate_limiter.update_from_headers(group, response.headers)
+            if response.status_code != 429:
+                return response
+            reset = response.headers.get('gw-ratelimit-reset')
+            retry_after_ms = int(reset) if reset else int(1000 * self.backoff_factor * 2 ** (attempt + 1))
+            self.rate_limiter.penalize(group, retry_after_ms)
+        logging.error(f"{key} sigue limitada (429) tras {self.rate_limit_retries} reintentos")
+        return response
+
+    def get(self, base_url, endpoint, **kwargs):
+        return self.request('GET', base_url, endpoint, **kwargs)
+
+    def post(self, base_url, endpoint, **kwargs):
+        return self.request('POST', base_url, endpoint, **kwargs)
+
+    def delete(self, base_url, endpoint, **kwargs):
+        return self.request('DELETE', base_url, endpoint, **kwargs)
+
+    def timing_stats(self):
+        with self._lock:
+            snapshot = {key: list(timings) for key, timings in self._timings.items()}
+        stats = {}
+        for key, timings in snapshot.items():
+            values = sorted(timings)
+            if not values:
+                continue
+            stats[key] = {
+                'count': len(values),
+                'last_ms': timings[-1],
+                'avg_ms': sum(values) / len(values),
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max_ms': values[-1],
+            }
+        return stats
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+http_client = KucoinHttpClient(
+    [BASE_URL_SPOT, BASE_URL_FUTURES, BASE_URL_MARGIN],
+    pool_size=HTTP_POOL_SIZE,
+    timeout=HTTP_TIMEOUT,
+    max_retries=HTTP_MAX_RETRIES,
+    backoff_factor=HTTP_BACKOFF_FACTOR,
+    rate_limiter=default_rate_limiter,
+    rate_limit_retries=RATE_LIMIT_RETRIES,
+)
@@ -0,0 +1,203 @@
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+from config import BASE_URL_FUTURES, RATE_LIMIT_PUBLIC, RATE_LIMIT_SPOT, RATE_LIMIT_FUTURES, RATE_LIMIT_WINDOW_MS
+
+# Prioridades: menor valor = se atiende antes
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET_DATA = 2
+
+# Rutas públicas que consumen del pool "public" de KuCoin
+PUBLIC_PREFIXES = (
+    '/api/v1/market/', '/api/v1/symbols', '/api/v2/symbols', '/api/v1/currencies', '/api/v3/currencies',
+    '/api/v1/bullet-public', '/api/v1/contracts/', '/api/v1/ticker', '/api/v1/timestamp', '/api/v1/kline',
+)
+
+# Pesos por endpoint según la documentación de KuCoin (el resto pesa 2 por defecto)
+ENDPOINT_WEIGHTS = {
+    ('GET', '/api/v1/market/orderbook/level1'): 2,
+    ('GET', '/api/v1/market/candles'): 3,
+    ('GET', '/api/v1/symbols'): 4,
+    ('GET', '/api/v2/symbols'): 4,
+    ('GET', '/api/v1/contracts/active'): 3,
+    ('GET', '/api/v1/bullet-public'): 10,
+    ('POST', '/api/v1/bullet-public'): 10,
+    ('POST', '/api/v1/orders'): 2,
+    ('POST', '/api/v1/margin/order'): 5,
+    ('DELETE', '/api/v1/orders'): 3,
+    ('GET', '/api/v1/orders'): 2,
+    ('GET', '/api/v1/accounts'): 5,
+    ('GET', '/api/v1/margin/account'): 40,
+}
+
+
+def classify_request(method, base_url, endpoint):
+    """Devuelve (grupo, peso, prioridad) para una petición REST."""
+    path = endpoint.split('?', 1)[0]
+    if path.startswith(PUBLIC_PREFIXES):
+        group = 'public'
+    elif base_url == BASE_URL_FUTURES:
+        group = 'futures'
+    else:
+        group = 'spot'
+
+    weight = ENDPOINT_WEIGHTS.get((method, path))
+    if weight is None:
+        # /api/v1/orders/{orderId} y similares usan el peso de la ruta base
+        weight = ENDPOINT_WEIGHTS.get((method, path.rsplit('/', 1)[0]), 2)
+
+    if group == 'public':
+        priority = PRIORITY_MARKET_DATA
+    elif method in ('POST', 'DELETE') and ('/order' in path or '/position' in path):
+        priority = PRIORITY_ORDER
+    else:
+        priority = PRIORITY_ACCOUNT
+    return group, weight, priority
+
+
+class _Bucket:
+    def __init__(self, capacity, window_ms):
+        self.capacity = capacity
+        self.refill_per_ms = capacity / window_ms
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.queue = []
+        self.counters = {'requests': 0, 'weight': 0, 'wait_ms': 0.0, 'throttled': 0, 'remaining': None}
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * 1000 * self.refill_per_ms)
+        self.updated_at = now
+
+    def wait_time(self, weight, now):
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= weight:
+            return 0.0
+        return (weight - self.tokens) / self.refill_per_ms / 1000
+
+
+class RateLimiter:
+    """Token bucket por grupo de endpoints con cola por prioridad y ajuste según las cabeceras gw-ratelimit-*."""
+
+    def __init__(self, quotas, window_ms=30000):
+        self._buckets = {group: _Bucket(capacity, window_ms) for group, capacity in quotas.items()}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        # Esperas asíncronas (loop, evento): se despiertan junto a los hilos cada vez que cambia una cola o un bucket
+        self._async_waiters = set()
+
+    def _bucket(self, group):
+        return self._buckets[group] if group in self._buckets else self._buckets['spot']
+
+    def _notify(self):
+        # Llamar con self._condition tomado
+        self._condition.notify_all()
+        for loop, event in self._async_waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(event.set)
+
+    def _try_consume(self, bucket, weight, priority, ticket=None):
+        now = time.monotonic()
+        bucket.refill(now)
+        # Solo puede consumir quien encabeza la cola (o nadie de mayor prioridad espera)
+        if bucket.queue and bucket.queue[0] != ticket and bucket.queue[0][0] <= priority:
+            return max(0.001, bucket.wait_time(weight, now))
+        wait = bucket.wait_time(weight, now)
+        if wait > 0:
+            return wait
+        bucket.tokens -= weight
+        bucket.counters['requests'] += 1
+        bucket.counters['weight'] += weight
+        return 0.0
+
+    def acquire(self, group, weight=1, priority=PRIORITY_ACCOUNT, timeout=None):
+        bucket = self._bucket(group)
+        start = time.monotonic()
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(bucket.queue, ticket)
+            try:
+                while True:
+                    wait = self._try_consume(bucket, weight, priority, ticket)
+                    if wait == 0:
+                        break
+                    if timeout is not None and time.monotonic() - start + wait > timeout:
+                        raise TimeoutError(f"Rate limit de {group} no disponible en {timeout} s")
+                    self._condition.wait(wait)
+            finally:
+                bucket.queue.remove(ticket)
+                heapq.heapify(bucket.queue)
+                self._notify()
+        bucket.counters['wait_ms'] += (time.monotonic() - start) * 1000
+
+    async def acquire_async(self, group, weight=1, priority=PRIORITY_ACCOUNT):
+        """Igual que acquire pero sin bloquear el loop: el ticket entra en la misma cola por prioridad que los hilos."""
+        bucket = self._bucket(group)
+        start = time.monotonic()
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(bucket.queue, ticket)
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                with self._condition:
+                    wait = self._try_consume(bucket, weight, priority, ticket)
+                if wait == 0:
+                    break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+                bucket.queue.remove(ticket)
+                heapq.heapify(bucket.queue)
+                self._notify()
+        bucket.counters['wait_ms'] += (time.monotonic() - start) * 1000
+
+    def update_from_headers(self, group, headers):
+        remaining = headers.get('gw-ratelimit-remaining')
+        reset = headers.get('gw-ratelimit-reset')
+        if remaining is None:
+            return
+        bucket = self._bucket(group)
+        with self._condition:
+            remaining = int(remaining)
+            bucket.counters['remaining'] = remaining
+            # El servidor manda: nunca creer que quedan más tokens de los que dice KuCoin
+            bucket.tokens = min(bucket.tokens, remaining)
+            if remaining <= 0 and reset is not None:
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + int(reset) / 1000)
+            self._notify()
+
+    def penalize(self, group, retry_after_ms):
+        bucket = self._bucket(group)
+        with self._condition:
+            bucket.counters['throttled'] += 1
+            bucket.tokens = 0
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + retry_after_ms / 1000)
+        logging.warning(f"Rate limit alcanzado en el grupo {group}. Pausa de {retry_after_ms} ms")
+
+    def stats(self):
+        now = time.monotonic()
+        result = {}
+        with self._condition:
+            for group, bucket in self._buckets.items():
+                bucket.refill(now)
+                result[group] = dict(bucket.counters, tokens=bucket.tokens, queued=len(bucket.queue),
+                                     blocked_ms=max(0.0, (bucket.blocked_until - now) * 1000))
+        return result
+
+
+rate_limiter = RateLimiter(
+    {'public': RATE_LIMIT_PUBLIC, 'spot': RATE_LIMIT_SPOT, 'futures': RATE_LIMIT_FUTURES},
+    window_ms=RATE_LIMIT_WINDOW_MS,
+)
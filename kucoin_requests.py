@@ -1,7 +1,7 @@
-import requests
 import json
 import logging
 from kucoin_signature import get_kucoin_headers
+from kucoin_client import http_client
 from config import KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, ACCOUNT_TYPE, MARGIN_TYPE
 
 BASE_URL_SPOT = 'https://api.kucoin.com'
@@ -20,7 +20,7 @@ def get_market_data(symbol, timeframe='1hour'):
     endpoint = f'/api/v1/market/candles?type={timeframe}&symbol={symbol}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     return response.json()
 
 def get_account_balance():
@@ -28,7 +28,7 @@ def get_account_balance():
     endpoint = '/api/v1/margin/account' if ACCOUNT_TYPE == 'margin' else '/api/v1/accounts'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     return response.json()
 
 def place_order(client_oid, symbol, side, order_type, size, price=None, leverage=None):
@@ -50,7 +50,7 @@ def place_order(client_oid, symbol, side, order_type, size, price=None, leverage
 
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'POST', endpoint, json.dumps(body))
     
-    response = requests.post(base_url + endpoint, headers=headers, json=body)
+    response = http_client.post(base_url, endpoint, headers=headers, json=body)
     
     if response.status_code == 200:
         return response.json()
@@ -64,7 +64,7 @@ def cancel_order(order_id, symbol):
     endpoint = f'/api/v1/orders/{order_id}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'DELETE', endpoint)
     
-    response = requests.delete(base_url + endpoint, headers=headers)
+    response = http_client.delete(base_url, endpoint, headers=headers)
     return response.json()
 
 def get_order_status(order_id, symbol):
@@ -72,7 +72,7 @@ def get_order_status(order_id, symbol):
     endpoint = f'/api/v1/orders/{order_id}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     return response.json()
 
 def get_open_orders(symbol):
@@ -80,7 +80,7 @@ def get_open_orders(symbol):
     endpoint = f'/api/v1/orders?status=active&symbol={symbol}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     if response.status_code == 200:
         return response.json()
     else:
@@ -93,7 +93,7 @@ def get_open_orders_futures(symbol):
     endpoint = f'/api/v1/orders?status=active&symbol={symbol}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     return response.json()
 
 def get_open_orders_margin(symbol):
@@ -101,7 +101,7 @@ def get_open_orders_margin(symbol):
     endpoint = f'/api/v1/margin/order?status=active&symbol={symbol}' if MARGIN_TYPE == 'cross' else f'/api/v1/isolated/order?status=active&symbol={symbol}'
     headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'GET', endpoint)
     
-    response = requests.get(base_url + endpoint, headers=headers)
+    response = http_client.get(base_url, endpoint, headers=headers)
     return response.json()
 
 
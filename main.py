@@ -1,5 +1,4 @@
 import time
-import requests
 import asyncio
 import websockets
 import datetime
@@ -10,11 +9,16 @@ import logging
 import threading
 from utils.logging_setup import setup_logging
 from data.data_fetcher import get_market_data, get_account_balance, calculate_trade_amount, place_order, get_open_orders, get_open_orders_futures, get_current_price, update_artificial_balance
+from data.data_fetcher import market_stream
+from data.candle_frame import CandleFrame, as_candle_frame
 from indicators.technical_indicators import calculate_indicators
 from config import SYMBOL, ACCOUNT_TYPE, TIMEFRAME, LIMIT, RISK_PER_TRADE, SYMBOL_SPOT, EXCHANGE, MAX_CAPITAL_USAGE, SYMBOL_FUTURES, LEVERAGE, SYMBOL_MARGIN, MARGIN_TYPE, ARTIFICIAL_BALANCE, TRAILING_STOP_PCT, TAKE_PROFIT_MULTIPLIER
 from utils.gpt4_integration import get_gpt4_recommendation, prepare_historical_data
-from strategies.trading_strategy import manage_position_with_trail_stop, confirm_entry_with_gpt
+from strategies.trading_strategy import close_positions, confirm_entry_with_gpt, REQUIRED_FEATURES
+from strategies.position_book import PositionBook
+from strategies.stop_monitor import StopMonitor
 from kucoin_signature import get_kucoin_headers
+from kucoin_client import http_client
 from config import KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE
 from kucoin_requests import BASE_URL_FUTURES, get_open_orders_margin, BASE_URL_MARGIN
 from stream_trading.stream_logs import run_server, add_log_message
@@ -52,7 +56,7 @@ def set_leverage(symbol, leverage, margin_type=None):
             return
 
         headers = get_kucoin_headers(KUCOIN_API_KEY, KUCOIN_API_SECRET, KUCOIN_API_PASSPHRASE, 'POST', endpoint)
-        response = requests.post(base_url + endpoint, headers=headers)
+        response = http_client.post(base_url, endpoint, headers=headers)
 
         if response.status_code == 200:
             logging.info(f"Apalancamiento configurado a {leverage}x para {symbol}")
@@ -132,19 +136,19 @@ def trigger_manual_order(side, amount):
 
 def check_trade_conditions(df, account_balance):
     try:
-        latest_data = df.iloc[-1]
+        candles = as_candle_frame(df)
 
         indicators = {
-            'gpt4_sentiment': latest_data['GPT4_Sentiment'],
-            'gpt4_risk': latest_data['GPT4_RiskAssessment'],
-            'rsi': latest_data['RSI'],
-            'macd': latest_data['MACD'],
-            'macd_signal': latest_data['MACDSignal'],
-            'sma50': latest_data['SMA50'],
-            'close_price': latest_data['close'],
-            'pin_bar': latest_data['PinBar'],
-            'bullish_engulfing': latest_data['BullishEngulfing'],
-            'bearish_engulfing': latest_data['BearishEngulfing']
+            'gpt4_sentiment': candles.value('GPT4_Sentiment'),
+            'gpt4_risk': candles.value('GPT4_RiskAssessment'),
+            'rsi': candles.value('RSI'),
+            'macd': candles.value('MACD'),
+            'macd_signal': candles.value('MACDSignal'),
+            'sma50': candles.value('SMA50'),
+            'close_price': candles.value('close'),
+            'pin_bar': candles.value('PinBar'),
+            'bullish_engulfing': candles.value('BullishEngulfing'),
+            'bearish_engulfing': candles.value('BearishEngulfing')
         }
 
         logging.info("Evaluando condiciones de trading: %s", indicators)
@@ -241,10 +245,14 @@ def run_trading_bot(use_artificial=True):
         logging.info("💹 Operando en cuenta spot.")
         add_log_message("💹 Operando en cuenta spot.")
 
+    if market_stream is not None:
+        market_stream.start([symbol], TIMEFRAME)
+        add_log_message(f"📡 Stream de precios activo para {symbol}")
+
     # Recuperación de órdenes activas
     active_orders = [order for order in balance_manager.get_operations() if order.get('status') in ['open', 'active']]
     
-    positions = []
+    position_book = PositionBook()
     if active_orders:
         for order in active_orders:
             if order['side'] in ['buy', 'sell']:
@@ -257,7 +265,7 @@ def run_trading_bot(use_artificial=True):
                     'position_size': float(order['size']),
                     'order_id': order['orderId']
                 }
-                positions.append(position)
+                position_book.add(symbol, **position)
                 current_price = get_current_price(symbol)
                 logging.info(f"Recuperada orden {position['in_position']} ID {position['order_id']} con precio de entrada {position['entry_price']}")
                 add_log_message(f"Recuperada orden {position['in_position']} ID {position['order_id']} con precio de entrada {position['entry_price']}")
@@ -265,6 +273,12 @@ def run_trading_bot(use_artificial=True):
         logging.info("📭 No hay órdenes abiertas.")
         add_log_message("📭 No hay órdenes abiertas.")
 
+    # Con stream de precios los stops y take profits se evalúan en cada ticker, no solo una vez por ciclo
+    if market_stream is not None:
+        stop_monitor = StopMonitor(position_book, balance_manager)
+        stop_monitor.start(market_stream)
+        add_log_message("🛡️ Monitor de stops activo en cada ticker")
+
     while True:
         try:
             logging.info("💼 Obteniendo datos del mercado...")
@@ -275,7 +289,7 @@ def run_trading_bot(use_artificial=True):
                 add_log_message("📊 Datos del mercado obtenidos.")
                 logging.info("📈 Calculando indicadores técnicos...")
                 add_log_message("📈 Calculando indicadores técnicos...")
-                df = calculate_indicators(df)
+                df = calculate_indicators(df, REQUIRED_FEATURES)
                 logging.info("📊 Indicadores técnicos calculados.")
                 add_log_message("📊 Indicadores técnicos calculados.")
                 if logging_thread is None or not logging_thread.is_alive():
@@ -289,6 +303,11 @@ def run_trading_bot(use_artificial=True):
                 logging.info("🧠 Solicitando recomendación a GPT-4...")
                 add_log_message("🧠 Solicitando recomendación a GPT-4...")
                 gpt4_recommendation = get_gpt4_recommendation(historical_data, current_price, percentage_change_24h, percentage_change_hourly, trading_volume)
+                # Columnas NumPy para las decisiones del ciclo; el DataFrame queda para el log y el resumen de GPT-4
+                candles = CandleFrame.from_frame(df, attrs={
+                    'GPT4_Sentiment': gpt4_recommendation['sentiment'],
+                    'GPT4_RiskAssessment': gpt4_recommendation['risk_assessment'],
+                })
                 df['GPT4_Sentiment'] = gpt4_recommendation['sentiment']
                 df['GPT4_RiskAssessment'] = gpt4_recommendation['risk_assessment']
                 logging.info(f"🤖 Recomendación GPT-4: Sentimiento {gpt4_recommendation['sentiment']}, Evaluación de Riesgo {gpt4_recommendation['risk_assessment']}")
@@ -315,28 +334,19 @@ def run_trading_bot(use_artificial=True):
                         logging.warning(f"Uso de capital máximo alcanzado: {capital_usado} USDT de {total_balance} USDT.")
                         add_log_message(f"Uso de capital máximo alcanzado: {capital_usado} USDT de {total_balance} USDT.")
                     else:
-                        for position in positions:
-                            in_position, stop_loss = manage_position_with_trail_stop(
-                                df, 
-                                -1, 
-                                position['in_position'], 
-                                position['entry_price'], 
-                                position['stop_loss'], 
-                                position['take_profit'], 
-                                symbol, 
-                                position['position_size'], 
-                                position['order_id'], 
-                                TRAILING_STOP_PCT,  # Usa la variable correctamente importada
-                                balance_manager
-                            )
-                            if in_position == 'closed':
-                                balance_manager.close_operation(position['order_id'])
-                                balance_manager.update_balance(position['position_size'], current_price, 'sell')  # Actualizar balance aquí
-                            logging.info(f"Gestionando posición {in_position}. Stop loss: {stop_loss}, Take profit: {position['take_profit']}.")
-                            add_log_message(f"Gestionando posición {in_position}. Stop loss: {stop_loss}, Take profit: {position['take_profit']}.")
-
-                        if not any(position['in_position'] for position in positions):
-                            action = check_trade_conditions(df, account_balance)
+                        # Todas las posiciones abiertas se actualizan en un solo paso; solo se recorren los cierres.
+                        # Con el monitor de stops activo esto es un respaldo: las posiciones ya cerradas no están en el libro
+                        exits = position_book.update({symbol: current_price})
+                        failed = close_positions(exits, balance_manager, candles.timestamp())
+                        # Los cierres cuya orden no salió vuelven al libro y se reintentan en el siguiente ciclo
+                        position_book.restore(failed)
+                        for exit in (exit for exit in exits if exit not in failed):
+                            logging.info(f"Posición {exit['in_position']} cerrada por {exit['reason']} en {exit['price']}. ID de la orden: {exit['order_id']}")
+                            add_log_message(f"Posición {exit['in_position']} cerrada por {exit['reason']} en {exit['price']}. ID de la orden: {exit['order_id']}")
+                        logging.info(f"Posiciones abiertas gestionadas: {len(position_book)}")
+
+                        if len(position_book) == 0:
+                            action = check_trade_conditions(candles, account_balance)
                             if action:
                                 entry_price = current_price
                                 stop_loss = entry_price * (1 - 0.02) if action == 'buy' else entry_price * (1 + 0.02)
@@ -361,16 +371,11 @@ def run_trading_bot(use_artificial=True):
                                                 'timestamp': str(datetime.datetime.now()),
                                                 'balance': account_balance
                                             }
-                                            balance_manager.add_operation(operation)
-                                            balance_manager.update_balance(position_size, entry_price, action)  # Actualizar balance aquí
-                                            positions.append({
-                                                'in_position': action,
-                                                'entry_price': entry_price,
-                                                'stop_loss': stop_loss,
-                                                'take_profit': take_profit,
-                                                'position_size': position_size,
-                                                'order_id': order_id
-                                            })
+                                            # El StopMonitor escribe en el mismo balance desde su hilo
+                                            with balance_manager.lock:
+                                                balance_manager.add_operation(operation)
+                                                balance_manager.update_balance(position_size, entry_price, action)  # Actualizar balance aquí
+                                            position_book.add(symbol, action, entry_price, stop_loss, take_profit, position_size, order_id)
                                 else:
                                     logging.error(f"Trade amount {position_size} es menor que el mínimo requerido.")
                                     add_log_message(f"Trade amount {position_size} es menor que el mínimo requerido.")
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import logging
 
 def is_pin_bar(df, index):
@@ -37,3 +38,198 @@ def is_bearish_engulfing(df, index):
     except Exception as e:
         logging.error(f"Error al verificar Bearish Engulfing en índice {index}: {e}")
         return False
+
+
+# Versiones vectorizadas: calculan el patrón para todo el DataFrame en una sola pasada de NumPy.
+# Devuelven lo mismo que aplicar la función escalar a cada índice (el índice 0 siempre es False).
+# Operan sobre el último eje, así que también aceptan matrices (símbolos x velas).
+
+def _ohlc_arrays(df):
+    return (df['open'].to_numpy(dtype=np.float64), df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64), df['close'].to_numpy(dtype=np.float64))
+
+def pin_bar_array(open_, high, low, close):
+    body = np.abs(close - open_)
+    tail = np.abs(high - low)
+    result = (tail > 2 * body) & (np.minimum(close, open_) > low) & (np.maximum(close, open_) < high)
+    result[..., :1] = False
+    return result
+
+def bullish_engulfing_array(open_, close):
+    result = np.zeros(np.shape(close), dtype=bool)
+    prev_open, prev_close, curr_open, curr_close = open_[..., :-1], close[..., :-1], open_[..., 1:], close[..., 1:]
+    result[..., 1:] = (prev_close < prev_open) & (curr_close > curr_open) & (curr_close > prev_open) & (curr_open < prev_close)
+    return result
+
+def bearish_engulfing_array(open_, close):
+    result = np.zeros(np.shape(close), dtype=bool)
+    prev_open, prev_close, curr_open, curr_close = open_[..., :-1], close[..., :-1], open_[..., 1:], close[..., 1:]
+    result[..., 1:] = (prev_close > prev_open) & (curr_close < curr_open) & (curr_open > prev_close) & (curr_close < prev_open)
+    return result
+
+def detect_price_action_patterns(df):
+    open_, high, low, close = _ohlc_arrays(df)
+    return {
+        'PinBar': pin_bar_array(open_, high, low, close),
+        'BullishEngulfing': bullish_engulfing_array(open_, close),
+        'BearishEngulfing': bearish_engulfing_array(open_, close),
+    }
+
+
+# Biblioteca ampliada de patrones de velas. Cada patrón ocupa un bit de la máscara PatternMask,
+# así que comprobar varios patrones en una vela es un AND de bits: mask & pattern_mask('Hammer', 'MorningStar').
+# Los patrones son solo de forma: no miran la tendencia previa, eso lo decide quien los use.
+
+PATTERN_BITS = {
+    'PinBar': 1 << 0,
+    'BullishEngulfing': 1 << 1,
+    'BearishEngulfing': 1 << 2,
+    'Doji': 1 << 3,
+    'Hammer': 1 << 4,
+    'ShootingStar': 1 << 5,
+    'MorningStar': 1 << 6,
+    'EveningStar': 1 << 7,
+    'ThreeWhiteSoldiers': 1 << 8,
+    'ThreeBlackCrows': 1 << 9,
+    'InsideBar': 1 << 10,
+    'OutsideBar': 1 << 11,
+    'BullishHarami': 1 << 12,
+    'BearishHarami': 1 << 13,
+}
+
+# Umbrales por defecto, como fracción del rango (high - low) o del cuerpo de la vela
+PATTERN_THRESHOLDS = {
+    'doji_body': 0.1,           # cuerpo máximo de un doji respecto al rango
+    'hammer_shadow': 2.0,       # sombra larga mínima respecto al cuerpo (hammer y shooting star)
+    'hammer_opposite': 0.1,     # sombra contraria máxima respecto al rango
+    'star_long_body': 0.5,      # cuerpo mínimo de la primera vela de una estrella respecto a su rango
+    'star_small_body': 0.3,     # cuerpo máximo de la vela central respecto al cuerpo de la primera
+    'soldiers_body': 0.5,       # cuerpo mínimo de cada vela de tres soldados / tres cuervos respecto a su rango
+}
+
+def pattern_mask(*names):
+    """Máscara con los bits de los patrones indicados."""
+    mask = 0
+    for name in names:
+        mask |= PATTERN_BITS[name]
+    return mask
+
+def decode_pattern_mask(value):
+    """Nombres de los patrones presentes en el valor de PatternMask de una vela."""
+    return [name for name, bit in PATTERN_BITS.items() if int(value) & bit]
+
+def _shift(values, periods):
+    # Desplaza sobre el último eje rellenando con NaN: las comparaciones con NaN dan False en las primeras velas
+    result = np.full(np.shape(values), np.nan)
+    result[..., periods:] = values[..., :-periods]
+    return result
+
+def _candle_parts(open_, high, low, close):
+    body = np.abs(close - open_)
+    candle_range = high - low
+    upper = high - np.maximum(open_, close)
+    lower = np.minimum(open_, close) - low
+    return body, candle_range, upper, lower
+
+def doji_array(open_, high, low, close, doji_body=PATTERN_THRESHOLDS['doji_body']):
+    body, candle_range, _, _ = _candle_parts(open_, high, low, close)
+    return (candle_range > 0) & (body <= doji_body * candle_range)
+
+def hammer_array(open_, high, low, close, hammer_shadow=PATTERN_THRESHOLDS['hammer_shadow'],
+                 hammer_opposite=PATTERN_THRESHOLDS['hammer_opposite']):
+    body, candle_range, upper, lower = _candle_parts(open_, high, low, close)
+    return (candle_range > 0) & (lower >= hammer_shadow * body) & (upper <= hammer_opposite * candle_range) & (lower > upper)
+
+def shooting_star_array(open_, high, low, close, hammer_shadow=PATTERN_THRESHOLDS['hammer_shadow'],
+                        hammer_opposite=PATTERN_THRESHOLDS['hammer_opposite']):
+    body, candle_range, upper, lower = _candle_parts(open_, high, low, close)
+    return (candle_range > 0) & (upper >= hammer_shadow * body) & (lower <= hammer_opposite * candle_range) & (upper > lower)
+
+def _star(open_, high, low, close, bullish, star_long_body, star_small_body):
+    first_open, first_close = _shift(open_, 2), _shift(close, 2)
+    first_range = _shift(high, 2) - _shift(low, 2)
+    first_body = np.abs(first_close - first_open)
+    middle_open, middle_close = _shift(open_, 1), _shift(close, 1)
+    middle_body = np.abs(middle_close - middle_open)
+    midpoint = (first_open + first_close) / 2
+    long_first = first_body >= star_long_body * first_range
+    small_middle = middle_body <= star_small_body * first_body
+    if bullish:
+        return (long_first & (first_close < first_open) & small_middle & (np.maximum(middle_open, middle_close) <= first_close)
+                & (close > open_) & (close > midpoint))
+    return (long_first & (first_close > first_open) & small_middle & (np.minimum(middle_open, middle_close) >= first_close)
+            & (close < open_) & (close < midpoint))
+
+def morning_star_array(open_, high, low, close, star_long_body=PATTERN_THRESHOLDS['star_long_body'],
+                       star_small_body=PATTERN_THRESHOLDS['star_small_body']):
+    return _star(open_, high, low, close, True, star_long_body, star_small_body)
+
+def evening_star_array(open_, high, low, close, star_long_body=PATTERN_THRESHOLDS['star_long_body'],
+                       star_small_body=PATTERN_THRESHOLDS['star_small_body']):
+    return _star(open_, high, low, close, False, star_long_body, star_small_body)
+
+def _three_in_a_row(open_, high, low, close, bullish, soldiers_body):
+    body, candle_range, _, _ = _candle_parts(open_, high, low, close)
+    direction = (close > open_) if bullish else (close < open_)
+    long_body = direction & (body >= soldiers_body * candle_range)
+    prev_open, prev_close = _shift(open_, 1), _shift(close, 1)
+    # Cada vela abre dentro del cuerpo de la anterior y cierra más allá de su cierre
+    if bullish:
+        step = (open_ >= prev_open) & (open_ <= prev_close) & (close > prev_close)
+    else:
+        step = (open_ <= prev_open) & (open_ >= prev_close) & (close < prev_close)
+    step = step & long_body & (_shift(long_body.astype(np.float64), 1) == 1)
+    return step & (_shift(step.astype(np.float64), 1) == 1)
+
+def three_white_soldiers_array(open_, high, low, close, soldiers_body=PATTERN_THRESHOLDS['soldiers_body']):
+    return _three_in_a_row(open_, high, low, close, True, soldiers_body)
+
+def three_black_crows_array(open_, high, low, close, soldiers_body=PATTERN_THRESHOLDS['soldiers_body']):
+    return _three_in_a_row(open_, high, low, close, False, soldiers_body)
+
+def inside_bar_array(high, low):
+    return (high < _shift(high, 1)) & (low > _shift(low, 1))
+
+def outside_bar_array(high, low):
+    return (high > _shift(high, 1)) & (low < _shift(low, 1))
+
+def bullish_harami_array(open_, close):
+    prev_open, prev_close = _shift(open_, 1), _shift(close, 1)
+    return (prev_close < prev_open) & (close > open_) & (close < prev_open) & (open_ > prev_close)
+
+def bearish_harami_array(open_, close):
+    prev_open, prev_close = _shift(open_, 1), _shift(close, 1)
+    return (prev_close > prev_open) & (close < open_) & (close > prev_open) & (open_ < prev_close)
+
+def detect_pattern_arrays(open_, high, low, close, patterns=None, **thresholds):
+    """Dict patrón -> array bool para los patrones pedidos (todos por defecto)."""
+    settings = dict(PATTERN_THRESHOLDS)
+    unknown = set(thresholds).difference(settings)
+    if unknown:
+        raise KeyError(f"Umbrales de patrones desconocidos: {sorted(unknown)}")
+    settings.update(thresholds)
+    detectors = {
+        'PinBar': lambda: pin_bar_array(open_, high, low, close),
+        'BullishEngulfing': lambda: bullish_engulfing_array(open_, close),
+        'BearishEngulfing': lambda: bearish_engulfing_array(open_, close),
+        'Doji': lambda: doji_array(open_, high, low, close, settings['doji_body']),
+        'Hammer': lambda: hammer_array(open_, high, low, close, settings['hammer_shadow'], settings['hammer_opposite']),
+        'ShootingStar': lambda: shooting_star_array(open_, high, low, close, settings['hammer_shadow'], settings['hammer_opposite']),
+        'MorningStar': lambda: morning_star_array(open_, high, low, close, settings['star_long_body'], settings['star_small_body']),
+        'EveningStar': lambda: evening_star_array(open_, high, low, close, settings['star_long_body'], settings['star_small_body']),
+        'ThreeWhiteSoldiers': lambda: three_white_soldiers_array(open_, high, low, close, settings['soldiers_body']),
+        'ThreeBlackCrows': lambda: three_black_crows_array(open_, high, low, close, settings['soldiers_body']),
+        'InsideBar': lambda: inside_bar_array(high, low),
+        'OutsideBar': lambda: outside_bar_array(high, low),
+        'BullishHarami': lambda: bullish_harami_array(open_, close),
+        'BearishHarami': lambda: bearish_harami_array(open_, close),
+    }
+    return {name: detectors[name]() for name in (PATTERN_BITS if patterns is None else patterns)}
+
+def pattern_bitmask(open_, high, low, close, patterns=None, **thresholds):
+    """Una máscara int32 por vela con un bit por patrón detectado (ver PATTERN_BITS)."""
+    open_, high, low, close = (np.asarray(a, dtype=np.float64) for a in (open_, high, low, close))
+    mask = np.zeros(np.shape(close), dtype=np.int32)
+    for name, detected in detect_pattern_arrays(open_, high, low, close, patterns, **thresholds).items():
+        mask |= np.where(detected, np.int32(PATTERN_BITS[name]), np.int32(0))
+    return mask
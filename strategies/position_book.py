@@ -0,0 +1,149 @@
+import logging
+import threading
+import numpy as np
+from config import TRAILING_STOP_PCT, TAKE_PROFIT_MULTIPLIER, TIMEFRAME_SCALING_FACTORS, TIMEFRAME
+
+SIDES = {'buy': 1, 'sell': -1}
+
+
+class PositionBook:
+    """Posiciones abiertas en arrays paralelos; un solo paso vectorizado actualiza todos los trailing stops.
+
+    Aplica las mismas reglas que manage_position_with_trail_stop: el stop solo se mueve a favor, el take profit
+    se inicializa desde el precio de entrada si no viene dado, y el take profit tiene prioridad sobre el stop.
+    Es seguro compartirlo entre el bucle principal y el StopMonitor: cada cierre se devuelve una sola vez.
+    """
+
+    def __init__(self, trailing_stop_pct=TRAILING_STOP_PCT, take_profit_multiplier=TAKE_PROFIT_MULTIPLIER,
+                 scaling_factor=None, capacity=64):
+        if scaling_factor is None:
+            scaling_factor = TIMEFRAME_SCALING_FACTORS.get(TIMEFRAME, 1.0)
+        # El factor de escala se aplica una vez aquí y no en cada actualización
+        self.trailing_stop_pct = trailing_stop_pct * scaling_factor
+        self.take_profit_multiplier = take_profit_multiplier * scaling_factor
+        self.count = 0
+        self._symbol_codes = {}
+        self.symbols = []
+        self.symbol_code = np.zeros(capacity, dtype=np.int32)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.entry_price = np.zeros(capacity)
+        self.stop_loss = np.zeros(capacity)
+        self.take_profit = np.zeros(capacity)
+        self.size = np.zeros(capacity)
+        self.order_id = np.empty(capacity, dtype=object)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = max(1, len(self.side)) * 2
+        for name in ('symbol_code', 'side', 'entry_price', 'stop_loss', 'take_profit', 'size', 'order_id'):
+            values = getattr(self, name)
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:len(values)] = values
+            setattr(self, name, grown)
+
+    def add(self, symbol, in_position, entry_price, stop_loss, take_profit, position_size, order_id):
+        """Añade una posición; los argumentos coinciden con las claves de los dicts de posición de run_trading_bot."""
+        with self._lock:
+            self._add(symbol, in_position, entry_price, stop_loss, take_profit, position_size, order_id)
+
+    def _add(self, symbol, in_position, entry_price, stop_loss, take_profit, position_size, order_id):
+        if self.count == len(self.side):
+            self._grow()
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            code = self._symbol_codes[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        i = self.count
+        self.symbol_code[i] = code
+        self.side[i] = SIDES[in_position]
+        self.entry_price[i] = entry_price
+        self.stop_loss[i] = stop_loss
+        # Sin take profit se inicializa en la primera actualización, como en manage_position_with_trail_stop
+        self.take_profit[i] = np.nan if take_profit is None else take_profit
+        self.size[i] = position_size
+        self.order_id[i] = order_id
+        self.count += 1
+
+    def restore(self, exits):
+        """Devuelve al libro cierres que no se llegaron a ejecutar, con su stop y take profit actuales."""
+        with self._lock:
+            for exit in exits:
+                self._add(exit['symbol'], exit['in_position'], exit['entry_price'], exit['stop_loss'], exit['take_profit'],
+                          exit['position_size'], exit['order_id'])
+        if exits:
+            logging.warning(f"Libro de posiciones: {len(exits)} cierres fallidos devueltos, {self.count} posiciones abiertas")
+
+    def _remove(self, mask):
+        keep = ~mask
+        kept = int(keep.sum())
+        for name in ('symbol_code', 'side', 'entry_price', 'stop_loss', 'take_profit', 'size', 'order_id'):
+            values = getattr(self, name)
+            values[:kept] = values[:self.count][keep]
+        self.order_id[kept:self.count] = None
+        self.count = kept
+
+    def _position(self, i):
+        return {
+            'symbol': self.symbols[self.symbol_code[i]],
+            'in_position': 'buy' if self.side[i] == 1 else 'sell',
+            'entry_price': float(self.entry_price[i]),
+            'stop_loss': float(self.stop_loss[i]),
+            'take_profit': float(self.take_profit[i]),
+            'position_size': float(self.size[i]),
+            'order_id': self.order_id[i],
+        }
+
+    def positions(self):
+        with self._lock:
+            return [self._position(i) for i in range(self.count)]
+
+    def update(self, prices):
+        """Aplica un precio por símbolo (dict símbolo -> precio) a todas las posiciones y devuelve los cierres.
+
+        Los cierres se quitan del libro; cada uno lleva la posición, el precio de salida y el motivo
+        ('take_profit' o 'stop_loss'). Las posiciones de símbolos sin precio no se tocan.
+        """
+        with self._lock:
+            return self._update(prices)
+
+    def _update(self, prices):
+        n = self.count
+        if n == 0:
+            return []
+        price_by_code = np.full(len(self.symbols), np.nan)
+        for symbol, price in prices.items():
+            code = self._symbol_codes.get(symbol)
+            if code is not None:
+                price_by_code[code] = price
+        price = price_by_code[self.symbol_code[:n]]
+        priced = ~np.isnan(price)
+        long = (self.side[:n] == 1) & priced
+        short = (self.side[:n] == -1) & priced
+
+        stop_loss = self.stop_loss[:n]
+        take_profit = self.take_profit[:n]
+        entry_price = self.entry_price[:n]
+        stop_loss[long] = np.maximum(stop_loss[long], price[long] * (1 - self.trailing_stop_pct))
+        stop_loss[short] = np.minimum(stop_loss[short], price[short] * (1 + self.trailing_stop_pct))
+        unset = np.isnan(take_profit)
+        take_profit[long & unset] = entry_price[long & unset] * self.take_profit_multiplier
+        take_profit[short & unset] = entry_price[short & unset] * (2 - self.take_profit_multiplier)
+
+        hit_take_profit = (long & (price >= take_profit)) | (short & (price <= take_profit))
+        hit_stop = ~hit_take_profit & ((long & (price <= stop_loss)) | (short & (price >= stop_loss)))
+        closing = hit_take_profit | hit_stop
+        if not closing.any():
+            return []
+
+        exits = []
+        for i in np.flatnonzero(closing):
+            exit = self._position(i)
+            exit['price'] = float(price[i])
+            exit['reason'] = 'take_profit' if hit_take_profit[i] else 'stop_loss'
+            exits.append(exit)
+        self._remove(closing)
+        logging.info(f"Libro de posiciones: {len(exits)} cierres, {self.count} posiciones abiertas")
+        return exits
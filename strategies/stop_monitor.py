@@ -0,0 +1,71 @@
+import time
+import queue
+import logging
+import threading
+import pandas as pd
+from strategies.trading_strategy import close_positions
+
+
+class StopMonitor:
+    """Evalúa trailing stops y take profits del PositionBook en cada ticker del MarketStream.
+
+    El listener corre en el hilo del stream, así que solo actualiza el libro (microsegundos); los cierres se pasan
+    a un hilo propio que envía las órdenes, para que una llamada HTTP lenta no retrase los tickers siguientes.
+    """
+
+    def __init__(self, position_book, balance_manager, place_order_fn=None, retry_delay=1.0):
+        self.position_book = position_book
+        self.balance_manager = balance_manager
+        self.place_order_fn = place_order_fn
+        # Pausa tras un cierre fallido: la posición vuelve al libro y el siguiente ticker lo reintenta
+        self.retry_delay = retry_delay
+        self.exits = 0
+        self.last_latency_ms = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, stream):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stop-monitor', daemon=True)
+        self._thread.start()
+        stream.add_listener(self.on_tick)
+        logging.info("Monitor de stops iniciado sobre el stream de precios")
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def on_tick(self, symbol, price, timestamp):
+        """Listener de MarketStream: callback(symbol, price, timestamp_ms)."""
+        if self._stop.is_set():
+            return
+        exits = self.position_book.update({symbol: price})
+        if exits:
+            self._queue.put((exits, timestamp, time.monotonic()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            item = self._queue.get()
+            if item is None:
+                break
+            exits, timestamp, received_at = item
+            try:
+                failed = close_positions(exits, self.balance_manager, pd.Timestamp(timestamp, unit='ms'), self.place_order_fn)
+            except Exception as e:
+                logging.error(f"Error ejecutando cierres del monitor de stops: {e}")
+                failed = exits
+            closed = [exit for exit in exits if exit not in failed]
+            self.exits += len(closed)
+            if closed:
+                self.last_latency_ms = (time.monotonic() - received_at) * 1000
+            for exit in closed:
+                logging.info(f"Cierre por {exit['reason']} desde el monitor de stops: {exit['symbol']} {exit['in_position']} "
+                             f"en {exit['price']}. ID de la orden: {exit['order_id']}. Latencia: {self.last_latency_ms:.1f} ms")
+            if failed:
+                self.position_book.restore(failed)
+                self._stop.wait(self.retry_delay)
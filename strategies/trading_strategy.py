@@ -1,12 +1,18 @@
 import logging
 import uuid
+import numpy as np
+import pandas as pd
 from data.data_fetcher import place_order, get_market_data, get_account_balance
 from indicators.technical_indicators import calculate_indicators
-from patterns.price_action_patterns import is_pin_bar, is_bullish_engulfing, is_bearish_engulfing
+from patterns.price_action_patterns import pattern_bitmask, PATTERN_BITS
+from data.candle_frame import as_candle_frame
 from utils.gpt4_integration import get_gpt4_recommendation
 from config import TRAILING_STOP_PCT, TAKE_PROFIT_MULTIPLIER, TIMEFRAME_SCALING_FACTORS, TIMEFRAME, RISK_PER_TRADE, SYMBOL, LIMIT
 from balance_manager import BalanceManager
 
+# Columnas que leen calculate_score, check_trade_conditions y el resumen para GPT-4
+REQUIRED_FEATURES = ['SMA50', 'RSI', 'MACD', 'MACDSignal', 'ADX', 'PlusDI', 'MinusDI', 'PinBar', 'BullishEngulfing', 'BearishEngulfing', 'PatternMask']
+
 # Definir los pesos para cada factor
 weights = {
     "pin_bar": 2,
@@ -28,23 +34,46 @@ weights = {
     "gpt_high_risk": -2,
 }
 
+SCORED_PATTERNS = ['PinBar', 'BullishEngulfing', 'BearishEngulfing']
+
+def _pattern_bits(candles, index):
+    # Mismo criterio que is_pin_bar y compañía: el índice 0 y los índices negativos nunca cuentan
+    if index < 1 or index >= len(candles):
+        return 0
+    if 'PatternMask' in candles:
+        return int(candles.value('PatternMask', index))
+    # Sin la columna precalculada basta con las dos últimas velas hasta el índice
+    window = slice(index - 1, index + 1)
+    mask = pattern_bitmask(candles['open'][window], candles['high'][window], candles['low'][window],
+                           candles['close'][window], patterns=SCORED_PATTERNS)
+    return int(mask[-1])
+
+def _average_volume(candles, index, window=20):
+    # Equivale a df['volume'].rolling(window=20).mean().iloc[index] sin recorrer todo el frame
+    position = index if index >= 0 else len(candles) + index
+    if position < window - 1:
+        return float('nan')
+    return float(candles['volume'][position - window + 1:position + 1].mean())
+
 def calculate_score(df, index):
+    candles = as_candle_frame(df)
     score = 0
     logging.info(f"Calculando puntuación para el índice {index}")
 
-    if is_pin_bar(df, index):
+    patterns = _pattern_bits(candles, index)
+    if patterns & PATTERN_BITS['PinBar']:
         score += weights["pin_bar"]
         logging.info(f"Patrón Pin Bar detectado, puntaje += {weights['pin_bar']}")
 
-    if is_bullish_engulfing(df, index):
+    if patterns & PATTERN_BITS['BullishEngulfing']:
         score += weights["bullish_engulfing"]
         logging.info(f"Patrón Bullish Engulfing detectado, puntaje += {weights['bullish_engulfing']}")
 
-    if is_bearish_engulfing(df, index):
+    if patterns & PATTERN_BITS['BearishEngulfing']:
         score += weights["bearish_engulfing"]
         logging.info(f"Patrón Bearish Engulfing detectado, puntaje += {weights['bearish_engulfing']}")
 
-    rsi = df.iloc[index]['RSI']
+    rsi = candles.value('RSI', index)
     if rsi < 30:
         score += weights["rsi_buy"]
         logging.info(f"RSI bajo detectado (RSI={rsi}), puntaje += {weights['rsi_buy']}")
@@ -52,8 +81,8 @@ def calculate_score(df, index):
         score += weights["rsi_sell"]
         logging.info(f"RSI alto detectado (RSI={rsi}), puntaje += {weights['rsi_sell']}")
 
-    macd = df.iloc[index]['MACD']
-    macd_signal = df.iloc[index]['MACDSignal']
+    macd = candles.value('MACD', index)
+    macd_signal = candles.value('MACDSignal', index)
     if macd > macd_signal:
         score += weights["macd_buy"]
         logging.info(f"MACD cruzando hacia arriba (MACD={macd}, MACD Signal={macd_signal}), puntaje += {weights['macd_buy']}")
@@ -61,8 +90,8 @@ def calculate_score(df, index):
         score += weights["macd_sell"]
         logging.info(f"MACD cruzando hacia abajo (MACD={macd}, MACD Signal={macd_signal}), puntaje += {weights['macd_sell']}")
 
-    sma50 = df.iloc[index]['SMA50']
-    close_price = df.iloc[index]['close']
+    sma50 = candles.value('SMA50', index)
+    close_price = candles.value('close', index)
     if close_price > sma50:
         score += weights["sma50_buy"]
         logging.info(f"Cierre por encima de SMA50 (Close={close_price}, SMA50={sma50}), puntaje += {weights['sma50_buy']}")
@@ -70,19 +99,19 @@ def calculate_score(df, index):
         score += weights["sma50_sell"]
         logging.info(f"Cierre por debajo de SMA50 (Close={close_price}, SMA50={sma50}), puntaje += {weights['sma50_sell']}")
 
-    volume = df.iloc[index]['volume']
-    avg_volume = df['volume'].rolling(window=20).mean().iloc[index]
+    volume = candles.value('volume', index)
+    avg_volume = _average_volume(candles, index)
     if volume > avg_volume:
         score += weights["volume"]
         logging.info(f"Volumen por encima del promedio (Volume={volume}, Avg Volume={avg_volume}), puntaje += {weights['volume']}")
 
-    adx = df.iloc[index]['ADX']
+    adx = candles.value('ADX', index)
     if adx > 25:
         score += weights["adx"]
         logging.info(f"ADX por encima de 25 (ADX={adx}), puntaje += {weights['adx']}")
 
-    plus_di = df.iloc[index]['PlusDI']
-    minus_di = df.iloc[index]['MinusDI']
+    plus_di = candles.value('PlusDI', index)
+    minus_di = candles.value('MinusDI', index)
     if plus_di > minus_di:
         score += weights["plus_di"]
         logging.info(f"Plus DI por encima de Minus DI (Plus DI={plus_di}, Minus DI={minus_di}), puntaje += {weights['plus_di']}")
@@ -93,28 +122,64 @@ def calculate_score(df, index):
     logging.info(f"Puntuación total calculada: {score}")
     return score
 
-def confirm_entry_with_gpt(df, index, gpt4_analysis):
-    score = calculate_score(df, index)
+def score_frame(df, score_weights=None):
+    """calculate_score para todas las velas a la vez: DataFrame con la aportación de cada factor y la columna score.
+
+    Usa los mismos pesos y comparaciones que calculate_score, así que score coincide con la versión escalar vela a vela.
+    score_weights permite probar otros pesos (barridos de parámetros); por defecto usa weights.
+    """
+    score_weights = weights if score_weights is None else score_weights
+    candles = as_candle_frame(df)
+    if 'PatternMask' in candles:
+        patterns = candles['PatternMask']
+    else:
+        patterns = pattern_bitmask(candles['open'], candles['high'], candles['low'], candles['close'], patterns=SCORED_PATTERNS)
+    rsi, macd, macd_signal = candles['RSI'], candles['MACD'], candles['MACDSignal']
+    close_price, sma50, volume = candles['close'], candles['SMA50'], candles['volume']
+    avg_volume = pd.Series(volume).rolling(window=20).mean().to_numpy()
+
+    def pattern(name, weight):
+        return np.where(patterns & PATTERN_BITS[name], score_weights[weight], 0)
+
+    # Las comparaciones con NaN dan False igual que en la versión escalar
+    breakdown = {
+        'pin_bar': pattern('PinBar', 'pin_bar'),
+        'bullish_engulfing': pattern('BullishEngulfing', 'bullish_engulfing'),
+        'bearish_engulfing': pattern('BearishEngulfing', 'bearish_engulfing'),
+        'rsi': np.where(rsi < 30, score_weights['rsi_buy'], np.where(rsi > 70, score_weights['rsi_sell'], 0)),
+        'macd': np.where(macd > macd_signal, score_weights['macd_buy'], score_weights['macd_sell']),
+        'sma50': np.where(close_price > sma50, score_weights['sma50_buy'], score_weights['sma50_sell']),
+        'volume': np.where(volume > avg_volume, score_weights['volume'], 0),
+        'adx': np.where(candles['ADX'] > 25, score_weights['adx'], 0),
+        'di': np.where(candles['PlusDI'] > candles['MinusDI'], score_weights['plus_di'], score_weights['minus_di']),
+    }
+    scores = pd.DataFrame(breakdown, index=df.index if isinstance(df, pd.DataFrame) else None)
+    scores['score'] = scores.sum(axis=1)
+    logging.info(f"Puntuaciones calculadas para {len(scores)} velas")
+    return scores
+
+def confirm_entry_with_gpt(df, index, gpt4_analysis, base_score=None, threshold=3, score_weights=None):
+    score_weights = weights if score_weights is None else score_weights
+    # base_score permite reutilizar la puntuación ya calculada con score_frame
+    score = calculate_score(df, index) if base_score is None else base_score
     logging.info(f"Puntuación inicial en el índice {index}: {score} 👀")
 
     sentiment = gpt4_analysis["sentiment"]
     risk_assessment = gpt4_analysis["risk_assessment"]
 
     if sentiment == "positive":
-        score += weights["gpt_positive"]
-        logging.info(f"Sentimiento positivo detectado por GPT-4, puntaje += {weights['gpt_positive']}")
+        score += score_weights["gpt_positive"]
+        logging.info(f"Sentimiento positivo detectado por GPT-4, puntaje += {score_weights['gpt_positive']}")
     elif sentiment == "negative":
-        score += weights["gpt_negative"]
-        logging.info(f"Sentimiento negativo detectado por GPT-4, puntaje += {weights['gpt_negative']}")
+        score += score_weights["gpt_negative"]
+        logging.info(f"Sentimiento negativo detectado por GPT-4, puntaje += {score_weights['gpt_negative']}")
 
     if risk_assessment == "low":
-        score += weights["gpt_low_risk"]
-        logging.info(f"Riesgo bajo detectado por GPT-4, puntaje += {weights['gpt_low_risk']}")
+        score += score_weights["gpt_low_risk"]
+        logging.info(f"Riesgo bajo detectado por GPT-4, puntaje += {score_weights['gpt_low_risk']}")
     elif risk_assessment == "high":
-        score += weights["gpt_high_risk"]
-        logging.info(f"Riesgo alto detectado por GPT-4, puntaje += {weights['gpt_high_risk']}")
-
-    threshold = 3  # Ajuste del umbral a 3
+        score += score_weights["gpt_high_risk"]
+        logging.info(f"Riesgo alto detectado por GPT-4, puntaje += {score_weights['gpt_high_risk']}")
 
     if score >= threshold:
         logging.info(f"🚀 Señal de compra confirmada en el índice {index} con puntuación {score} y umbral {threshold}")
@@ -128,6 +193,7 @@ def confirm_entry_with_gpt(df, index, gpt4_analysis):
 
 
 def trading_decision_with_gpt(df, account_balance, risk_per_trade, in_position, entry_price, stop_loss, take_profit, position_size):
+    scores = score_frame(df)['score'].to_numpy()
     for index in range(1, len(df)):
         try:
             gpt4_analysis = get_gpt4_recommendation(
@@ -147,7 +213,7 @@ def trading_decision_with_gpt(df, account_balance, risk_per_trade, in_position,
             continue
 
         try:
-            signal, score = confirm_entry_with_gpt(df, index, gpt4_analysis)
+            signal, score = confirm_entry_with_gpt(df, index, gpt4_analysis, base_score=int(scores[index]))
             logging.info(f"Señal: {signal}, Puntuación: {score}")
             
             if signal == 'buy':
@@ -191,7 +257,7 @@ def run_trading_strategy():
     balance_usdt = account_balance['total']['USDT']  # Asegúrate de que obtienes el balance de la manera correcta
     df = get_market_data(SYMBOL, TIMEFRAME, LIMIT)
     if df is not None:
-        df = calculate_indicators(df)
+        df = calculate_indicators(df, REQUIRED_FEATURES)
         in_position, stop_loss = False, 0
         entry_price, take_profit, position_size = 0, 0, 0
         in_position, stop_loss = trading_decision_with_gpt(df, balance_usdt, RISK_PER_TRADE, in_position, entry_price, stop_loss, take_profit, position_size)
@@ -199,65 +265,100 @@ def run_trading_strategy():
         logging.error("Failed to fetch market data. Trading strategy execution aborted.")
 
 
-def manage_position_with_trail_stop(df, index, in_position, entry_price, stop_loss, take_profit, symbol, position_size, order_id, trailing_stop_pct, balance_manager):
+def manage_position_with_trail_stop(df, index, in_position, entry_price, stop_loss, take_profit, symbol, position_size, order_id, trailing_stop_pct, balance_manager,
+                                    take_profit_multiplier=TAKE_PROFIT_MULTIPLIER, scaling_factor=None, place_order_fn=None):
+    # Los backtests pasan sus propios parámetros y un place_order_fn simulado; en vivo se usan los de config y place_order
+    place_order_fn = place_order_fn or place_order
     try:
-        current_price = df.iloc[index]['close']
-        scaling_factor = TIMEFRAME_SCALING_FACTORS.get(TIMEFRAME, 1.0)  # Obtiene el factor de escala para el timeframe actual
+        candles = as_candle_frame(df)
+        current_price = candles.value('close', index)
+        if scaling_factor is None:
+            scaling_factor = TIMEFRAME_SCALING_FACTORS.get(TIMEFRAME, 1.0)  # Obtiene el factor de escala para el timeframe actual
         trailing_stop_pct = trailing_stop_pct * scaling_factor
-        take_profit_multiplier = TAKE_PROFIT_MULTIPLIER * scaling_factor
+        take_profit_multiplier = take_profit_multiplier * scaling_factor
 
-        logging.info(f"Gestionando posición {'buy' if in_position == 'buy' else 'sell'} en el índice {index}. Precio actual: {current_price}. ID de la orden: {order_id}")
+        # Formato diferido: estas líneas se emiten en cada vela con posición y en los backtests suelen estar desactivadas
+        logging.info("Gestionando posición %s en el índice %s. Precio actual: %s. ID de la orden: %s", 'buy' if in_position == 'buy' else 'sell', index, current_price, order_id)
 
         if in_position == 'buy':
             new_stop_loss = current_price * (1 - trailing_stop_pct)  # Ajuste dinámico del Stop Loss
             stop_loss = max(stop_loss, new_stop_loss)  # Solo ajustamos hacia arriba el Stop Loss
             if take_profit is None:  # Inicializa el Take Profit si no está configurado
                 take_profit = entry_price * take_profit_multiplier  # Configura el Take Profit según el multiplicador
-            logging.info(f"Nuevo stop loss calculado para posición larga: {new_stop_loss}. Stop loss ajustado: {stop_loss}. Take profit: {take_profit}")
+            logging.info("Nuevo stop loss calculado para posición larga: %s. Stop loss ajustado: %s. Take profit: %s", new_stop_loss, stop_loss, take_profit)
 
             if current_price >= take_profit:
-                log_trade('Exit Buy', symbol, current_price, position_size, df.iloc[index]['timestamp'])
-                place_order(client_oid=str(uuid.uuid4()), symbol=symbol, side='sell', order_type='market', size=position_size)
+                log_trade('Exit Buy', symbol, current_price, position_size, candles.timestamp(index))
+                place_order_fn(client_oid=str(uuid.uuid4()), symbol=symbol, side='sell', order_type='market', size=position_size)
                 balance_manager.close_operation(order_id)
                 balance_manager.update_balance(position_size, current_price, 'sell')
                 in_position = False
             elif current_price <= stop_loss:
-                log_trade('Exit Buy - Stop Loss', symbol, current_price, position_size, df.iloc[index]['timestamp'])
-                place_order(client_oid=str(uuid.uuid4()), symbol=symbol, side='sell', order_type='market', size=position_size)
+                log_trade('Exit Buy - Stop Loss', symbol, current_price, position_size, candles.timestamp(index))
+                place_order_fn(client_oid=str(uuid.uuid4()), symbol=symbol, side='sell', order_type='market', size=position_size)
                 balance_manager.close_operation(order_id)
                 balance_manager.update_balance(position_size, current_price, 'sell')
                 in_position = False
             else:
-                logging.info(f"Trailing stop activo. Precio actual: {current_price}, Stop loss actual: {stop_loss}, Take profit: {take_profit}. ID de la orden: {order_id}")
+                logging.info("Trailing stop activo. Precio actual: %s, Stop loss actual: %s, Take profit: %s. ID de la orden: %s", current_price, stop_loss, take_profit, order_id)
 
         elif in_position == 'sell':
             new_stop_loss = current_price * (1 + trailing_stop_pct)  # Ajuste dinámico del Stop Loss
             stop_loss = min(stop_loss, new_stop_loss)  # Solo ajustamos hacia abajo el Stop Loss
             if take_profit is None:  # Inicializa el Take Profit si no está configurado
                 take_profit = entry_price * (2 - take_profit_multiplier)  # Configura el Take Profit según el multiplicador inverso
-            logging.info(f"Nuevo stop loss calculado para posición corta: {new_stop_loss}. Stop loss ajustado: {stop_loss}. Take profit: {take_profit}")
+            logging.info("Nuevo stop loss calculado para posición corta: %s. Stop loss ajustado: %s. Take profit: %s", new_stop_loss, stop_loss, take_profit)
 
             if current_price <= take_profit:
-                log_trade('Exit Sell', symbol, current_price, position_size, df.iloc[index]['timestamp'])
-                place_order(client_oid=str(uuid.uuid4()), symbol=symbol, side='buy', order_type='market', size=position_size)
+                log_trade('Exit Sell', symbol, current_price, position_size, candles.timestamp(index))
+                place_order_fn(client_oid=str(uuid.uuid4()), symbol=symbol, side='buy', order_type='market', size=position_size)
                 balance_manager.close_operation(order_id)
                 balance_manager.update_balance(position_size, current_price, 'buy')
                 in_position = False
             elif current_price >= stop_loss:
-                log_trade('Exit Sell - Stop Loss', symbol, current_price, position_size, df.iloc[index]['timestamp'])
-                place_order(client_oid=str(uuid.uuid4()), symbol=symbol, side='buy', order_type='market', size=position_size)
+                log_trade('Exit Sell - Stop Loss', symbol, current_price, position_size, candles.timestamp(index))
+                place_order_fn(client_oid=str(uuid.uuid4()), symbol=symbol, side='buy', order_type='market', size=position_size)
                 balance_manager.close_operation(order_id)
                 balance_manager.update_balance(position_size, current_price, 'buy')
                 in_position = False
             else:
-                logging.info(f"Trailing stop activo. Precio actual: {current_price}, Stop loss actual: {stop_loss}, Take profit: {take_profit}. ID de la orden: {order_id}")
+                logging.info("Trailing stop activo. Precio actual: %s, Stop loss actual: %s, Take profit: %s. ID de la orden: %s", current_price, stop_loss, take_profit, order_id)
 
         return in_position, stop_loss
     except Exception as e:
         logging.error(f"Error al gestionar la posición: {e}")
         return in_position, stop_loss
 
+def order_accepted(order):
+    """place_order devuelve la respuesta de KuCoin tal cual: solo code '200000' es una orden aceptada."""
+    return isinstance(order, dict) and order.get('code') == '200000'
+
+def close_positions(exits, balance_manager, timestamp=None, place_order_fn=None):
+    """Ejecuta los cierres devueltos por PositionBook.update con los mismos pasos que manage_position_with_trail_stop.
 
+    Devuelve los cierres cuya orden falló o KuCoin rechazó, para devolverlos al libro con PositionBook.restore:
+    la posición solo se da por cerrada cuando su orden ha sido aceptada.
+    """
+    place_order_fn = place_order_fn or place_order
+    failed = []
+    for exit in exits:
+        try:
+            side = 'sell' if exit['in_position'] == 'buy' else 'buy'
+            order = place_order_fn(client_oid=str(uuid.uuid4()), symbol=exit['symbol'], side=side, order_type='market', size=exit['position_size'])
+            if not order_accepted(order):
+                logging.error(f"Orden de cierre de la posición {exit['order_id']} rechazada ({order}), sigue abierta")
+                failed.append(exit)
+                continue
+            action = f"Exit {'Buy' if exit['in_position'] == 'buy' else 'Sell'}" + (' - Stop Loss' if exit['reason'] == 'stop_loss' else '')
+            log_trade(action, exit['symbol'], exit['price'], exit['position_size'], timestamp)
+            # Cierre y balance juntos bajo el lock: el bucle principal y el StopMonitor comparten el balance_manager
+            with balance_manager.lock:
+                balance_manager.close_operation(exit['order_id'])
+                balance_manager.update_balance(exit['position_size'], exit['price'], side)
+        except Exception as e:
+            logging.error(f"Error al cerrar la posición {exit['order_id']}: {e}")
+            failed.append(exit)
+    return failed
 
 
 
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import logging
+import sys
+import websockets
+
+# Servidor WebSocket local que imita el feed público de KuCoin reproduciendo frames grabados.
+# Uso: python -m stream_trading.ticker_replay frames.jsonl
+# y MarketStream(..., token_provider=lambda: ('ws://localhost:8766', 'replay', 18000))
+
+REPLAY_HOST = "localhost"
+REPLAY_PORT = 8766
+
+
+def load_frames(file_path):
+    with open(file_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _frame_topics(topic):
+    # Un subscribe de KuCoin puede agrupar símbolos: /market/ticker:BTC-USDT,ETH-USDT
+    prefix, _, symbols = topic.partition(':')
+    return {f"{prefix}:{symbol}" for symbol in symbols.split(',')}
+
+
+def make_replay_handler(frames, interval=0.01, loop_frames=False, disconnect=False):
+    """Como KuCoin, solo envía los frames de los topics suscritos. Con disconnect=True cierra la conexión al acabar
+    los frames, para probar la reconexión y la resuscripción del cliente."""
+    async def replay_frames(websocket, path=None):
+        await websocket.send(json.dumps({"id": "replay", "type": "welcome"}))
+        subscribed = set()
+
+        async def answer_requests():
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get('type') == 'ping':
+                    await websocket.send(json.dumps({"id": message.get('id'), "type": "pong"}))
+                elif message.get('type') == 'subscribe':
+                    subscribed.update(_frame_topics(message.get('topic', '')))
+                    await websocket.send(json.dumps({"id": message.get('id'), "type": "ack"}))
+
+        responder = asyncio.ensure_future(answer_requests())
+        try:
+            while not subscribed and not responder.done():
+                await asyncio.sleep(interval)
+            while True:
+                for frame in frames:
+                    if frame.get('topic') in subscribed:
+                        await websocket.send(json.dumps(frame))
+                        await asyncio.sleep(interval)
+                if not loop_frames:
+                    break
+            if disconnect:
+                await websocket.close()
+            await responder
+        except websockets.exceptions.ConnectionClosed as e:
+            logging.info(f"Conexión de replay cerrada: {e}")
+        finally:
+            responder.cancel()
+
+    return replay_frames
+
+
+async def start_replay_server(frames, host=REPLAY_HOST, port=REPLAY_PORT, interval=0.01, loop_frames=False, disconnect=False):
+    logging.info(f"Iniciando servidor de replay en ws://{host}:{port} con {len(frames)} frames")
+    server = await websockets.serve(make_replay_handler(frames, interval, loop_frames, disconnect), host, port)
+    await server.wait_closed()
+
+
+def run_replay_server(file_path, interval=0.01, loop_frames=True):
+    asyncio.run(start_replay_server(load_frames(file_path), interval=interval, loop_frames=loop_frames))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    run_replay_server(sys.argv[1])
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtest.engine import BacktestEngine
+from backtest.simulation import CloseFill, PercentageFee
+from backtest.walk_forward import run_walk_forward
+from strategies.trading_strategy import weights
+
+# Solo cuenta el análisis de GPT: las entradas las decide el test, no los indicadores
+GPT_ONLY = dict({name: 0 for name in weights}, gpt_positive=10, gpt_negative=-10)
+BASE = dict(initial_balance=10000.0, risk_per_trade=0.01, fill_model=CloseFill(), fee_model=PercentageFee(0.001),
+            threshold=5, trailing_stop_pct=0.01, take_profit_multiplier=1.02, scaling_factor=1.0, initial_stop_pct=0.02,
+            allow_short=True, weights=GPT_ONLY)
+
+
+def _candles(close):
+    close = np.asarray(close, dtype=np.float64)
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=len(close), freq='min'), 'open': close,
+                         'high': close, 'low': close, 'close': close, 'volume': np.ones(len(close))})
+
+
+def _buy_at(*indexes):
+    def gpt_fn(candles, index):
+        sentiment = 'positive' if index in indexes else 'neutral'
+        return {'sentiment': sentiment, 'risk_assessment': 'medium'}
+    return gpt_fn
+
+
+def _every_seventh_bar(candles, index):
+    # Nivel de módulo para que el pool de procesos del barrido pueda usarlo
+    sentiment = 'positive' if index % 14 == 0 else 'negative' if index % 14 == 7 else 'neutral'
+    return {'sentiment': sentiment, 'risk_assessment': 'medium'}
+
+
+def test_take_profit_trade_and_final_equity():
+    close = [100.0] * 15 + [103.0] * 10
+    result = BacktestEngine(**BASE, gpt_fn=_buy_at(10)).run(_candles(close))
+    # Entrada de 1 unidad (1% de 10000 a 100), salida por take profit (102) al cierre de 103, comisión 0.1% en ambas
+    assert len(result.trades) == 1
+    trade = result.trades.iloc[0]
+    assert (trade['entry_price'], trade['exit_price'], trade['size']) == (100.0, 103.0, 1.0)
+    assert trade['fees'] == pytest.approx(0.1 + 0.103)
+    assert result.summary()['final_equity'] == pytest.approx(10000.0 + 3.0 - 0.203)
+    assert result.equity['position'].iloc[-1] == 0
+
+
+def test_close_at_end_closes_open_position_through_the_broker():
+    close = [100.0] * 20 + [101.0] * 5
+    open_result = BacktestEngine(**BASE, gpt_fn=_buy_at(10)).run(_candles(close))
+    closed_result = BacktestEngine(**BASE, gpt_fn=_buy_at(10), close_at_end=True).run(_candles(close))
+
+    assert len(open_result.trades) == 0
+    assert open_result.equity['position'].iloc[-1] == 1.0
+    assert open_result.summary()['final_equity'] == pytest.approx(10000.0 + 1.0 - 0.1)
+
+    assert len(closed_result.trades) == 1
+    assert closed_result.equity['position'].iloc[-1] == 0
+    assert closed_result.trades.iloc[0]['exit_price'] == 101.0
+    assert closed_result.summary()['final_equity'] == pytest.approx(10000.0 + 1.0 - 0.1 - 0.101)
+
+
+def test_walk_forward_leaves_no_position_open_at_fold_boundaries():
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, 700)))
+    candidates = [{'trailing_stop_pct': 0.005}, {'trailing_stop_pct': 0.02}]
+    base = dict(BASE, gpt_fn=_every_seventh_bar)
+    result = run_walk_forward(_candles(close), candidates, in_sample=300, out_of_sample=100, base_kwargs=base, workers=1)
+
+    assert len(result.folds) == 4
+    assert (result.equity.groupby('fold')['position'].last() == 0).all()
+    assert len(result.out_of_sample.fills) == 2 * len(result.trades)
+    # La curva encadenada solo cambia por operaciones cerradas, con sus comisiones
+    equity = result.equity['equity'].to_numpy()
+    assert equity[-1] - BASE['initial_balance'] == pytest.approx(result.trades['pnl'].sum())
+    assert result.folds['oos_initial_equity'].iloc[1:].tolist() == pytest.approx(result.folds['oos_final_equity'].iloc[:-1].tolist())
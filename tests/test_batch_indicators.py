@@ -0,0 +1,43 @@
+import numpy as np
+import talib
+from indicators.batch_indicators import compute_batch, FILL_ZERO
+
+
+def _bars(symbols=20, n=400, seed=11):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (symbols, n)), axis=1))
+    # Tramo plano: varianza cero en las bandas de Bollinger
+    close[:, 250:300] = close[:, 249:250]
+    high = close * (1 + rng.uniform(0, 0.005, close.shape))
+    low = close * (1 - rng.uniform(0, 0.005, close.shape))
+    return close.copy(), high, low, close
+
+
+def _talib(open_, high, low, close):
+    macd, signal, hist = talib.MACD(close, 12, 26, 9)
+    upper, middle, lower = talib.BBANDS(close, 20, 2.0, 2.0)
+    return {
+        'SMA50': talib.SMA(close, 50), 'SMA200': talib.SMA(close, 200), 'RSI': talib.RSI(close, 14),
+        'MACD': macd, 'MACDSignal': signal, 'MACDHist': hist,
+        'BollingerUpper': upper, 'BollingerMiddle': middle, 'BollingerLower': lower,
+        'ATR': talib.ATR(high, low, close, 14), 'ADX': talib.ADX(high, low, close, 14),
+        'PlusDI': talib.PLUS_DI(high, low, close, 14), 'MinusDI': talib.MINUS_DI(high, low, close, 14),
+    }
+
+
+def test_batch_matches_talib_per_symbol():
+    open_, high, low, close = _bars()
+    batch = compute_batch(open_, high, low, close)
+    for row in range(close.shape[0]):
+        for name, expected in _talib(open_[row], high[row], low[row], close[row]).items():
+            if name in FILL_ZERO:
+                expected = np.nan_to_num(expected, nan=0.0)
+            np.testing.assert_allclose(batch[name][row], expected, rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_bollinger_width_is_zero_on_flat_segment():
+    open_, high, low, close = _bars()
+    batch = compute_batch(open_, high, low, close, features=['BollingerUpper', 'BollingerMiddle', 'BollingerLower'])
+    flat = slice(269, 300)
+    np.testing.assert_array_equal(batch['BollingerUpper'][:, flat], batch['BollingerMiddle'][:, flat])
+    np.testing.assert_array_equal(batch['BollingerLower'][:, flat], batch['BollingerMiddle'][:, flat])
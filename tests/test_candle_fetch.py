@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import numpy as np
+import pandas as pd
+import ccxt
+from aiohttp import web
+from data.candle_cache import CandleCache
+from data.multi_fetcher import build_async_exchange, fetch_many_async
+from data.synthetic_candle_server import make_app, synthetic_candle
+
+SYMBOLS = ['BTC-USDT', 'ETH-USDT', 'SOL-USDT', 'XRP-USDT', 'ADA-USDT']
+MINUTE = 60
+# Hora del servidor: 30 s dentro de una vela de 1m, así la última vela está en formación
+START = 1_700_000_040 + 30
+
+
+class SyntheticServer:
+    """synthetic_candle_server en un hilo propio, en un puerto libre de localhost, con reloj controlado por el test."""
+
+    def __init__(self, now=START):
+        self.now = now
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _start(self):
+        self._runner = web.AppRunner(make_app(SYMBOLS, clock=lambda: self.now))
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, 'localhost', 0)
+        await site.start()
+        self.url = f"http://localhost:{self._runner.addresses[0][1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def milliseconds(self):
+        return int(self.now * 1000)
+
+
+def _expected(symbol, timestamps, now):
+    rows = [synthetic_candle(symbol, int(t), MINUTE, now) for t in timestamps]
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime([int(row[0]) * 1000 for row in rows], unit='ms').astype('datetime64[ms]'),
+        'open': [float(row[1]) for row in rows],
+        'high': [float(row[3]) for row in rows],
+        'low': [float(row[4]) for row in rows],
+        'close': [float(row[2]) for row in rows],
+        'volume': [float(row[5]) for row in rows],
+    })
+
+
+def _last_bars(now, count):
+    last = int(now) // MINUTE * MINUTE
+    return np.arange(last - (count - 1) * MINUTE, last + 1, MINUTE)
+
+
+def test_fetch_many_fans_out_under_the_concurrency_cap():
+    with SyntheticServer() as server:
+        async def run():
+            exchange = build_async_exchange(server.url)
+            exchange.milliseconds = server.milliseconds
+            fetch_ohlcv = exchange.fetch_ohlcv
+            in_flight = {'now': 0, 'max': 0}
+
+            async def counted_fetch(*args, **kwargs):
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+                try:
+                    await asyncio.sleep(0.02)
+                    return await fetch_ohlcv(*args, **kwargs)
+                finally:
+                    in_flight['now'] -= 1
+
+            exchange.fetch_ohlcv = counted_fetch
+            try:
+                frames, errors = await fetch_many_async([symbol.replace('-', '/') for symbol in SYMBOLS], '1m', limit=30,
+                                                        exchange=exchange, max_concurrency=2, requests_per_second=1000)
+            finally:
+                await exchange.close()
+            return frames, errors, in_flight['max']
+
+        frames, errors, max_in_flight = asyncio.run(run())
+
+    assert errors == {}
+    assert max_in_flight == 2
+    for symbol in SYMBOLS:
+        frame = frames[symbol.replace('-', '/')]
+        assert len(frame) == 30
+        pd.testing.assert_frame_equal(frame, _expected(symbol, frame['timestamp'].astype('int64') // 1000, START))
+        assert frame['timestamp'].iloc[-1] == pd.Timestamp(_last_bars(START, 1)[0], unit='s')
+
+
+def test_candle_cache_appends_new_bars_and_replaces_the_forming_one():
+    with SyntheticServer() as server:
+        exchange = ccxt.kucoin({'enableRateLimit': False})
+        exchange.urls['api'] = {name: server.url for name in exchange.urls['api']}
+        exchange.milliseconds = server.milliseconds
+        calls = []
+        fetch_ohlcv = exchange.fetch_ohlcv
+
+        def recorded_fetch(symbol, timeframe, since=None, limit=None):
+            calls.append(since)
+            return fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+        exchange.fetch_ohlcv = recorded_fetch
+        cache = CandleCache(exchange)
+
+        first = cache.get_frame('BTC/USDT', '1m', 50)
+        pd.testing.assert_frame_equal(first, _expected('BTC-USDT', _last_bars(START, 50), START))
+
+        # Dos minutos y medio después: la vela en formación se ha cerrado y hay dos más (la última otra vez en formación)
+        server.now = START + 150
+        second = cache.get_frame('BTC/USDT', '1m', 50)
+
+    assert calls == [None, int(_last_bars(START, 1)[0]) * 1000]
+    pd.testing.assert_frame_equal(second, _expected('BTC-USDT', _last_bars(START + 150, 50), START + 150))
+    forming = first['timestamp'].iloc[-1]
+    assert first['close'].iloc[-1] != second.loc[second['timestamp'] == forming, 'close'].item()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from indicators.feature_cache import FeatureCache
+from indicators.registry import registry
+
+
+def _candles(n=300, seed=0):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, n))
+    return pd.DataFrame({'timestamp': np.arange(n), 'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+                         'volume': np.ones(n)})
+
+
+def test_put_leaves_caller_arrays_writable():
+    cache = FeatureCache()
+    values = np.arange(5, dtype=np.float64)
+    cache.put('key', {'RSI': values})
+    assert values.flags.writeable
+    values[0] = -1.0
+    cached = cache.get('key')['RSI']
+    assert not cached.flags.writeable
+    assert cached[0] == 0.0
+
+
+def test_frames_from_miss_and_hit_do_not_share_cache_memory():
+    df = _candles()
+    cache = FeatureCache()
+    miss = registry.compute(df, ['RSI', 'ATR'], cache)
+    hit = registry.compute(df, ['RSI', 'ATR'], cache)
+    assert cache.stats()['hits'] == 2
+    pd.testing.assert_frame_equal(miss, hit)
+    expected = hit['RSI'].to_numpy().copy()
+    miss.loc[50, 'RSI'] = -1.0
+    hit.loc[60, 'RSI'] = -1.0
+    np.testing.assert_array_equal(registry.compute(df, ['RSI'], cache)['RSI'].to_numpy(), expected)
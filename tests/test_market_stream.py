@@ -0,0 +1,64 @@
+import time
+import asyncio
+import threading
+import websockets
+from data.market_stream import MarketStream
+from stream_trading.ticker_replay import make_replay_handler
+
+
+def _ticker(symbol, price, timestamp):
+    return {'type': 'message', 'topic': f'/market/ticker:{symbol}', 'subject': 'trade.ticker',
+            'data': {'price': str(price), 'time': timestamp}}
+
+
+class ReplayServer:
+    """ticker_replay en un hilo propio, en un puerto libre de localhost."""
+
+    def __init__(self, frames, **kwargs):
+        self._handler = make_replay_handler(frames, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(self._serve(),), daemon=True)
+
+    async def _serve(self):
+        self._server = await websockets.serve(self._handler, 'localhost', 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        await self._server.wait_closed()
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._thread.join(5)
+
+
+def _collect(stream, timeout=10):
+    ticks = []
+    stream.add_listener(lambda symbol, price, timestamp: ticks.append((symbol, price, timestamp)))
+    return ticks, time.monotonic() + timeout
+
+
+def test_ticks_reach_listeners_in_order_and_after_reconnect():
+    frames = [_ticker('BTC-USDT' if i % 2 else 'ETH-USDT', 100 + i, 1000 + i) for i in range(10)]
+    # Frames de un topic no suscrito: el servidor no debe enviarlos
+    frames.append(_ticker('XRP-USDT', 1.0, 2000))
+    with ReplayServer(frames, interval=0.001, disconnect=True) as server:
+        stream = MarketStream(None, token_provider=lambda: (f'ws://localhost:{server.port}', 'replay', 18000))
+        ticks, deadline = _collect(stream)
+        stream.start(['BTC-USDT', 'ETH-USDT'])
+        try:
+            while len(ticks) < 20 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            stream.stop()
+
+    # El servidor corta tras cada pasada: la segunda solo llega si el stream reconecta y vuelve a suscribirse
+    expected = [(frame['topic'].split(':')[1], float(frame['data']['price']), frame['data']['time']) for frame in frames[:10]]
+    assert ticks[:20] == expected + expected
+    assert stream.reconnects >= 1
+    assert stream.get_last_price('BTC-USDT') == 109.0
+    assert stream.get_last_price('XRP-USDT') is None
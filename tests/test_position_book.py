@@ -0,0 +1,59 @@
+import json
+from balance_manager import BalanceManager
+from strategies.position_book import PositionBook
+from strategies.trading_strategy import close_positions
+
+ACCEPTED = {'code': '200000', 'data': {'orderId': 'exit'}}
+REJECTED = {'code': '200004', 'msg': 'Balance insufficient!'}
+
+
+def _book_with_positions(balance_manager):
+    book = PositionBook(trailing_stop_pct=0.01, take_profit_multiplier=1.03, scaling_factor=1.0)
+    for order_id, symbol, side in [('1', 'BTC-USDT', 'buy'), ('2', 'ETH-USDT', 'buy'), ('3', 'BTC-USDT', 'sell')]:
+        balance_manager.add_operation({'orderId': order_id, 'size': 1.0, 'price': 100.0, 'side': side, 'type': 'market',
+                                       'status': 'open', 'timestamp': ''})
+        stop_loss = 98.0 if side == 'buy' else 102.0
+        book.add(symbol, side, 100.0, stop_loss, None, 1.0, order_id)
+    return book
+
+
+def _operations(path):
+    with open(path) as f:
+        return {operation['orderId']: operation['status'] for operation in json.load(f)}
+
+
+def test_update_moves_stops_and_returns_each_exit_once():
+    book = PositionBook(trailing_stop_pct=0.01, take_profit_multiplier=1.03, scaling_factor=1.0)
+    book.add('BTC-USDT', 'buy', 100.0, 98.0, None, 1.0, 'long')
+    book.add('BTC-USDT', 'sell', 100.0, 102.0, None, 1.0, 'short')
+    assert book.update({'BTC-USDT': 101.0}) == []
+    long, short = book.positions()
+    assert long['stop_loss'] == 101.0 * 0.99 and long['take_profit'] == 103.0
+    assert short['stop_loss'] == 102.0 and short['take_profit'] == 97.0
+    exits = book.update({'BTC-USDT': 99.5})
+    assert [(exit['order_id'], exit['reason']) for exit in exits] == [('long', 'stop_loss')]
+    assert book.update({'BTC-USDT': 99.5}) == []
+    assert [position['order_id'] for position in book.positions()] == ['short']
+
+
+def test_rejected_exit_orders_stay_in_book_and_leave_balance_untouched(tmp_path):
+    path = str(tmp_path / 'operations.json')
+    balance_manager = BalanceManager({'USDT': 1000.0}, operations_file=path)
+    book = _book_with_positions(balance_manager)
+    exits = book.update({'BTC-USDT': 90.0, 'ETH-USDT': 90.0})
+    assert len(exits) == 3 and len(book) == 0
+
+    responses = {'BTC-USDT': REJECTED, 'ETH-USDT': None}
+    failed = close_positions(exits, balance_manager, place_order_fn=lambda **order: responses[order['symbol']])
+    book.restore(failed)
+    assert sorted(exit['order_id'] for exit in failed) == ['1', '2', '3']
+    assert sorted(position['order_id'] for position in book.positions()) == ['1', '2', '3']
+    assert balance_manager.balance['USDT'] == 1000.0
+    assert set(_operations(path).values()) == {'open'}
+
+    # El reintento con el exchange aceptando cierra todo una sola vez
+    retry = book.update({'BTC-USDT': 90.0, 'ETH-USDT': 90.0})
+    assert close_positions(retry, balance_manager, place_order_fn=lambda **order: ACCEPTED) == []
+    assert len(book) == 0
+    assert balance_manager.balance['USDT'] == 1000.0 + 90.0 + 90.0 - 90.0
+    assert set(_operations(path).values()) == {'closed'}
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from patterns.price_action_patterns import (is_pin_bar, is_bullish_engulfing, is_bearish_engulfing, detect_price_action_patterns,
+                                            pin_bar_array, bullish_engulfing_array, pattern_bitmask, PATTERN_BITS)
+
+SCALAR = {'PinBar': is_pin_bar, 'BullishEngulfing': is_bullish_engulfing, 'BearishEngulfing': is_bearish_engulfing}
+
+
+def _bars(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    # Precios redondeados para que haya empates entre open, close, high y low de velas vecinas
+    open_ = np.round(100 + rng.normal(0, 2, n), 1)
+    close = np.round(open_ + rng.normal(0, 1, n), 1)
+    high = np.maximum(open_, close) + np.round(rng.exponential(0.5, n), 1) * (rng.random(n) > 0.2)
+    low = np.minimum(open_, close) - np.round(rng.exponential(0.5, n), 1) * (rng.random(n) > 0.2)
+    df = pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close})
+    # Filas con NaN, sueltas y en columnas distintas
+    for i, column in [(0, 'close'), (7, 'open'), (8, 'close'), (50, 'high'), (51, 'low'), (120, 'open'), (n - 1, 'close')]:
+        df.loc[i, column] = np.nan
+    return df
+
+
+def test_arrays_match_scalar_functions():
+    df = _bars()
+    arrays = detect_price_action_patterns(df)
+    for name, is_pattern in SCALAR.items():
+        expected = np.array([bool(is_pattern(df, i)) for i in range(len(df))])
+        np.testing.assert_array_equal(arrays[name], expected, err_msg=name)
+        assert arrays[name].any(), name
+
+
+def test_index_zero_and_out_of_range_are_false():
+    df = _bars(n=5)
+    df.loc[0] = [100.0, 110.0, 90.0, 100.5]
+    assert not detect_price_action_patterns(df)['PinBar'][0]
+    for is_pattern in SCALAR.values():
+        assert not is_pattern(df, 0)
+        assert not is_pattern(df, -1)
+        assert not is_pattern(df, len(df))
+
+
+def test_matrix_rows_match_single_series():
+    frames = [_bars(seed=seed) for seed in range(4)]
+    stacked = {column: np.vstack([df[column].to_numpy() for df in frames]) for column in ('open', 'high', 'low', 'close')}
+    pin_bars = pin_bar_array(stacked['open'], stacked['high'], stacked['low'], stacked['close'])
+    engulfing = bullish_engulfing_array(stacked['open'], stacked['close'])
+    for row, df in enumerate(frames):
+        arrays = detect_price_action_patterns(df)
+        np.testing.assert_array_equal(pin_bars[row], arrays['PinBar'])
+        np.testing.assert_array_equal(engulfing[row], arrays['BullishEngulfing'])
+
+
+def test_bitmask_bits_match_arrays():
+    df = _bars()
+    mask = pattern_bitmask(df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+    for name, values in detect_price_action_patterns(df).items():
+        np.testing.assert_array_equal((mask & PATTERN_BITS[name]) != 0, values, err_msg=name)
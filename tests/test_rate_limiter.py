@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from kucoin_rate_limiter import RateLimiter, PRIORITY_ORDER, PRIORITY_ACCOUNT, PRIORITY_MARKET_DATA
+
+
+def _drained_limiter():
+    # 10 tokens por 100 ms: tras vaciarlo, cada petición de peso 5 espera unos 50 ms
+    limiter = RateLimiter({'public': 10, 'spot': 10}, window_ms=100)
+    limiter.acquire('spot', 10)
+    return limiter
+
+
+def test_async_orders_go_ahead_of_queued_market_data():
+    limiter = _drained_limiter()
+    served = []
+
+    async def request(name, priority, delay):
+        await asyncio.sleep(delay)
+        await limiter.acquire_async('spot', 5, priority)
+        served.append(name)
+
+    async def main():
+        await asyncio.gather(request('velas', PRIORITY_MARKET_DATA, 0), request('cuenta', PRIORITY_ACCOUNT, 0.01),
+                             request('orden', PRIORITY_ORDER, 0.02))
+
+    asyncio.run(main())
+    assert served == ['orden', 'cuenta', 'velas']
+    assert limiter.stats()['spot']['queued'] == 0
+
+
+def test_async_order_goes_ahead_of_waiting_thread():
+    limiter = _drained_limiter()
+    served = []
+
+    def market_data():
+        limiter.acquire('spot', 5, PRIORITY_MARKET_DATA)
+        served.append('velas')
+
+    async def order():
+        await asyncio.sleep(0.01)
+        await limiter.acquire_async('spot', 5, PRIORITY_ORDER)
+        served.append('orden')
+
+    thread = threading.Thread(target=market_data)
+    thread.start()
+    asyncio.run(order())
+    thread.join(timeout=5)
+    assert served == ['orden', 'velas']
+
+
+def test_cancelled_async_acquire_leaves_the_queue():
+    limiter = _drained_limiter()
+
+    async def main():
+        task = asyncio.create_task(limiter.acquire_async('spot', 5, PRIORITY_ORDER))
+        await asyncio.sleep(0.01)
+        assert limiter.stats()['spot']['queued'] == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+    assert limiter.stats()['spot']['queued'] == 0
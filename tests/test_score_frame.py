@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from indicators.technical_indicators import calculate_indicators
+from strategies.trading_strategy import REQUIRED_FEATURES, calculate_score, score_frame
+
+
+def _candles(n=300, seed=5):
+    rng = np.random.default_rng(seed)
+    open_ = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close = open_ * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.004, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.004, n))
+    volume = rng.uniform(1, 10, n)
+    timestamp = pd.date_range('2024-01-01', periods=n, freq='5min')
+    return pd.DataFrame({'timestamp': timestamp, 'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+
+def _assert_scores_match(df):
+    expected = [calculate_score(df, i) for i in range(len(df))]
+    np.testing.assert_array_equal(score_frame(df)['score'].to_numpy(), expected)
+
+
+def test_score_frame_matches_calculate_score_with_warm_up_rows():
+    # MACD y MACDSignal quedan en NaN durante el arranque; SMA50, RSI y ADX se rellenan con 0
+    df = calculate_indicators(_candles(), REQUIRED_FEATURES, cache=None)
+    assert df['MACD'].isna().any()
+    _assert_scores_match(df)
+
+
+def test_score_frame_matches_calculate_score_with_nan_rows():
+    df = calculate_indicators(_candles(seed=6), REQUIRED_FEATURES, cache=None)
+    for i, column in [(40, 'RSI'), (80, 'volume'), (81, 'SMA50'), (120, 'ADX'), (121, 'PlusDI'), (200, 'close')]:
+        df.loc[i, column] = np.nan
+    _assert_scores_match(df)
+
+
+def test_score_frame_without_pattern_mask_column():
+    df = calculate_indicators(_candles(seed=7), REQUIRED_FEATURES, cache=None).drop(columns=['PatternMask'])
+    _assert_scores_match(df)
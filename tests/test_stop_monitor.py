@@ -0,0 +1,61 @@
+import time
+from balance_manager import BalanceManager
+from strategies.position_book import PositionBook
+from strategies.stop_monitor import StopMonitor
+
+ACCEPTED = {'code': '200000', 'data': {'orderId': 'exit'}}
+REJECTED = {'code': '429000', 'msg': 'Too many requests'}
+
+
+class FakeStream:
+    def __init__(self):
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def tick(self, symbol, price):
+        for callback in self.listeners:
+            callback(symbol, price, int(time.time() * 1000))
+
+
+def test_rejected_exit_is_restored_then_closed_on_a_later_tick(tmp_path):
+    balance_manager = BalanceManager({'USDT': 1000.0}, operations_file=str(tmp_path / 'operations.json'))
+    balance_manager.add_operation({'orderId': '1', 'size': 2.0, 'price': 100.0, 'side': 'buy', 'type': 'market',
+                                   'status': 'open', 'timestamp': ''})
+    book = PositionBook(trailing_stop_pct=0.01, take_profit_multiplier=1.03, scaling_factor=1.0)
+    book.add('BTC-USDT', 'buy', 100.0, 98.0, None, 2.0, '1')
+
+    events = []
+    responses = [REJECTED, ACCEPTED]
+    restore = book.restore
+
+    def place_order(**order):
+        response = responses.pop(0)
+        events.append(('order', response['code'], len(book)))
+        return response
+
+    def logged_restore(exits):
+        events.append(('restore', [exit['order_id'] for exit in exits]))
+        restore(exits)
+
+    book.restore = logged_restore
+    monitor = StopMonitor(book, balance_manager, place_order_fn=place_order, retry_delay=0.01)
+    stream = FakeStream()
+    monitor.start(stream)
+    try:
+        stream.tick('BTC-USDT', 101.0)
+        deadline = time.time() + 5
+        while monitor.exits < 1 and time.time() < deadline:
+            stream.tick('BTC-USDT', 97.0)
+            time.sleep(0.005)
+    finally:
+        monitor.stop()
+
+    # Rechazada: la posición vuelve al libro; el siguiente ticker la cierra una sola vez
+    assert events == [('order', '429000', 0), ('restore', ['1']), ('order', '200000', 0)]
+    assert monitor.exits == 1
+    assert len(book) == 0
+    with balance_manager.lock:
+        assert balance_manager.balance['USDT'] == 1000.0 + 2.0 * 97.0
+        assert [operation['status'] for operation in balance_manager.get_operations()] == ['closed']
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import talib
+from indicators.streaming_indicators import (StreamingSMA, StreamingBBands, StreamingEMA, StreamingMACD, StreamingRSI,
+                                             StreamingATR, StreamingDMI)
+
+
+def _bars(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # Tramo plano: varianza cero en las bandas y rangos/movimientos nulos en ATR y DMI
+    close[200:260] = close[199]
+    high = close * (1 + rng.uniform(0, 0.005, n))
+    low = close * (1 - rng.uniform(0, 0.005, n))
+    high[200:260] = low[200:260] = close[200:260]
+    return high, low, close
+
+
+def _stream(indicator, *inputs, revise=False):
+    """Alimenta el indicador vela a vela; con revise=True cada vela llega antes con un valor provisional."""
+    outputs = []
+    for values in zip(*inputs):
+        if revise:
+            indicator.update(*(v * 1.01 for v in values))
+            outputs.append(indicator.update(*values, revise=True))
+        else:
+            outputs.append(indicator.update(*values))
+    return np.array(outputs, dtype=float)
+
+
+def _assert_matches(streamed, expected):
+    # Las sumas incrementales acumulan redondeo distinto al recálculo completo: se exige igualdad hasta 1e-8 relativo
+    expected = np.column_stack(expected) if isinstance(expected, tuple) else expected
+    np.testing.assert_array_equal(np.isnan(streamed), np.isnan(expected))
+    np.testing.assert_allclose(streamed, expected, rtol=1e-8, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('revise', [False, True])
+def test_close_indicators_match_talib(revise):
+    _, _, close = _bars()
+    _assert_matches(_stream(StreamingSMA(50), close, revise=revise), talib.SMA(close, 50))
+    _assert_matches(_stream(StreamingEMA(20), close, revise=revise), talib.EMA(close, 20))
+    _assert_matches(_stream(StreamingRSI(14), close, revise=revise), talib.RSI(close, 14))
+    _assert_matches(_stream(StreamingMACD(12, 26, 9), close, revise=revise), talib.MACD(close, 12, 26, 9))
+    _assert_matches(_stream(StreamingBBands(20), close, revise=revise), talib.BBANDS(close, 20, 2.0, 2.0))
+
+
+@pytest.mark.parametrize('revise', [False, True])
+def test_range_indicators_match_talib(revise):
+    high, low, close = _bars()
+    _assert_matches(_stream(StreamingATR(14), high, low, close, revise=revise), talib.ATR(high, low, close, 14))
+    _assert_matches(_stream(StreamingDMI(14), high, low, close, revise=revise), (
+        talib.PLUS_DI(high, low, close, 14), talib.MINUS_DI(high, low, close, 14), talib.ADX(high, low, close, 14)))
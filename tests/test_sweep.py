@@ -0,0 +1,70 @@
+import json
+import random
+import numpy as np
+import pandas as pd
+from backtest.sweep import run_sweep, adaptive_search, _narrow
+from strategies.trading_strategy import weights
+
+BASE = dict(initial_balance=10000.0, threshold=5, weights=dict({name: 0 for name in weights}, gpt_positive=10, gpt_negative=-10))
+
+
+def _every_seventh_bar(candles, index):
+    sentiment = 'positive' if index % 14 == 0 else 'negative' if index % 14 == 7 else 'neutral'
+    return {'sentiment': sentiment, 'risk_assessment': 'medium'}
+
+
+def _candles(bars=300, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=bars, freq='min'), 'open': close,
+                         'high': close, 'low': close, 'close': close, 'volume': np.ones(bars)})
+
+
+def _lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_resumed_sweep_skips_cached_keys_and_returns_only_requested(tmp_path):
+    path = str(tmp_path / 'resultados.jsonl')
+    base = dict(BASE, gpt_fn=_every_seventh_bar)
+    a, b, c = ({'trailing_stop_pct': pct} for pct in (0.005, 0.01, 0.02))
+
+    first = run_sweep(_candles(), [a, b], base, results_path=path, workers=1)
+    assert sorted(first['trailing_stop_pct']) == [0.005, 0.01]
+    assert len(_lines(path)) == 2
+
+    resumed = run_sweep(_candles(), [b, c], base, results_path=path, workers=1)
+    # b sale del fichero y solo c se evalúa; a no aparece porque no se ha pedido
+    assert sorted(resumed['trailing_stop_pct']) == [0.01, 0.02]
+    assert [line['trailing_stop_pct'] for line in _lines(path)][2:] == [0.02]
+    cached = first.set_index('trailing_stop_pct').loc[0.01, 'final_equity']
+    assert resumed.set_index('trailing_stop_pct').loc[0.01, 'final_equity'] == cached
+
+    # Otras velas u otra configuración base no reutilizan lo guardado
+    run_sweep(_candles(seed=6), [b], base, results_path=path, workers=1)
+    run_sweep(_candles(), [b], dict(base, threshold=6), results_path=path, workers=1)
+    assert len(_lines(path)) == 5
+
+
+def test_narrow_stays_around_elite_and_inside_space():
+    space = {'trailing_stop_pct': (0.001, 0.05), 'threshold': (2, 8), 'allow_short': [True, False]}
+    elite = {'trailing_stop_pct': 0.04, 'threshold': 7, 'allow_short': False}
+    rng = random.Random(1)
+    for _ in range(200):
+        params = _narrow(space, [elite], 0.25, rng)
+        assert 0.001 <= params['trailing_stop_pct'] <= 0.05
+        assert abs(params['trailing_stop_pct'] - 0.04) <= (0.05 - 0.001) * 0.25 / 2
+        assert isinstance(params['threshold'], int) and 6 <= params['threshold'] <= 8
+        assert params['allow_short'] in (True, False)
+
+
+def test_adaptive_search_returns_every_evaluated_candidate_sorted(tmp_path):
+    space = {'trailing_stop_pct': (0.002, 0.03), 'threshold': [5, 6]}
+    base = dict(BASE, gpt_fn=_every_seventh_bar)
+    table = adaptive_search(_candles(), space, rounds=2, samples=4, seed=3, base_kwargs=base,
+                            results_path=str(tmp_path / 'adaptativa.jsonl'), workers=1)
+    assert 4 < len(table) <= 8
+    assert not table.duplicated(subset=list(space)).any()
+    assert table['return_pct'].is_monotonic_decreasing
+    assert table['trailing_stop_pct'].between(0.002, 0.03).all()
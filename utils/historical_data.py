@@ -1,3 +1,6 @@
+import logging
+import pandas as pd
+
 def prepare_historical_data(df):
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     df.set_index('timestamp', inplace=True)
@@ -25,3 +28,20 @@ def prepare_historical_data(df):
     }
 
     return historical_data
+
+
+def load_historical_data(symbol, timeframe, start=None, end=None, store_dir=None):
+    from config import CANDLE_STORE_DIR
+    from data.candle_store import CandleStore
+
+    store_dir = store_dir or CANDLE_STORE_DIR
+    if not store_dir:
+        logging.error("CANDLE_STORE_DIR no está configurado; no hay histórico local disponible.")
+        return None
+    try:
+        df = CandleStore(store_dir).load_range(symbol, timeframe, start, end, as_frame=True)
+        logging.info(f"Histórico cargado para {symbol} {timeframe}: {len(df)} velas")
+        return df
+    except Exception as e:
+        logging.error(f"Error cargando histórico de {symbol} {timeframe}: {e}")
+        return None